@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.datasources import data_sources
+
+router = APIRouter(prefix="/api/data-sources", tags=["data-sources"])
+
+
+# Pydantic models for response
+class DataSourceResponse(BaseModel):
+    name: str
+    pool_status: Optional[str] = None  # None until the first query opens the pool
+
+
+@router.get("", response_model=List[DataSourceResponse])
+def list_data_sources():
+    """
+    List configured data sources and their connection pool status.
+    Connection URLs are not exposed since they may contain credentials.
+    """
+    pool_status = data_sources.pool_status()
+    return [
+        DataSourceResponse(name=name, pool_status=pool_status.get(name))
+        for name in data_sources.names()
+    ]
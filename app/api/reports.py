@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 from uuid import UUID
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, TypeAdapter
 import logging
 import traceback
 
 from app.db import get_db
-from app.models import Report
-from app.services.scheduler import schedule_report, reload_scheduler
+from app.datasources import data_sources
+from app.models import Report, generate_uuid
+from app.services.scheduler import (
+    schedule_report, sync_report_schedule, get_schedule_info, get_schedule_infos, reconcile_scheduler
+)
+from app.services.exporter import normalize_compression
+from app.utils.validators import (
+    validate_cron_expression,
+    validate_sql_query,
+    validate_output_format,
+    validate_compression,
+    validate_concurrency_policy,
+    validate_watermark_column,
+    validate_incremental_mode,
+    validate_priority,
+)
+from app.services.pools import pool_exists, DEFAULT_POOL, EXPRESS_POOL
+from app.services.timeline import upcoming_timeline, TIMELINE_MAX_HOURS
+from app.services.response_cache import report_cache, etag_matches
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +38,16 @@ class ReportCreate(BaseModel):
     name: str
     description: str = None
     sql_query: str
+    data_source: Optional[str] = None  # Defaults to the "default" data source
     schedule_cron: str
     output_format: str = "CSV"
+    compression: Optional[str] = None
+    concurrency_policy: str = "COALESCE"  # COALESCE, QUEUE or REJECT
+    cache_ttl_seconds: Optional[int] = None  # Reuse results this fresh; None/0 disables
+    watermark_column: Optional[str] = None  # Makes the report incremental
+    incremental_mode: str = "APPEND"  # APPEND or DELTA
+    priority: str = "NORMAL"  # HIGH, NORMAL or LOW
+    execution_pool: str = "default"  # Named pool from EXECUTION_POOLS
     is_active: bool = True
 
 
@@ -29,8 +55,16 @@ class ReportUpdate(BaseModel):
     name: str = None
     description: str = None
     sql_query: str = None
+    data_source: str = None
     schedule_cron: str = None
     output_format: str = None
+    compression: str = None  # "none" turns compression off
+    concurrency_policy: str = None
+    cache_ttl_seconds: int = None  # 0 disables the result cache
+    watermark_column: str = None  # "" turns incremental execution off
+    incremental_mode: str = None
+    priority: str = None
+    execution_pool: str = None
     is_active: bool = None
 
 
@@ -39,38 +73,254 @@ class ReportResponse(BaseModel):
     name: str
     description: Optional[str] = None  # Allow None for optional description
     sql_query: str
+    data_source: Optional[str] = None
     schedule_cron: str
     output_format: str
+    compression: Optional[str] = None
+    concurrency_policy: str = "COALESCE"
+    cache_ttl_seconds: Optional[int] = None
+    watermark_column: Optional[str] = None
+    incremental_mode: str = "APPEND"
+    priority: str = "NORMAL"
+    execution_pool: str = "default"
     is_active: bool
     created_at: str
+    schedule_offset_seconds: Optional[int] = None  # Spreading offset from the cron time
+    next_fire_time: Optional[str] = None  # Effective next fire time, offset included
 
     class Config:
         from_attributes = True
 
 
+class ReportDefinition(ReportCreate):
+    id: Optional[str] = None  # Existing report to update; without it, matched by name
+    description: Optional[str] = None  # Exported as null when unset
+
+
+class BulkUpsertRequest(BaseModel):
+    reports: List[ReportDefinition]
+
+
+class BulkUpsertResult(BaseModel):
+    id: str
+    name: str
+    action: str  # created, updated or unchanged
+
+
+class BulkUpsertResponse(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    scheduler: Dict[str, int] = {}  # Jobs added, updated, removed and unchanged
+    reports: List[BulkUpsertResult]
+
+
+class BulkActiveRequest(BaseModel):
+    ids: List[str]
+
+
+class BulkActiveResponse(BaseModel):
+    updated: int
+    unchanged: int
+    scheduler: Dict[str, int] = {}
+
+
+class ReportExport(BaseModel):
+    reports: List[ReportDefinition]
+
+
+class TimelineSlotResponse(BaseModel):
+    start: str
+    fires: int
+    expected_seconds: float  # Sum of the expected run times of the fires
+    report_ids: Optional[List[str]] = None
+
+
+class TimelineResponse(BaseModel):
+    start: str
+    end: str
+    slot_minutes: int
+    reports: int  # Scheduled reports
+    total_fires: int
+    total_expected_seconds: float
+    peak_fires: int  # Fires in the busiest slot
+    slots: List[TimelineSlotResponse]  # Slots without fires are left out
+
+
+def report_to_response(report: Report, schedule_info: Tuple = None) -> ReportResponse:
+    """
+    Convert a Report to its response model.
+    Done manually to ensure proper serialization of ids and datetimes.
+
+    Args:
+        report: Report to convert
+        schedule_info: The report's get_schedule_info(), if already read
+    """
+    offset_seconds, next_fire_time = schedule_info or get_schedule_info(report.id)
+    return ReportResponse(
+        id=str(report.id),
+        name=report.name,
+        description=report.description if report.description else None,  # Handle None properly
+        sql_query=report.sql_query,
+        data_source=report.data_source,
+        schedule_cron=report.schedule_cron,
+        output_format=report.output_format,
+        compression=report.compression,
+        concurrency_policy=report.concurrency_policy or "COALESCE",
+        cache_ttl_seconds=report.cache_ttl_seconds,
+        watermark_column=report.watermark_column,
+        incremental_mode=report.incremental_mode or "APPEND",
+        priority=report.priority or "NORMAL",
+        execution_pool=report.execution_pool or DEFAULT_POOL,
+        is_active=report.is_active,
+        created_at=report.created_at.isoformat() if report.created_at else "",
+        schedule_offset_seconds=offset_seconds,
+        next_fire_time=next_fire_time.isoformat() if next_fire_time else None
+    )
+
+
+_report_list_adapter = TypeAdapter(List[ReportResponse])
+
+
+def _valid_until(responses: List[ReportResponse]) -> Optional[datetime]:
+    """Earliest next fire time shown, after which the responses are stale."""
+    fire_times = [datetime.fromisoformat(r.next_fire_time) for r in responses if r.next_fire_time]
+    return min(fire_times, default=None)
+
+
+def _cached_response(
+    request: Request,
+    key: Hashable,
+    build: Callable[[], Tuple[bytes, Optional[datetime]]]
+) -> Response:
+    """
+    Serve a report response from the in-process cache, building it with
+    build() on a miss. Responses carry an ETag; a request whose
+    If-None-Match matches it gets 304 Not Modified without a body.
+    """
+    entry = report_cache.get(key)
+    if entry is None:
+        # Read the version first, so a change made while building keeps
+        # the result out of the cache
+        version = report_cache.version
+        body, valid_until = build()
+        entry = report_cache.put(key, version, body, valid_until)
+    
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _check_cron(schedule_cron: Optional[str]):
+    """Raise a 400 error if a given cron expression can't be scheduled."""
+    if schedule_cron is None:
+        return
+    is_valid, error = validate_cron_expression(schedule_cron)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+
+
+def _check_options(report_data, report: Report = None):
+    """
+    Raise a 400 error if an execution option is not supported.
+    For updates, options that are not provided are taken from the existing report.
+    """
+    error = _options_error(report_data, report)
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+
+
+def _options_error(report_data, report: Report = None) -> Optional[str]:
+    """Return why an execution option is not supported, or None (see _check_options)."""
+    def effective(field):
+        value = getattr(report_data, field)
+        if value is None and report is not None:
+            value = getattr(report, field)
+        return value
+    
+    is_valid, error = validate_compression(report_data.compression)
+    if is_valid and report_data.data_source and not data_sources.exists(report_data.data_source):
+        is_valid, error = False, f"Unknown data source: {report_data.data_source}"
+    if is_valid and report_data.concurrency_policy is not None:
+        is_valid, error = validate_concurrency_policy(report_data.concurrency_policy)
+    if is_valid and report_data.cache_ttl_seconds is not None and report_data.cache_ttl_seconds < 0:
+        is_valid, error = False, "cache_ttl_seconds must not be negative"
+    if is_valid and effective("watermark_column"):
+        is_valid, error = validate_watermark_column(effective("watermark_column"))
+        if is_valid:
+            is_valid, error = validate_incremental_mode(
+                effective("incremental_mode") or "APPEND",
+                effective("output_format")
+            )
+    if is_valid and report_data.priority is not None:
+        is_valid, error = validate_priority(report_data.priority)
+    if is_valid and report_data.execution_pool is not None:
+        if report_data.execution_pool.lower() == EXPRESS_POOL:
+            is_valid, error = False, f"The {EXPRESS_POOL} pool is reserved for manual runs"
+        elif not pool_exists(report_data.execution_pool):
+            is_valid, error = False, f"Unknown execution pool: {report_data.execution_pool}"
+    return None if is_valid else error
+
+
+def _report_values(report_data: ReportCreate) -> dict:
+    """Column values of a new or fully redefined report, normalized."""
+    return {
+        "name": report_data.name,
+        "description": report_data.description,
+        "sql_query": report_data.sql_query,
+        "data_source": report_data.data_source or None,
+        "schedule_cron": report_data.schedule_cron,
+        "output_format": report_data.output_format,
+        "compression": normalize_compression(report_data.compression),
+        "concurrency_policy": report_data.concurrency_policy.upper(),
+        "cache_ttl_seconds": report_data.cache_ttl_seconds or None,
+        "watermark_column": report_data.watermark_column or None,
+        "incremental_mode": report_data.incremental_mode.upper(),
+        "priority": report_data.priority.upper(),
+        "execution_pool": report_data.execution_pool.lower(),
+        "is_active": report_data.is_active,
+    }
+
+
+# Columns set by _report_values, which a report definition round-trips
+_report_values_columns = (
+    "name", "description", "sql_query", "data_source", "schedule_cron", "output_format",
+    "compression", "concurrency_policy", "cache_ttl_seconds", "watermark_column",
+    "incremental_mode", "priority", "execution_pool", "is_active",
+)
+
+# Report IDs per IN (...) list, within the bind parameter limits of every backend
+_BULK_CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int = _BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 @router.get("", response_model=List[ReportResponse])
-def list_reports(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_reports(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """
     List all reports.
+    
+    Served from an in-process cache until a report changes; send the ETag
+    of a previous response in If-None-Match to get 304 while nothing changed.
     """
-    try:
+    def build():
         reports = db.query(Report).offset(skip).limit(limit).all()
-        # Convert to response format manually to ensure proper serialization
-        result = []
-        for r in reports:
-            # Handle None description explicitly
-            desc = r.description if r.description is not None else None
-            result.append(ReportResponse(
-                id=str(r.id),
-                name=r.name,
-                description=desc,
-                sql_query=r.sql_query,
-                schedule_cron=r.schedule_cron,
-                output_format=r.output_format,
-                is_active=r.is_active,
-                created_at=r.created_at.isoformat() if r.created_at else ""
-            ))
-        return result
+        infos = get_schedule_infos(r.id for r in reports)
+        responses = [report_to_response(r, infos[str(r.id)]) for r in reports]
+        return _report_list_adapter.dump_json(responses), _valid_until(responses)
+    
+    try:
+        return _cached_response(request, ("list", skip, limit), build)
     except Exception as e:
         error_msg = str(e)
         if "connection" in error_msg.lower() or "database" in error_msg.lower() or "operational" in error_msg.lower():
@@ -81,49 +331,97 @@ def list_reports(skip: int = 0, limit: int = 100, db: Session = Depends(get_db))
         )
 
 
-@router.get("/{report_id}", response_model=ReportResponse)
-def get_report(report_id: str, db: Session = Depends(get_db)):  # Changed from UUID to str
+@router.get("/timeline", response_model=TimelineResponse)
+def get_timeline(
+    hours: int = Query(24, ge=1),
+    slot_minutes: int = Query(15, ge=1, le=1440),
+    include_reports: bool = False,
+    db: Session = Depends(get_db)
+):
     """
-    Get a specific report by ID.
+    Upcoming fires of all scheduled reports over the next hours, merged into
+    time slots with the number of fires and their expected run time (average
+    of recent successful runs). Spreading offsets are included.
     """
-    report = db.query(Report).filter(Report.id == report_id).first()
-    if not report:
+    if hours > TIMELINE_MAX_HOURS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Report with id {report_id} not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"hours must be at most {TIMELINE_MAX_HOURS}"
         )
-    # Convert to response format manually to ensure proper serialization
-    return ReportResponse(
-        id=str(report.id),
-        name=report.name,
-        description=report.description if report.description else None,
-        sql_query=report.sql_query,
-        schedule_cron=report.schedule_cron,
-        output_format=report.output_format,
-        is_active=report.is_active,
-        created_at=report.created_at.isoformat() if report.created_at else ""
+    timeline = upcoming_timeline(db, hours, slot_minutes, include_reports)
+    return TimelineResponse(
+        start=timeline["start"].isoformat(),
+        end=timeline["end"].isoformat(),
+        slot_minutes=timeline["slot_minutes"],
+        reports=timeline["reports"],
+        total_fires=timeline["total_fires"],
+        total_expected_seconds=timeline["total_expected_seconds"],
+        peak_fires=timeline["peak_fires"],
+        slots=[
+            TimelineSlotResponse(
+                start=slot["start"].isoformat(),
+                fires=slot["fires"],
+                expected_seconds=slot["expected_seconds"],
+                report_ids=slot.get("report_ids")
+            )
+            for slot in timeline["slots"]
+        ]
     )
 
 
+@router.get("/export", response_model=ReportExport)
+def export_reports(active_only: bool = False, db: Session = Depends(get_db)):
+    """
+    Export all report definitions, in the format POST /api/reports/bulk
+    accepts, e.g. to keep them under version control.
+    """
+    query = db.query(Report).order_by(Report.name, Report.id)
+    if active_only:
+        query = query.filter(Report.is_active == True)
+    # Unset options are left out, so they take their defaults on import
+    return ReportExport(reports=[
+        ReportDefinition(id=str(report.id), **{
+            column: getattr(report, column)
+            for column in _report_values_columns
+            if getattr(report, column) is not None
+        })
+        for report in query.all()
+    ])
+
+
+@router.get("/{report_id}", response_model=ReportResponse)
+def get_report(report_id: str, request: Request, db: Session = Depends(get_db)):  # Changed from UUID to str
+    """
+    Get a specific report by ID. Cached and conditional like the report list.
+    """
+    def build():
+        report = db.query(Report).filter(Report.id == report_id).first()
+        if not report:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Report with id {report_id} not found"
+            )
+        response = report_to_response(report)
+        return response.model_dump_json().encode(), _valid_until([response])
+    
+    return _cached_response(request, ("report", report_id), build)
+
+
 @router.post("", response_model=ReportResponse, status_code=status.HTTP_201_CREATED)
 def create_report(report_data: ReportCreate, db: Session = Depends(get_db)):
     """
     Create a new report definition.
     """
+    _check_cron(report_data.schedule_cron)
+    _check_options(report_data)
     try:
         # Create new report
-        report = Report(
-            name=report_data.name,
-            description=report_data.description,
-            sql_query=report_data.sql_query,
-            schedule_cron=report_data.schedule_cron,
-            output_format=report_data.output_format,
-            is_active=report_data.is_active
-        )
+        report = Report(**_report_values(report_data))
         
         db.add(report)
         db.commit()
         db.refresh(report)
+        report_cache.invalidate()
         
         # Schedule the report if it's active
         # Wrap in try-except to prevent scheduling errors from breaking report creation
@@ -134,17 +432,7 @@ def create_report(report_data: ReportCreate, db: Session = Depends(get_db)):
                 logger.warning(f"Could not schedule report {report.id}: {str(e)}")
                 # Don't fail the entire request if scheduling fails
         
-        # Convert to response format manually to ensure proper serialization
-        return ReportResponse(
-            id=str(report.id),
-            name=report.name,
-            description=report.description if report.description else None,  # Handle None properly
-            sql_query=report.sql_query,
-            schedule_cron=report.schedule_cron,
-            output_format=report.output_format,
-            is_active=report.is_active,
-            created_at=report.created_at.isoformat() if report.created_at else ""
-        )
+        return report_to_response(report)
     except Exception as e:
         error_msg = str(e)
         if "connection" in error_msg.lower() or "database" in error_msg.lower() or "operational" in error_msg.lower():
@@ -172,6 +460,8 @@ def update_report(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Report with id {report_id} not found"
         )
+    _check_cron(report_data.schedule_cron)
+    _check_options(report_data, report)
     
     # Update fields if provided
     if report_data.name is not None:
@@ -180,27 +470,202 @@ def update_report(
         report.description = report_data.description
     if report_data.sql_query is not None:
         report.sql_query = report_data.sql_query
+    if report_data.data_source is not None:
+        report.data_source = report_data.data_source or None
     if report_data.schedule_cron is not None:
         report.schedule_cron = report_data.schedule_cron
     if report_data.output_format is not None:
         report.output_format = report_data.output_format
+    if report_data.compression is not None:
+        report.compression = normalize_compression(report_data.compression)
+    if report_data.concurrency_policy is not None:
+        report.concurrency_policy = report_data.concurrency_policy.upper()
+    if report_data.cache_ttl_seconds is not None:
+        report.cache_ttl_seconds = report_data.cache_ttl_seconds or None
+    if report_data.watermark_column is not None:
+        report.watermark_column = report_data.watermark_column or None
+    if report_data.incremental_mode is not None:
+        report.incremental_mode = report_data.incremental_mode.upper()
+    if report_data.priority is not None:
+        report.priority = report_data.priority.upper()
+    if report_data.execution_pool is not None:
+        report.execution_pool = report_data.execution_pool.lower()
     if report_data.is_active is not None:
         report.is_active = report_data.is_active
     
     db.commit()
     db.refresh(report)
+    report_cache.invalidate()
     
-    # Reload scheduler to pick up changes
-    reload_scheduler()
+    # Add, update or remove only this report's job
+    sync_report_schedule(report)
     
-    # Convert to response format manually to ensure proper serialization
-    return ReportResponse(
-        id=str(report.id),
-        name=report.name,
-        description=report.description if report.description else None,
-        sql_query=report.sql_query,
-        schedule_cron=report.schedule_cron,
-        output_format=report.output_format,
-        is_active=report.is_active,
-        created_at=report.created_at.isoformat() if report.created_at else ""
+    return report_to_response(report)
+
+
+def _definition_error(definition: ReportDefinition) -> Optional[str]:
+    """Return why a report definition is invalid, or None."""
+    for is_valid, error in (
+        validate_cron_expression(definition.schedule_cron),
+        validate_sql_query(definition.sql_query),
+        validate_output_format(definition.output_format),
+    ):
+        if not is_valid:
+            return error
+    return _options_error(definition)
+
+
+def _reconcile_after_bulk(db: Session) -> Dict[str, int]:
+    """Apply the scheduler diff of a bulk change; the change itself stays committed."""
+    report_cache.invalidate()
+    try:
+        return reconcile_scheduler(db)
+    except Exception as e:
+        logger.error(f"Could not reconcile scheduler after bulk change: {str(e)}")
+        return {}
+
+
+@router.post("/bulk", response_model=BulkUpsertResponse)
+def bulk_upsert_reports(request_data: BulkUpsertRequest, db: Session = Depends(get_db)):
+    """
+    Create or update many report definitions at once.
+    
+    Definitions with an id update that report (or create it with that id);
+    the others update the report of the same name, or create one. All
+    definitions are validated first (cron, SQL and options); if any is
+    invalid, nothing is written and the errors are returned by index.
+    Changes are written in one transaction with batched statements, and
+    the scheduler is reconciled once at the end.
+    """
+    definitions = request_data.reports
+    errors = []
+    seen_ids, seen_names = set(), set()
+    for index, definition in enumerate(definitions):
+        error = _definition_error(definition)
+        if error is None and definition.id is not None:
+            if definition.id in seen_ids:
+                error = f"Duplicate id: {definition.id}"
+            seen_ids.add(definition.id)
+        elif error is None:
+            if definition.name in seen_names:
+                error = f"Duplicate name without id: {definition.name}"
+            seen_names.add(definition.name)
+        if error:
+            errors.append({"index": index, "name": definition.name, "error": error})
+    
+    # Match definitions to existing reports
+    by_id: Dict[str, Report] = {}
+    for ids in _chunks(list(seen_ids)):
+        by_id.update((report.id, report) for report in db.query(Report).filter(Report.id.in_(ids)))
+    by_name: Dict[str, List[Report]] = {}
+    for names in _chunks(list(seen_names)):
+        for report in db.query(Report).filter(Report.name.in_(names)):
+            by_name.setdefault(report.name, []).append(report)
+    for index, definition in enumerate(definitions):
+        if definition.id is None and len(by_name.get(definition.name, [])) > 1:
+            errors.append({
+                "index": index,
+                "name": definition.name,
+                "error": f"{len(by_name[definition.name])} reports are named {definition.name}; give the id"
+            })
+    
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=sorted(errors, key=lambda error: error["index"])
+        )
+    
+    inserts, updates, results = [], [], []
+    for definition in definitions:
+        values = _report_values(definition)
+        if definition.id is not None:
+            existing = by_id.get(definition.id)
+        else:
+            existing = (by_name.get(definition.name) or [None])[0]
+        if existing is None:
+            values["id"] = definition.id or generate_uuid()
+            inserts.append(values)
+            results.append(BulkUpsertResult(id=values["id"], name=definition.name, action="created"))
+        elif any(getattr(existing, column) != value for column, value in values.items()):
+            values["id"] = existing.id
+            updates.append(values)
+            results.append(BulkUpsertResult(id=existing.id, name=definition.name, action="updated"))
+        else:
+            results.append(BulkUpsertResult(id=existing.id, name=definition.name, action="unchanged"))
+    
+    try:
+        for batch in _chunks(inserts):
+            db.bulk_insert_mappings(Report, batch)
+        for batch in _chunks(updates):
+            db.bulk_update_mappings(Report, batch)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error in bulk report upsert: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}. No reports were changed."
+        )
+    
+    scheduler_counts = _reconcile_after_bulk(db) if inserts or updates else {}
+    return BulkUpsertResponse(
+        created=len(inserts),
+        updated=len(updates),
+        unchanged=len(results) - len(inserts) - len(updates),
+        scheduler=scheduler_counts,
+        reports=results
+    )
+
+
+def _set_active(db: Session, ids: List[str], is_active: bool) -> BulkActiveResponse:
+    """Activate or deactivate many reports in one transaction (see bulk_activate_reports)."""
+    ids = list(dict.fromkeys(ids))
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(report_id for report_id, in db.query(Report.id).filter(Report.id.in_(chunk)))
+    missing = [report_id for report_id in ids if report_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Reports not found: {', '.join(missing)}"
+        )
+    
+    updated = 0
+    try:
+        for chunk in _chunks(ids):
+            updated += (
+                db.query(Report)
+                .filter(Report.id.in_(chunk), Report.is_active != is_active)
+                .update({Report.is_active: is_active}, synchronize_session=False)
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}. No reports were changed."
+        )
+    
+    return BulkActiveResponse(
+        updated=updated,
+        unchanged=len(ids) - updated,
+        scheduler=_reconcile_after_bulk(db) if updated else {}
     )
+
+
+@router.post("/bulk/activate", response_model=BulkActiveResponse)
+def bulk_activate_reports(request_data: BulkActiveRequest, db: Session = Depends(get_db)):
+    """
+    Activate many reports at once: one transaction, then one scheduler
+    reconcile. Unknown IDs are a 404 and nothing is changed.
+    """
+    return _set_active(db, request_data.ids, True)
+
+
+@router.post("/bulk/deactivate", response_model=BulkActiveResponse)
+def bulk_deactivate_reports(request_data: BulkActiveRequest, db: Session = Depends(get_db)):
+    """
+    Deactivate many reports at once, like bulk_activate_reports.
+    """
+    return _set_active(db, request_data.ids, False)
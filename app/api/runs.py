@@ -1,37 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
+from datetime import datetime
+import asyncio
+import json
 import os
 
-from app.db import get_db
+from app.db import get_db, SessionLocal
 from app.models import Report, ReportRun, RunStatus
-from app.services.runner import execute_report
+from app.services.runner import execute_report, create_run, discard_run, RunInProgressError
+from app.services.executor import submit_run, get_executor_stats, QueueFullError
+from app.services import run_queue, run_stats, run_events
+from app.services.pools import get_placement
+from app.services.exporter import get_media_type, split_compression, iter_decompressed
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/api", tags=["runs"])
 
 
 # Pydantic models for response
+class RunMetricsResponse(BaseModel):
+    queue_seconds: Optional[float] = None
+    query_seconds: Optional[float] = None
+    fetch_seconds: Optional[float] = None
+    serialize_seconds: Optional[float] = None
+    write_seconds: Optional[float] = None
+    notify_seconds: Optional[float] = None
+    total_seconds: Optional[float] = None
+    rows_per_second: Optional[float] = None
+    bytes_written: Optional[int] = None
+    peak_memory_bytes: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class RunProgressResponse(BaseModel):
+    rows_written: Optional[int] = None
+    bytes_written: Optional[int] = None  # Size of the output file so far
+    rows_per_second: Optional[float] = None  # Over the last update interval
+    expected_rows: Optional[int] = None  # Average of the report's previous runs
+    eta: Optional[str] = None  # Estimated finish of the export
+    updated_at: Optional[str] = None
+
+
 class ReportRunResponse(BaseModel):
     id: str  # Changed from UUID to str for SQLite compatibility
     report_id: str  # Changed from UUID to str for SQLite compatibility
     started_at: str
+    running_at: Optional[str] = None  # When a worker began executing it
     finished_at: Optional[str] = None
     status: str
     row_count: Optional[int] = None
     output_path: Optional[str] = None
+    output_bytes: Optional[int] = None
+    row_group_count: Optional[int] = None
+    coalesced_count: Optional[int] = None
+    cache_hit: bool = False
+    watermark_value: Optional[str] = None
     error_message: Optional[str] = None
+    progress: Optional[RunProgressResponse] = None  # Export progress while RUNNING
+    metrics: Optional[RunMetricsResponse] = None  # Only included for a single run
 
     class Config:
         from_attributes = True
 
 
+def run_to_response(run: ReportRun, include_metrics: bool = False) -> ReportRunResponse:
+    """
+    Convert a ReportRun to its response model.
+    Done manually to ensure proper serialization of ids, datetimes and status.
+    Metrics are loaded only when include_metrics is set, to keep lists to one query.
+    """
+    metrics = None
+    if include_metrics and run.metrics is not None:
+        metrics = RunMetricsResponse.model_validate(run.metrics)
+    progress = run_events.run_progress(run)
+
+    return ReportRunResponse(
+        id=str(run.id),
+        report_id=str(run.report_id),
+        started_at=run.started_at.isoformat() if run.started_at else "",
+        running_at=run.running_at.isoformat() if run.running_at else None,
+        finished_at=run.finished_at.isoformat() if run.finished_at else None,
+        status=run.status if isinstance(run.status, str) else run.status.value,
+        row_count=run.row_count,
+        output_path=run.output_path,
+        output_bytes=run.output_bytes,
+        row_group_count=run.row_group_count,
+        coalesced_count=run.coalesced_count,
+        cache_hit=bool(run.cache_hit),
+        watermark_value=run.watermark_value,
+        error_message=run.error_message,
+        progress=RunProgressResponse(**progress) if progress else None,
+        metrics=metrics
+    )
+
+
+class PoolStatsResponse(BaseModel):
+    max_workers: Optional[int] = None  # Threads per worker process with worker dispatch
+    active_workers: int
+    queue_depth: int
+    max_queue: Optional[int] = None
+
+
+class ExecutorStatsResponse(BaseModel):
+    dispatch: str = "local"
+    max_workers: Optional[int] = None  # Not known for worker processes
+    active_workers: int
+    queue_depth: int
+    max_queue: Optional[int] = None
+    pools: Dict[str, PoolStatsResponse] = {}
+
+
+class RunStatsResponse(BaseModel):
+    report_id: str
+    report_name: Optional[str] = None  # None once the report is deleted
+    runs: int
+    succeeded: int
+    failed: int
+    success_rate: Optional[float] = None
+    p50_seconds: Optional[float] = None  # Of successful runs
+    p95_seconds: Optional[float] = None
+    mean_seconds: Optional[float] = None
+
+
 @router.post("/reports/{report_id}/run", response_model=ReportRunResponse, status_code=status.HTTP_201_CREATED)
-def trigger_manual_run(report_id: str, db: Session = Depends(get_db)):  # Changed from UUID to str
+def trigger_manual_run(
+    report_id: str,  # Changed from UUID to str
+    response: Response,
+    mode: str = "sync",
+    express: bool = False,
+    db: Session = Depends(get_db)
+):
     """
     Trigger a manual run of a report.
+    
+    With mode=sync (default) the run executes inline and the finished run is returned.
+    With mode=async the run is queued on the background executor and returned
+    immediately with status QUEUED and HTTP 202; poll GET /api/runs/{run_id} for
+    the outcome. A full queue is reported as HTTP 429.
+    With worker dispatch both modes enqueue the run for a worker process;
+    sync mode then waits for the worker to finish it. A run that hasn't
+    finished within RUN_WAIT_TIMEOUT_SECONDS is returned as it is with 202.
+    
+    If the report is already running, its concurrency policy decides: COALESCE
+    returns the in-flight run, QUEUE runs again afterwards, REJECT returns 409.
+    
+    With express=true a background run skips the report's pool and runs in
+    the express lane, ahead of scheduled runs.
     """
+    if mode not in ("sync", "async"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="mode must be one of: sync, async"
+        )
+    
     try:
         # Check if report exists
         report = db.query(Report).filter(Report.id == report_id).first()
@@ -41,21 +169,39 @@ def trigger_manual_run(report_id: str, db: Session = Depends(get_db)):  # Change
                 detail=f"Report with id {report_id} not found"
             )
         
+        if mode == "async":
+            report_run, created = create_run(db, report_id, express)
+            if not created:
+                # Attached to the run already in flight
+                response.status_code = status.HTTP_202_ACCEPTED
+                return run_to_response(report_run)
+            try:
+                pool, priority = get_placement(report, express)
+                submit_run(report_run.id, pool=pool, priority=priority, report_id=report_run.report_id)
+            except QueueFullError as e:
+                # Don't leave a QUEUED run behind that nothing will execute
+                discard_run(db, report_run)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=str(e),
+                    headers={"Retry-After": "5"}
+                )
+            response.status_code = status.HTTP_202_ACCEPTED
+            return run_to_response(report_run)
+        
         # Execute the report
-        report_run = execute_report(db, report_id)
-        # Convert to response format manually to ensure proper serialization
-        return ReportRunResponse(
-            id=str(report_run.id),
-            report_id=str(report_run.report_id),
-            started_at=report_run.started_at.isoformat() if report_run.started_at else "",
-            finished_at=report_run.finished_at.isoformat() if report_run.finished_at else None,
-            status=report_run.status if isinstance(report_run.status, str) else report_run.status.value,
-            row_count=report_run.row_count,
-            output_path=report_run.output_path,
-            error_message=report_run.error_message
-        )
+        report_run = execute_report(db, report_id, express=express)
+        if report_run.status in (RunStatus.QUEUED.value, RunStatus.RUNNING.value):
+            # Waited for another run or a worker, which hasn't finished in time
+            response.status_code = status.HTTP_202_ACCEPTED
+        return run_to_response(report_run)
     except HTTPException:
         raise
+    except RunInProgressError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         error_msg = str(e)
         if "connection" in error_msg.lower() or "database" in error_msg.lower():
@@ -69,12 +215,19 @@ def trigger_manual_run(report_id: str, db: Session = Depends(get_db)):  # Change
 @router.get("/reports/{report_id}/runs", response_model=List[ReportRunResponse])
 def get_report_runs(
     report_id: str,  # Changed from UUID to str
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get run history for a specific report.
+    Get run history for a specific report, newest first.
+    
+    Pages are read with a cursor: when more runs may follow, the X-Next-Cursor
+    header holds the cursor of the next page. Unlike skip, a cursor costs the
+    same however deep the page is; skip is still supported but ignored when
+    a cursor is given.
     """
     try:
         # Check if report exists
@@ -85,29 +238,20 @@ def get_report_runs(
                 detail=f"Report with id {report_id} not found"
             )
         
-        runs = (
+        query = (
             db.query(ReportRun)
             .filter(ReportRun.report_id == report_id)
-            .order_by(ReportRun.started_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .order_by(ReportRun.started_at.desc(), ReportRun.id.desc())
         )
+        if cursor:
+            query = query.filter(_before_cursor(cursor))
+        elif skip:
+            query = query.offset(skip)
+        runs = query.limit(limit).all()
         
-        # Convert to response format manually to ensure proper serialization
-        return [
-            ReportRunResponse(
-                id=str(r.id),
-                report_id=str(r.report_id),
-                started_at=r.started_at.isoformat() if r.started_at else "",
-                finished_at=r.finished_at.isoformat() if r.finished_at else None,
-                status=r.status if isinstance(r.status, str) else r.status.value,
-                row_count=r.row_count,
-                output_path=r.output_path,
-                error_message=r.error_message
-            )
-            for r in runs
-        ]
+        if runs and len(runs) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(runs[-1].started_at, runs[-1].id)
+        return [run_to_response(r) for r in runs]
     except HTTPException:
         raise
     except Exception as e:
@@ -117,10 +261,187 @@ def get_report_runs(
         )
 
 
+def _before_cursor(cursor: str):
+    """Filter for the runs after a cursor in (started_at, id) descending order."""
+    try:
+        started_at, run_id = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return or_(
+        ReportRun.started_at < started_at,
+        and_(ReportRun.started_at == started_at, ReportRun.id < run_id)
+    )
+
+
+@router.get("/runs/queue", response_model=ExecutorStatsResponse)
+def get_run_queue(db: Session = Depends(get_db)):
+    """
+    Get worker and queue usage of the background run executor, or of the
+    durable run queue when runs are dispatched to worker processes.
+    """
+    if run_queue.WORKER_DISPATCH:
+        return ExecutorStatsResponse(**run_queue.stats(db))
+    return ExecutorStatsResponse(dispatch=run_queue.RUN_DISPATCH, **get_executor_stats())
+
+
+@router.get("/runs", response_model=List[ReportRunResponse])
+def search_runs(
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    report_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_duration: Optional[float] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Search the runs of all reports, newest first.
+    
+    - status: one status or a comma-separated list (e.g. FAILED or QUEUED,RUNNING)
+    - report_id: only the runs of one report
+    - since / until: start time range, as ISO datetimes (since inclusive, until exclusive)
+    - min_duration: only finished runs that took at least this many seconds
+    
+    Pages are read with a cursor, as in a report's run history.
+    """
+    query = db.query(ReportRun).order_by(ReportRun.started_at.desc(), ReportRun.id.desc())
+    if status_filter:
+        statuses = [value.strip().upper() for value in status_filter.split(",") if value.strip()]
+        valid = {run_status.value for run_status in RunStatus}
+        invalid = [value for value in statuses if value not in valid]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid status: {', '.join(invalid)}. Must be one of: {', '.join(sorted(valid))}"
+            )
+        query = query.filter(ReportRun.status.in_(statuses))
+    if report_id:
+        query = query.filter(ReportRun.report_id == report_id)
+    if since:
+        query = query.filter(ReportRun.started_at >= since)
+    if until:
+        query = query.filter(ReportRun.started_at < until)
+    if min_duration is not None:
+        query = query.filter(ReportRun.duration_seconds >= min_duration)
+    if cursor:
+        query = query.filter(_before_cursor(cursor))
+    
+    try:
+        runs = query.limit(limit).all()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}. Please check your database configuration."
+        )
+    
+    if runs and len(runs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(runs[-1].started_at, runs[-1].id)
+    return [run_to_response(r) for r in runs]
+
+
+@router.get("/runs/stats", response_model=List[RunStatsResponse])
+def get_run_stats(days: int = 7, report_id: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Get per-report run counts, success rate and p50/p95/mean duration of
+    successful runs over the last days (today included).
+    
+    Read from a rollup kept up to date as runs finish, so the cost does not
+    grow with the run history. Percentiles are estimated within the
+    duration buckets of /metrics.
+    """
+    if days < 1 or days > run_stats.RUN_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"days must be between 1 and {run_stats.RUN_STATS_MAX_DAYS}"
+        )
+    stats = run_stats.report_stats(db, days, report_id)
+    names = dict(
+        db.query(Report.id, Report.name)
+        .filter(Report.id.in_([item["report_id"] for item in stats]))
+        .all()
+    ) if stats else {}
+    return [RunStatsResponse(report_name=names.get(item["report_id"]), **item) for item in stats]
+
+
+def _load_run_event(run_id: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
+        return run_events.run_event(run) if run is not None else None
+    finally:
+        db.close()
+
+
+@router.get("/runs/events")
+async def stream_run_events(request: Request, report_id: Optional[str] = None, run_id: Optional[str] = None):
+    """
+    Stream run state transitions (QUEUED, RUNNING, SUCCESS, FAILED) and
+    export progress as Server-Sent Events, instead of polling the run history.
+    
+    Each "run" event carries the run in the shape of GET /api/runs/{run_id}
+    (without metrics); RUNNING runs are published again with each progress
+    update. Filter with report_id or run_id; a run_id stream
+    starts with the run's current state and ends once it has finished.
+    Subscribe before reading the run history, so no transition in between
+    is missed.
+    """
+    subscription = run_events.broker.subscribe(report_id, run_id)
+    initial = None
+    if run_id:
+        try:
+            initial = await run_in_threadpool(_load_run_event, run_id)
+        except Exception:
+            run_events.broker.unsubscribe(subscription)
+            raise
+        if initial is None:
+            run_events.broker.unsubscribe(subscription)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Run with id {run_id} not found"
+            )
+    
+    def message(event_id: int, event: dict) -> str:
+        return f"id: {event_id}\nevent: run\ndata: {json.dumps(event)}\n\n"
+    
+    async def stream():
+        try:
+            if initial is not None:
+                yield message(0, initial)
+                if initial["status"] in run_events.FINISHED_STATUSES:
+                    return
+            while True:
+                try:
+                    event_id, event = await asyncio.wait_for(
+                        subscription.queue.get(), run_events.RUN_EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message(event_id, event)
+                if run_id and event["status"] in run_events.FINISHED_STATUSES:
+                    return
+        finally:
+            run_events.broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/runs/{run_id}", response_model=ReportRunResponse)
 def get_run_details(run_id: str, db: Session = Depends(get_db)):  # Changed from UUID to str
     """
-    Get details of a specific run.
+    Get details of a specific run, including its phase timings and resource
+    usage, or its export progress while it is RUNNING.
     """
     run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
     if not run:
@@ -129,23 +450,28 @@ def get_run_details(run_id: str, db: Session = Depends(get_db)):  # Changed from
             detail=f"Run with id {run_id} not found"
         )
     
-    # Convert to response format manually to ensure proper serialization
-    return ReportRunResponse(
-        id=str(run.id),
-        report_id=str(run.report_id),
-        started_at=run.started_at.isoformat() if run.started_at else "",
-        finished_at=run.finished_at.isoformat() if run.finished_at else None,
-        status=run.status if isinstance(run.status, str) else run.status.value,
-        row_count=run.row_count,
-        output_path=run.output_path,
-        error_message=run.error_message
-    )
+    return run_to_response(run, include_metrics=True)
+
+
+def _accepts_encoding(request: Request, encoding: str) -> bool:
+    """Check whether the client's Accept-Encoding header allows an encoding."""
+    accept = request.headers.get("accept-encoding", "")
+    for part in accept.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != encoding:
+            continue
+        # Honour an explicit "q=0", which means "not acceptable"
+        quality = params.strip().replace(" ", "")
+        return quality not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
 
 
 @router.get("/runs/{run_id}/download")
-def download_run_output(run_id: str, db: Session = Depends(get_db)):  # Changed from UUID to str
+def download_run_output(run_id: str, request: Request, db: Session = Depends(get_db)):  # Changed from UUID to str
     """
-    Download the CSV output file for a specific run.
+    Download the output file (CSV, JSON, JSON Lines or Parquet) for a specific run.
+    Compressed outputs are served as-is with a Content-Encoding header when the
+    client accepts the encoding, and decompressed on the fly otherwise.
     """
     run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
     if not run:
@@ -168,11 +494,31 @@ def download_run_output(run_id: str, db: Session = Depends(get_db)):  # Changed
             detail=f"Output file not found for run {run_id}"
         )
     
-    # Extract filename from path
-    filename = os.path.basename(run.output_path)
+    # Extract filename from path, without any compression extension
+    base_path, compression = split_compression(run.output_path)
+    filename = os.path.basename(base_path)
+    media_type = get_media_type(run.output_path)
+    
+    if compression is None:
+        return FileResponse(
+            path=run.output_path,
+            filename=filename,
+            media_type=media_type
+        )
+    
+    if _accepts_encoding(request, compression):
+        return FileResponse(
+            path=run.output_path,
+            filename=filename,
+            media_type=media_type,
+            headers={"Content-Encoding": compression, "Vary": "Accept-Encoding"}
+        )
     
-    return FileResponse(
-        path=run.output_path,
-        filename=filename,
-        media_type="text/csv"
+    return StreamingResponse(
+        iter_decompressed(run.output_path),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Vary": "Accept-Encoding"
+        }
     )
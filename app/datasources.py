@@ -0,0 +1,116 @@
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from typing import Dict, List
+import os
+import logging
+import threading
+
+from app.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Name of the data source used by reports that don't specify one
+DEFAULT_DATA_SOURCE = "default"
+
+# Prefix of environment variables that declare data sources,
+# e.g. DATA_SOURCE_WAREHOUSE=postgresql://... declares "warehouse"
+DATA_SOURCE_ENV_PREFIX = "DATA_SOURCE_"
+
+# Pool settings shared by all data source engines
+DATA_SOURCE_POOL_SIZE = int(os.getenv("DATA_SOURCE_POOL_SIZE", "5"))
+DATA_SOURCE_MAX_OVERFLOW = int(os.getenv("DATA_SOURCE_MAX_OVERFLOW", "5"))
+DATA_SOURCE_POOL_RECYCLE = int(os.getenv("DATA_SOURCE_POOL_RECYCLE", "1800"))
+DATA_SOURCE_POOL_TIMEOUT = int(os.getenv("DATA_SOURCE_POOL_TIMEOUT", "30"))
+
+# Pool settings are read from these, so they are not data sources themselves
+_POOL_SETTINGS = {"POOL_SIZE", "MAX_OVERFLOW", "POOL_RECYCLE", "POOL_TIMEOUT"}
+
+
+def _load_data_source_urls() -> Dict[str, str]:
+    """
+    Read data source URLs from the environment.
+    The "default" data source points at DATABASE_URL unless overridden with
+    DATA_SOURCE_DEFAULT.
+    """
+    urls = {DEFAULT_DATA_SOURCE: DATABASE_URL}
+    for key, value in os.environ.items():
+        if not key.startswith(DATA_SOURCE_ENV_PREFIX) or not value:
+            continue
+        suffix = key[len(DATA_SOURCE_ENV_PREFIX):]
+        if suffix in _POOL_SETTINGS:
+            continue
+        urls[suffix.lower()] = value
+    return urls
+
+
+class DataSourceRegistry:
+    """
+    Named connection URLs, each with its own lazily created pooled engine.
+    Report queries run on these engines so they never share a connection or
+    transaction with the metadata session.
+    """
+
+    def __init__(self, urls: Dict[str, str]):
+        self._urls = dict(urls)
+        self._engines: Dict[str, Engine] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        """Return the configured data source names."""
+        return sorted(self._urls)
+
+    def exists(self, name: str) -> bool:
+        """Check whether a data source is configured."""
+        return (name or DEFAULT_DATA_SOURCE) in self._urls
+
+    def get_engine(self, name: str = None) -> Engine:
+        """
+        Return the pooled engine of a data source, creating it on first use.
+
+        Raises:
+            ValueError: if the data source is not configured
+        """
+        name = name or DEFAULT_DATA_SOURCE
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self._engines.get(name)
+            if engine is None:
+                if name not in self._urls:
+                    raise ValueError(f"Unknown data source: {name}")
+                engine = self._engines[name] = _create_pooled_engine(self._urls[name])
+                logger.info(f"Created engine for data source '{name}'")
+            return engine
+
+    def pool_status(self) -> Dict[str, str]:
+        """Return the pool status of each data source whose engine exists."""
+        return {name: engine.pool.status() for name, engine in self._engines.items()}
+
+    def dispose(self):
+        """Close all pooled connections."""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+def _create_pooled_engine(url: str) -> Engine:
+    """Create an engine with a connection pool for report queries."""
+    if url.startswith("sqlite"):
+        # SQLite connections are cheap; the default pool is fine
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    return create_engine(
+        url,
+        pool_size=DATA_SOURCE_POOL_SIZE,
+        max_overflow=DATA_SOURCE_MAX_OVERFLOW,
+        pool_pre_ping=True,  # Detect connections dropped by the server or a proxy
+        pool_recycle=DATA_SOURCE_POOL_RECYCLE,
+        pool_timeout=DATA_SOURCE_POOL_TIMEOUT
+    )
+
+
+# Global registry instance
+data_sources = DataSourceRegistry(_load_data_source_urls())
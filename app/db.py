@@ -1,7 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
 import os
 import logging
 from dotenv import load_dotenv
@@ -28,16 +27,33 @@ else:
 
 # Create engine with connection pooling
 # SQLite requires check_same_thread=False for FastAPI
-connect_args = {}
 if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        echo=False  # Set to True for SQL query logging
+    )
 
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=NullPool if not DATABASE_URL.startswith("sqlite") else None,  # SQLite doesn't need NullPool
-    connect_args=connect_args,
-    echo=False  # Set to True for SQL query logging
-)
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # Exports of the default data source stream from a second connection
+        # to this file. In WAL mode their open reads don't block the writes
+        # made meanwhile (run progress, coalesced triggers); in the default
+        # rollback journal mode every such write waits out the busy timeout
+        # and fails. In-memory databases ignore this.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+else:
+    # Keep connections open between requests instead of reconnecting every time
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_pre_ping=True,
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        echo=False  # Set to True for SQL query logging
+    )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -58,6 +74,32 @@ def get_db():
         db.close()
 
 
+def upgrade_db():
+    """
+    Add columns and indexes that were introduced after a table was first
+    created. create_all() only creates missing tables, so existing databases
+    would otherwise be missing newer nullable columns and indexes.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                index.create(bind=conn)
+                logger.info(f"Created index {index.name} on {table.name}")
+
+
 def init_db():
     """
     Initialize database by creating all tables.
@@ -65,6 +107,7 @@ def init_db():
     """
     try:
         Base.metadata.create_all(bind=engine)
+        upgrade_db()
         logger = logging.getLogger(__name__)
         logger.info("Database tables created successfully")
     except Exception as e:
@@ -1,15 +1,19 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 import logging
 import os
 import traceback
 
-from app.db import init_db
-from app.api import reports, runs
+from app.db import init_db, SessionLocal
+from app.api import reports, runs, datasources
 from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.executor import stop_executor
+from app.services import run_stats
+from app.datasources import data_sources
+from app.services.metrics import RequestMetricsMiddleware, render_metrics
 
 # Configure logging
 logging.basicConfig(
@@ -32,11 +36,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Run history paging
 )
 
+# Per-route request latency for /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(reports.router)
 app.include_router(runs.router)
+app.include_router(datasources.router)
 
 
 # Global exception handler to ensure JSON errors
@@ -81,6 +90,15 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
     
+    # Build the run stats rollup from the run history on first start
+    db = SessionLocal()
+    try:
+        run_stats.backfill(db)
+    except Exception as e:
+        logger.error(f"Error building run stats: {str(e)}")
+    finally:
+        db.close()
+    
     # Start scheduler
     try:
         start_scheduler()
@@ -100,6 +118,15 @@ async def shutdown_event():
         logger.info("Scheduler stopped")
     except Exception as e:
         logger.error(f"Error stopping scheduler: {str(e)}")
+    
+    try:
+        stop_executor()
+        logger.info("Run executor stopped")
+    except Exception as e:
+        logger.error(f"Error stopping run executor: {str(e)}")
+    
+    # Close pooled data source connections
+    data_sources.dispose()
 
 
 @app.get("/")
@@ -117,7 +144,9 @@ async def root():
         "ui": "/ui",
         "endpoints": {
             "reports": "/api/reports",
-            "runs": "/api/runs"
+            "runs": "/api/runs",
+            "data_sources": "/api/data-sources",
+            "metrics": "/metrics"
         }
     }
 
@@ -128,3 +157,11 @@ async def health_check():
     Health check endpoint.
     """
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus metrics for runs, the run executor, the scheduler and the API.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
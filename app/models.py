@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, Date, DateTime, Float, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -21,6 +21,29 @@ class RunStatus(str, enum.Enum):
     FAILED = "FAILED"
 
 
+class ConcurrencyPolicy(str, enum.Enum):
+    COALESCE = "COALESCE"  # Attach to the run already in flight
+    QUEUE = "QUEUE"  # Run after the in-flight run finishes
+    REJECT = "REJECT"  # Refuse to start another run
+
+
+class RunPriority(str, enum.Enum):
+    HIGH = "HIGH"
+    NORMAL = "NORMAL"
+    LOW = "LOW"
+
+
+class IncrementalMode(str, enum.Enum):
+    APPEND = "APPEND"  # Output holds the previous output plus the new rows (Parquet: one segment per run)
+    DELTA = "DELTA"  # Output holds only the new rows
+
+
+class LeaseStatus(str, enum.Enum):
+    CLAIMED = "CLAIMED"  # A node is executing the fire
+    DONE = "DONE"
+    ABANDONED = "ABANDONED"  # Given up after too many expired attempts
+
+
 class NotificationChannel(str, enum.Enum):
     EMAIL = "EMAIL"
     LOG = "LOG"
@@ -38,14 +61,26 @@ class Report(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     sql_query = Column(Text, nullable=False)
+    data_source = Column(String(100), nullable=True)  # None means the "default" data source
     schedule_cron = Column(String(100), nullable=False)
     output_format = Column(String(50), default="CSV")
+    compression = Column(String(20), nullable=True)  # None, "gzip" or "zstd"
+    concurrency_policy = Column(String(20), default=ConcurrencyPolicy.COALESCE.value)
+    cache_ttl_seconds = Column(Integer, nullable=True)  # None or 0 disables the result cache
+    watermark_column = Column(String(255), nullable=True)  # Set for incremental reports
+    incremental_mode = Column(String(20), default=IncrementalMode.APPEND.value)
+    priority = Column(String(20), default=RunPriority.NORMAL.value)  # Dispatch order within the pool
+    execution_pool = Column(String(50), default="default")  # Named pool the report's runs execute on
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
 
     # Relationships
     runs = relationship("ReportRun", back_populates="report", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("idx_reports_is_active", "is_active"),
+    )
+
     def __repr__(self):
         return f"<Report(id={self.id}, name={self.name}, is_active={self.is_active})>"
 
@@ -55,21 +90,89 @@ class ReportRun(Base):
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
     report_id = Column(String(36), ForeignKey("reports.id"), nullable=False)
-    started_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=False)  # When the run was created; never changes
+    running_at = Column(DateTime, nullable=True)  # When it left the queue
     finished_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Float, nullable=True)  # finished_at - running_at
     status = Column(String(20), nullable=False, default=RunStatus.QUEUED.value)
     row_count = Column(Integer, nullable=True)
     output_path = Column(String(500), nullable=True)
+    output_bytes = Column(BigInteger, nullable=True)
+    row_group_count = Column(Integer, nullable=True)  # Parquet outputs only
+    coalesced_count = Column(Integer, default=0)  # Triggers attached to this run
+    cache_hit = Column(Boolean, default=False)  # Output served from the result cache
+    watermark_value = Column(Text, nullable=True)  # High-water mark after this run
+    watermark_type = Column(String(20), nullable=True)  # Python type of watermark_value
     error_message = Column(Text, nullable=True)
+    # Export progress while RUNNING, saved every RUN_PROGRESS_INTERVAL_SECONDS
+    progress_rows = Column(BigInteger, nullable=True)
+    progress_bytes = Column(BigInteger, nullable=True)
+    progress_rows_per_second = Column(Float, nullable=True)  # Over the last interval
+    progress_expected_rows = Column(BigInteger, nullable=True)  # From previous runs of the report
+    progress_eta_at = Column(DateTime, nullable=True)
+    progress_updated_at = Column(DateTime, nullable=True)
 
     # Relationships
     report = relationship("Report", back_populates="runs")
     notifications = relationship("NotificationLog", back_populates="report_run", cascade="all, delete-orphan")
+    metrics = relationship("RunMetrics", back_populates="report_run", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Run history of a report, newest first, paged by (started_at, id)
+        Index("idx_report_runs_report_id_started_at", "report_id", "started_at", "id"),
+        Index("idx_report_runs_status", "status"),
+        Index("idx_report_runs_started_at", "started_at"),
+        # Run search across reports (GET /api/runs)
+        Index("idx_report_runs_status_started_at", "status", "started_at"),
+        Index("idx_report_runs_duration_seconds", "duration_seconds"),
+    )
 
     def __repr__(self):
         return f"<ReportRun(id={self.id}, report_id={self.report_id}, status={self.status})>"
 
 
+class RunMetrics(Base):
+    __tablename__ = "run_metrics"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    report_run_id = Column(String(36), ForeignKey("report_runs.id"), nullable=False, unique=True)
+    # Wall time per phase, in seconds
+    queue_seconds = Column(Float, nullable=True)
+    query_seconds = Column(Float, nullable=True)
+    fetch_seconds = Column(Float, nullable=True)
+    serialize_seconds = Column(Float, nullable=True)
+    write_seconds = Column(Float, nullable=True)
+    notify_seconds = Column(Float, nullable=True)
+    total_seconds = Column(Float, nullable=True)  # From RUNNING to notification sent
+    rows_per_second = Column(Float, nullable=True)
+    bytes_written = Column(BigInteger, nullable=True)
+    peak_memory_bytes = Column(BigInteger, nullable=True)  # Only with RUN_PROFILE_MEMORY
+    created_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    report_run = relationship("ReportRun", back_populates="metrics")
+
+    def __repr__(self):
+        return f"<RunMetrics(report_run_id={self.report_run_id}, total_seconds={self.total_seconds})>"
+
+
+class RunStatsBucket(Base):
+    __tablename__ = "run_stats"
+
+    # Rollup of finished runs, updated as each run finishes, so run stats
+    # never scan the run history. One row per report, day (of finished_at),
+    # status and duration bucket.
+    report_id = Column(String(36), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    bucket = Column(Integer, primary_key=True)  # Index into run_stats.DURATION_BUCKETS; -1 without a duration
+    run_count = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<RunStatsBucket(report_id={self.report_id}, day={self.day}, status={self.status}, bucket={self.bucket})>"
+
+
 class NotificationLog(Base):
     __tablename__ = "notification_log"
 
@@ -83,5 +186,62 @@ class NotificationLog(Base):
     # Relationships
     report_run = relationship("ReportRun", back_populates="notifications")
 
+    __table_args__ = (
+        Index("idx_notification_log_report_run_id", "report_run_id"),
+    )
+
     def __repr__(self):
         return f"<NotificationLog(id={self.id}, report_run_id={self.report_run_id}, status={self.status})>"
+
+
+class ResultCacheEntry(Base):
+    __tablename__ = "result_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # SQL fingerprint + data source + format
+    file_path = Column(String(500), nullable=False)
+    extension = Column(String(20), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ResultCacheEntry(cache_key={self.cache_key}, size_bytes={self.size_bytes})>"
+
+
+class ScheduleLease(Base):
+    __tablename__ = "schedule_leases"
+
+    # One row per scheduled fire; the primary key makes claiming a fire exclusive
+    report_id = Column(String(36), primary_key=True)
+    fire_time = Column(DateTime, primary_key=True)
+    owner = Column(String(255), nullable=False)  # Node ID of the current holder
+    status = Column(String(20), nullable=False, default=LeaseStatus.CLAIMED.value)
+    attempts = Column(Integer, nullable=False, default=1)
+    claimed_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ScheduleLease(report_id={self.report_id}, fire_time={self.fire_time}, owner={self.owner}, status={self.status})>"
+
+
+class RunQueueEntry(Base):
+    __tablename__ = "run_queue"
+
+    # Durable queue of runs executed by worker processes (RUN_DISPATCH=worker).
+    # An entry lives from enqueue until its run has finished.
+    run_id = Column(String(36), primary_key=True)
+    report_id = Column(String(36), nullable=False)
+    # Set for COALESCE and REJECT runs: at most one such run per report is pending
+    exclusive_report_id = Column(String(36), nullable=True, unique=True)
+    # Set while claimed: at most one run per report executes across all workers
+    running_report_id = Column(String(36), nullable=True, unique=True)
+    enqueued_at = Column(DateTime, nullable=False, index=True)
+    pool = Column(String(50), nullable=True, index=True)  # None means the default pool
+    priority = Column(Integer, nullable=True, default=0)  # Higher is claimed first
+    claimed_by = Column(String(255), nullable=True)  # Worker ID
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RunQueueEntry(run_id={self.run_id}, report_id={self.report_id}, claimed_by={self.claimed_by})>"
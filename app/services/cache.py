@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+import logging
+import os
+import shutil
+
+from app.datasources import DEFAULT_DATA_SOURCE
+from app.models import Report, ResultCacheEntry
+from app.services.exporter import build_output_path
+from app.utils.fingerprint import sql_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Directory holding cached result files
+RESULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR",
+    os.path.join(os.getenv("OUTPUT_DIR", "./outputs"), ".cache")
+)
+
+# Total size of cached result files; least recently used entries are evicted beyond this
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+
+def cache_key(report: Report) -> str:
+    """
+    Build the result cache key of a report.
+    Reports whose SQL only differs in whitespace, case or comments share a key
+    as long as they read from the same data source and produce the same file.
+    """
+    return sql_fingerprint(
+        report.sql_query,
+        report.data_source or DEFAULT_DATA_SOURCE,
+        (report.output_format or "CSV").upper(),
+        report.compression or ""
+    )
+
+
+def _link_or_copy(source: str, destination: str):
+    """Hard-link a file, falling back to a copy (e.g. across filesystems)."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def _output_extension(output_path: str) -> str:
+    """Return the full extension of an output file, e.g. "csv.gz"."""
+    return os.path.basename(output_path).split(".", 1)[1]
+
+
+def lookup(db: Session, key: str, ttl_seconds: int) -> Optional[ResultCacheEntry]:
+    """
+    Return a cache entry that is younger than ttl_seconds, or None.
+    A hit refreshes the entry's position in the LRU order.
+    """
+    entry = db.query(ResultCacheEntry).filter(ResultCacheEntry.cache_key == key).first()
+    if entry is None:
+        return None
+
+    now = datetime.now()
+    if entry.created_at < now - timedelta(seconds=ttl_seconds) or not os.path.exists(entry.file_path):
+        return None
+
+    entry.last_used_at = now
+    db.commit()
+    return entry
+
+
+def materialize(entry: ResultCacheEntry, output_dir: str, report_name: str) -> str:
+    """
+    Produce a run output from a cache entry by linking or copying the cached file.
+
+    Returns:
+        Path of the new output file
+    """
+    output_path = build_output_path(output_dir, report_name, entry.extension)
+    _link_or_copy(entry.file_path, output_path)
+    return output_path
+
+
+def store(db: Session, key: str, output_path: str, row_count: int):
+    """
+    Add a freshly exported output to the cache and evict old entries.
+    Failures are logged and never fail the run.
+    """
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        extension = _output_extension(output_path)
+        cache_path = os.path.join(RESULT_CACHE_DIR, f"{key}.{extension}")
+
+        # Link to a temporary name first so readers never see a partial file
+        temp_path = f"{cache_path}.tmp{os.getpid()}"
+        _link_or_copy(output_path, temp_path)
+        os.replace(temp_path, cache_path)
+
+        now = datetime.now()
+        entry = db.query(ResultCacheEntry).filter(ResultCacheEntry.cache_key == key).first()
+        if entry is None:
+            entry = ResultCacheEntry(cache_key=key)
+            db.add(entry)
+        entry.file_path = cache_path
+        entry.extension = extension
+        entry.row_count = row_count
+        entry.size_bytes = os.path.getsize(cache_path)
+        entry.created_at = now
+        entry.last_used_at = now
+        db.commit()
+
+        evict(db)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not cache result for key {key}: {str(e)}")
+
+
+def evict(db: Session, max_bytes: int = None):
+    """
+    Remove least recently used entries until the cache fits in max_bytes.
+    """
+    if max_bytes is None:
+        max_bytes = RESULT_CACHE_MAX_BYTES
+
+    entries = db.query(ResultCacheEntry).order_by(ResultCacheEntry.last_used_at.desc()).all()
+    total = 0
+    for entry in entries:
+        total += entry.size_bytes or 0
+        if total <= max_bytes:
+            continue
+        try:
+            os.remove(entry.file_path)
+        except FileNotFoundError:
+            pass
+        db.delete(entry)
+        logger.info(f"Evicted cached result {entry.cache_key} ({entry.size_bytes} bytes)")
+    db.commit()
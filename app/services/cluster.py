@@ -0,0 +1,280 @@
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from app.db import SessionLocal
+from app.models import ScheduleLease, LeaseStatus
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Coordinate scheduled fires with other replicas through the metadata database.
+# Every replica keeps scheduling all reports; a fire only executes on the
+# replica that claims its lease.
+SCHEDULER_CLUSTER_MODE = os.getenv("SCHEDULER_CLUSTER_MODE", "false").lower() in ("1", "true", "yes")
+
+# How long a claimed fire stays owned without a heartbeat
+CLUSTER_LEASE_SECONDS = int(os.getenv("CLUSTER_LEASE_SECONDS", "60"))
+
+# Interval of lease heartbeats and of the scan for expired leases
+CLUSTER_CHECK_SECONDS = int(os.getenv("CLUSTER_CHECK_SECONDS", "15"))
+
+# Expired leases are retried on another node up to this many attempts in total
+CLUSTER_MAX_ATTEMPTS = int(os.getenv("CLUSTER_MAX_ATTEMPTS", "3"))
+
+# Delay before claiming a fire, per scheduled run already executing on this
+# node, so idle replicas tend to win the claim
+CLUSTER_CLAIM_STAGGER = float(os.getenv("CLUSTER_CLAIM_STAGGER", "0.1"))
+
+# Finished leases are deleted after this many hours
+CLUSTER_LEASE_RETENTION_HOURS = int(os.getenv("CLUSTER_LEASE_RETENTION_HOURS", "24"))
+
+lease_claims_total = metrics.registry.register(metrics.Counter(
+    "cluster_lease_claims_total",
+    "Scheduled fires by claim outcome on this node",
+    ["outcome"]
+))
+
+
+def _default_node_id() -> str:
+    return os.getenv("NODE_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def fire_slot(now: datetime = None) -> datetime:
+    """
+    Return the fire time every replica derives for a scheduled fire.
+    Cron schedules fire at most once a minute, so the minute identifies the fire.
+    """
+    return (now or datetime.now()).replace(second=0, microsecond=0)
+
+
+class LeaseCoordinator:
+    """
+    Exactly-once execution of scheduled fires across replicas.
+
+    A fire is claimed by inserting its (report_id, fire_time) lease row; the
+    primary key lets only one node succeed. The owner renews its leases from a
+    heartbeat thread while the run executes. If a node dies, its leases expire
+    and the next node to scan for them takes them over and runs the fire.
+    """
+
+    def __init__(self, lease_seconds: int, check_seconds: int, max_attempts: int):
+        self.lease_seconds = lease_seconds
+        self.check_seconds = check_seconds
+        self.max_attempts = max_attempts
+        self.node_id = None
+        self._in_progress = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, on_recovered: Callable[[str, datetime], None]):
+        """
+        Start the heartbeat thread.
+
+        Args:
+            on_recovered: Called with (report_id, fire_time) for each expired
+                lease this node took over; it must run the fire and release it
+        """
+        if self._thread is not None:
+            return
+        if self.node_id is None:
+            self.node_id = _default_node_id()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(on_recovered,), name="lease-heartbeat", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Cluster mode enabled, node ID {self.node_id}")
+
+    def stop(self):
+        """Stop the heartbeat thread. Leases still held expire for other nodes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_seconds)
+            self._thread = None
+
+    def claim(self, report_id: str, fire_time: datetime) -> bool:
+        """Try to claim a fire. Returns False if another node already has it."""
+        with self._lock:
+            in_progress = self._in_progress
+        if in_progress and CLUSTER_CLAIM_STAGGER > 0:
+            time.sleep(min(in_progress, 10) * CLUSTER_CLAIM_STAGGER)
+
+        now = datetime.now()
+        db = SessionLocal()
+        try:
+            db.add(ScheduleLease(
+                report_id=report_id,
+                fire_time=fire_time,
+                owner=self.node_id,
+                status=LeaseStatus.CLAIMED.value,
+                attempts=1,
+                claimed_at=now,
+                expires_at=now + timedelta(seconds=self.lease_seconds)
+            ))
+            db.commit()
+            lease_claims_total.inc(outcome="claimed")
+            return True
+        except IntegrityError:
+            db.rollback()
+            lease_claims_total.inc(outcome="lost")
+            return False
+        finally:
+            db.close()
+
+    def release(self, report_id: str, fire_time: datetime):
+        """Mark a fire held by this node as done."""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(ScheduleLease)
+                .where(
+                    ScheduleLease.report_id == report_id,
+                    ScheduleLease.fire_time == fire_time,
+                    ScheduleLease.owner == self.node_id
+                )
+                .values(status=LeaseStatus.DONE.value)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not release lease of report {report_id} at {fire_time}: {str(e)}")
+        finally:
+            db.close()
+
+    def execute(self, report_id: str, fire_time: datetime, func: Callable[[str], Optional[Future]]):
+        """
+        Run a fire this node holds and release its lease afterwards.
+        If func returns a Future, the lease is kept until the future is done.
+        """
+        with self._lock:
+            self._in_progress += 1
+
+        def finish(_=None):
+            with self._lock:
+                self._in_progress -= 1
+            self.release(report_id, fire_time)
+
+        try:
+            result = func(report_id)
+        except Exception:
+            finish()
+            raise
+        if isinstance(result, Future):
+            result.add_done_callback(finish)
+        else:
+            finish()
+
+    def run(self, report_id: str, fire_time: datetime, func: Callable[[str], None]) -> bool:
+        """
+        Claim a fire and run it if the claim succeeded.
+
+        Returns:
+            Whether this node executed the fire
+        """
+        if not self.claim(report_id, fire_time):
+            return False
+        self.execute(report_id, fire_time, func)
+        return True
+
+    def _heartbeat(self, db, now: datetime):
+        db.execute(
+            update(ScheduleLease)
+            .where(
+                ScheduleLease.owner == self.node_id,
+                ScheduleLease.status == LeaseStatus.CLAIMED.value
+            )
+            .values(expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.commit()
+
+    def _take_over_expired(self, db, now: datetime) -> List[Tuple[str, datetime]]:
+        # Plain tuples, so the commits below don't reload changed rows
+        expired = (
+            db.query(
+                ScheduleLease.report_id, ScheduleLease.fire_time,
+                ScheduleLease.owner, ScheduleLease.attempts
+            )
+            .filter(
+                ScheduleLease.status == LeaseStatus.CLAIMED.value,
+                ScheduleLease.expires_at < now
+            )
+            .all()
+        )
+
+        taken = []
+        for lease in expired:
+            if lease.attempts >= self.max_attempts:
+                values = {"status": LeaseStatus.ABANDONED.value}
+            else:
+                values = {
+                    "owner": self.node_id,
+                    "attempts": lease.attempts + 1,
+                    "claimed_at": now,
+                    "expires_at": now + timedelta(seconds=self.lease_seconds)
+                }
+            # Conditional on the row being unchanged, so only one node wins
+            result = db.execute(
+                update(ScheduleLease)
+                .where(
+                    ScheduleLease.report_id == lease.report_id,
+                    ScheduleLease.fire_time == lease.fire_time,
+                    ScheduleLease.owner == lease.owner,
+                    ScheduleLease.status == LeaseStatus.CLAIMED.value,
+                    ScheduleLease.expires_at < now
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            if result.rowcount != 1:
+                continue
+            if "owner" in values:
+                logger.warning(
+                    f"Took over expired lease of report {lease.report_id} at {lease.fire_time} from {lease.owner}"
+                )
+                lease_claims_total.inc(outcome="recovered")
+                taken.append((lease.report_id, lease.fire_time))
+            else:
+                logger.error(
+                    f"Abandoned fire of report {lease.report_id} at {lease.fire_time} after {lease.attempts} attempts"
+                )
+        return taken
+
+    def _prune(self, db, now: datetime):
+        db.execute(
+            delete(ScheduleLease)
+            .where(
+                ScheduleLease.status != LeaseStatus.CLAIMED.value,
+                ScheduleLease.fire_time < now - timedelta(hours=CLUSTER_LEASE_RETENTION_HOURS)
+            )
+        )
+        db.commit()
+
+    def _loop(self, on_recovered: Callable[[str, datetime], None]):
+        while not self._stop.wait(self.check_seconds):
+            db = SessionLocal()
+            try:
+                now = datetime.now()
+                self._heartbeat(db, now)
+                for report_id, fire_time in self._take_over_expired(db, now):
+                    on_recovered(report_id, fire_time)
+                self._prune(db, now)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Lease heartbeat failed: {str(e)}")
+            finally:
+                db.close()
+
+
+# Global coordinator instance
+coordinator = LeaseCoordinator(CLUSTER_LEASE_SECONDS, CLUSTER_CHECK_SECONDS, CLUSTER_MAX_ATTEMPTS)
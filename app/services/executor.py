@@ -0,0 +1,265 @@
+from concurrent.futures import Future
+from typing import Dict, Hashable
+import heapq
+import itertools
+import logging
+import os
+import threading
+
+from app.db import SessionLocal
+from app.models import ReportRun
+from app.services.runner import run_report
+from app.services import metrics
+from app.services import run_queue
+from app.services.pools import POOL_SIZES, DEFAULT_POOL
+
+logger = logging.getLogger(__name__)
+
+# Number of runs allowed to wait for a free worker in each pool before new
+# runs are rejected
+RUN_QUEUE_SIZE = int(os.getenv("RUN_QUEUE_SIZE", "100"))
+
+
+class QueueFullError(Exception):
+    """Raised when a run is submitted while the run queue is full."""
+    pass
+
+
+class RunPool:
+    """
+    Named pool of worker threads with a bounded priority queue.
+
+    At most max_workers runs execute at once and at most max_queue more wait
+    for a worker; anything beyond that is rejected with QueueFullError.
+    Waiting runs are dispatched highest priority first, then in submission order.
+    Runs with the same key (the report) never execute at once: while one
+    executes, the others stay queued instead of holding a worker, so a burst
+    of QUEUE-policy runs of one report can't starve the pool's other reports.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (-priority, sequence, future, func, args, key)
+        self._sequence = itertools.count()
+        self._threads = []
+        self._active = 0
+        self._running_keys = set()
+        self._shutdown = False
+
+    def submit(self, func, *args, priority: int = 0, key: Hashable = None) -> Future:
+        """
+        Submit a callable to run on the pool, after any running callable
+        submitted with the same key.
+
+        Raises:
+            QueueFullError: if max_workers + max_queue runs are already pending
+        """
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError(f"Pool {self.name} is shut down")
+            if self._active + len(self._queue) >= self.max_workers + self.max_queue:
+                raise QueueFullError(
+                    f"Run queue of pool '{self.name}' is full "
+                    f"({self.max_queue} queued, {self.max_workers} running)"
+                )
+            heapq.heappush(self._queue, (-priority, next(self._sequence), future, func, args, key))
+            # Threads are started on demand and then kept for the pool's lifetime
+            if len(self._threads) < self.max_workers and len(self._queue) > len(self._threads) - self._active:
+                thread = threading.Thread(
+                    target=self._work_loop,
+                    name=f"report-run-{self.name}-{len(self._threads)}",
+                    daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        """Pop the first queued entry whose key isn't executing, or None."""
+        skipped = []
+        entry = None
+        while self._queue:
+            candidate = heapq.heappop(self._queue)
+            if candidate[5] is None or candidate[5] not in self._running_keys:
+                entry = candidate
+                break
+            skipped.append(candidate)
+        for candidate in skipped:
+            heapq.heappush(self._queue, candidate)
+        return entry
+
+    def _work_loop(self):
+        while True:
+            with self._cond:
+                entry = None
+                while not self._shutdown:
+                    entry = self._next()
+                    if entry is not None:
+                        break
+                    self._cond.wait()
+                if self._shutdown:
+                    return
+                _, _, future, func, args, key = entry
+                self._active += 1
+                if key is not None:
+                    self._running_keys.add(key)
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(*args))
+                    except Exception as e:
+                        logger.error(f"Background run failed: {str(e)}")
+                        future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    if key is not None:
+                        # Runs of the same key may have been held back
+                        self._running_keys.discard(key)
+                        self._cond.notify()
+
+    def stats(self) -> dict:
+        """Return current worker and queue usage."""
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "active_workers": self._active,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+            }
+
+    def shutdown(self):
+        """Stop accepting runs and cancel runs that have not started."""
+        with self._cond:
+            self._shutdown = True
+            queued, self._queue = self._queue, []
+            self._cond.notify_all()
+        for _, _, future, _, _, _ in queued:
+            future.cancel()
+
+
+class RunExecutor:
+    """Background report runs, executed on the pool each run is placed in."""
+
+    def __init__(self, pool_sizes: Dict[str, int], max_queue: int):
+        self.pools = {name: RunPool(name, size, max_queue) for name, size in pool_sizes.items()}
+
+    def submit(self, pool: str, priority: int, func, *args, key: Hashable = None) -> Future:
+        """
+        Submit a callable to a named pool (see RunPool.submit).
+
+        Raises:
+            QueueFullError: if the pool's queue is full
+        """
+        run_pool = self.pools.get(pool) or self.pools[DEFAULT_POOL]
+        return run_pool.submit(func, *args, priority=priority, key=key)
+
+    def stats(self) -> dict:
+        """Return worker and queue usage, in total and per pool."""
+        pools = {name: run_pool.stats() for name, run_pool in self.pools.items()}
+        return {
+            "max_workers": sum(p["max_workers"] for p in pools.values()),
+            "active_workers": sum(p["active_workers"] for p in pools.values()),
+            "queue_depth": sum(p["queue_depth"] for p in pools.values()),
+            "max_queue": sum(p["max_queue"] for p in pools.values()),
+            "pools": pools,
+        }
+
+    def shutdown(self):
+        """Stop all pools."""
+        for run_pool in self.pools.values():
+            run_pool.shutdown()
+
+
+# Global executor instance
+run_executor = RunExecutor(POOL_SIZES, RUN_QUEUE_SIZE)
+
+# Read at scrape time so submitting a run never touches the metrics
+metrics.register_gauge_callback(
+    "run_executor_queue_depth",
+    "Runs waiting for a free worker",
+    lambda: run_executor.stats()["queue_depth"]
+)
+metrics.register_gauge_callback(
+    "run_executor_active_workers",
+    "Runs currently executing on a worker",
+    lambda: run_executor.stats()["active_workers"]
+)
+metrics.register_gauge_callback(
+    "run_pool_utilization",
+    "Share of a pool's workers executing runs",
+    lambda: {
+        (name,): run_pool.stats()["active_workers"] / run_pool.max_workers
+        for name, run_pool in run_executor.pools.items()
+    },
+    labelnames=["pool"]
+)
+metrics.register_gauge_callback(
+    "run_pool_queue_depth",
+    "Runs waiting for a free worker, per pool",
+    lambda: {(name,): run_pool.stats()["queue_depth"] for name, run_pool in run_executor.pools.items()},
+    labelnames=["pool"]
+)
+
+
+def _execute_queued_run(run_id: str, output_dir: str = None):
+    """
+    Execute a QUEUED run on a worker thread with its own database session.
+
+    Args:
+        run_id: UUID string of the ReportRun to execute
+        output_dir: Directory for output files (defaults to ./outputs)
+    """
+    db = SessionLocal()
+    try:
+        report_run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
+        if not report_run:
+            logger.error(f"Queued run {run_id} not found")
+            return
+        run_report(db, report_run, output_dir)
+    finally:
+        db.close()
+
+
+def submit_run(run_id: str, output_dir: str = None, pool: str = DEFAULT_POOL, priority: int = 0,
+               report_id: str = None):
+    """
+    Queue an existing QUEUED run for background execution.
+
+    Args:
+        run_id: UUID string of the ReportRun to execute
+        output_dir: Directory for output files (defaults to ./outputs)
+        pool: Execution pool (see pools.get_placement)
+        priority: Dispatch rank within the pool; higher runs first
+        report_id: Report of the run; its runs execute one at a time
+
+    With worker dispatch this does nothing: create_run already put the run
+    in the durable queue, and a worker process executes it.
+
+    Returns:
+        Future of the run, or None with worker dispatch
+
+    Raises:
+        QueueFullError: if the pool's queue is full
+    """
+    if run_queue.WORKER_DISPATCH:
+        return None
+    return run_executor.submit(
+        pool, priority, _execute_queued_run, str(run_id), output_dir,
+        key=str(report_id) if report_id else None
+    )
+
+
+def get_executor_stats() -> dict:
+    """Return worker and queue usage of the background run executor."""
+    return run_executor.stats()
+
+
+def stop_executor():
+    """Stop the background run executor."""
+    run_executor.shutdown()
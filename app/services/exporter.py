@@ -1,57 +1,820 @@
 import csv
+import gzip
+import io
+import json
 import os
-from datetime import datetime
-from typing import List, Dict, Any, Tuple
+import uuid
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+from typing import List, Dict, Any, Tuple, Iterator, Sequence, Callable, Union
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
+from app.services.profiling import RunProfile, timed
+from app.services.progress import ExportProgress
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is only needed for Parquet
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is only needed for zstd
+    zstandard = None
+
+
+# Number of rows fetched from the database and written per batch.
+# Peak memory is bounded by one batch, regardless of the result size.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+# Compression codec for Parquet outputs (snappy, gzip, brotli, lz4, zstd or none)
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "snappy")
+
+# Compression levels for compressed report outputs
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# Supported output compressions keyed by Report.compression, with the file
+# extension that marks a compressed output
+COMPRESSION_EXTENSIONS: Dict[str, str] = {
+    "gzip": "gz",
+    "zstd": "zst",
+}
+
+# Size of the chunks read when decompressing an output for download
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+def build_output_path(output_dir: str, report_name: str, extension: str) -> str:
+    """
+    Build a timestamped output file path for a report.
+
+    Args:
+        output_dir: Directory to save the file in (created if missing)
+        report_name: Name of the report (for file naming)
+        extension: File extension without the leading dot
+
+    Returns:
+        Absolute or relative path of the output file
+    """
+    # Ensure output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_name = "".join(c for c in report_name if c.isalnum() or c in (' ', '-', '_')).strip()
+    safe_name = safe_name.replace(' ', '_')
+    filename = f"{safe_name}_{timestamp}.{extension}"
+    output_path = os.path.join(output_dir, filename)
+
+    # Runs of the same report within one second would otherwise share a file
+    counter = 1
+    while os.path.exists(output_path):
+        output_path = os.path.join(output_dir, f"{safe_name}_{timestamp}_{counter}.{extension}")
+        counter += 1
+    return output_path
+
+
+def normalize_compression(compression: str):
+    """
+    Normalize a compression option. Empty values and "none" mean uncompressed.
+
+    Returns:
+        "gzip", "zstd" or None
+    """
+    if compression is None or compression.strip().lower() in ("", "none"):
+        return None
+    key = compression.strip().lower()
+    if key not in COMPRESSION_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported compression: {compression}. "
+            f"Must be one of: none, {', '.join(COMPRESSION_EXTENSIONS)}"
+        )
+    return key
+
+
+def open_output(output_path: str, compression: str = None):
+    """
+    Open an output file for binary writing, compressing on the fly.
+    Data is compressed as it is written, so no second pass or temp file is needed.
+
+    Args:
+        output_path: Path of the file to create
+        compression: "gzip", "zstd" or None
+
+    Returns:
+        Writable binary file object
+    """
+    if compression is None:
+        return open(output_path, 'wb')
+    if compression == "gzip":
+        return gzip.open(output_path, 'wb', compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package to be installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(output_path, 'wb'))
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def split_compression(output_path: str) -> Tuple[str, Any]:
+    """
+    Split the compression extension off an output path.
+
+    Returns:
+        Tuple of (path without compression extension, compression or None)
+    """
+    base, extension = os.path.splitext(output_path)
+    for compression, compressed_extension in COMPRESSION_EXTENSIONS.items():
+        if extension.lstrip(".").lower() == compressed_extension:
+            return base, compression
+    return output_path, None
+
+
+def iter_decompressed(output_path: str, chunk_size: int = DECOMPRESS_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the decompressed contents of a compressed output in chunks.
+    Used to serve compressed outputs to clients that cannot decode them.
+    """
+    _, compression = split_compression(output_path)
+    if compression == "gzip":
+        reader = gzip.open(output_path, 'rb')
+    elif compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd decompression requires the 'zstandard' package to be installed")
+        # Appended outputs consist of several concatenated frames
+        reader = zstandard.ZstdDecompressor().stream_reader(open(output_path, 'rb'), read_across_frames=True)
+    else:
+        reader = open(output_path, 'rb')
+
+    with reader:
+        while True:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _output_extension(extension: str, compression: str = None) -> str:
+    """Append the compression extension (if any) to a format extension."""
+    if compression is None:
+        return extension
+    return f"{extension}.{COMPRESSION_EXTENSIONS[compression]}"
+
+
+def stream_query(
+    db: Union[Session, Connection],
+    sql_query: str,
+    batch_size: int = None,
+    params: Dict[str, Any] = None,
+    on_batch: Callable[[List[str], Sequence[Any]], None] = None,
+    profile: RunProfile = None
+) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+    """
+    Execute SQL query and stream the result set in fixed-size batches.
+
+    Uses ``stream_results`` so that PostgreSQL runs the query on a
+    server-side cursor, and ``yield_per`` so that SQLite (and every other
+    driver) only buffers one batch of rows at a time.
+
+    Args:
+        db: Database session or connection to run the query on
+        sql_query: SQL query to execute
+        batch_size: Rows per batch (defaults to EXPORT_BATCH_SIZE)
+        params: Bind parameters for the query
+        on_batch: Called with (column_names, batch) for every batch before it is written
+        profile: Optional RunProfile that receives "query" and "fetch" timings
+
+    Returns:
+        Tuple of (column_names, iterator over row batches)
+    """
+    if batch_size is None:
+        batch_size = EXPORT_BATCH_SIZE
+
+    with timed(profile, "query"):
+        result = db.execute(
+            text(sql_query),
+            params or {},
+            execution_options={"stream_results": True, "yield_per": batch_size}
+        )
+
+    # Get column names from result
+    column_names = list(result.keys())
+
+    def batches():
+        try:
+            partitions = result.partitions(batch_size)
+            while True:
+                with timed(profile, "fetch"):
+                    partition = next(partitions, None)
+                if partition is None:
+                    break
+                if on_batch is not None:
+                    on_batch(column_names, partition)
+                yield partition
+        finally:
+            # Release the (server-side) cursor even if the consumer stops early
+            result.close()
+
+    return column_names, batches()
+
 
 def export_to_csv(
-    db: Session,
+    db: Union[Session, Connection],
     sql_query: str,
     output_dir: str,
-    report_name: str
+    report_name: str,
+    compression: str = None,
+    params: Dict[str, Any] = None,
+    on_batch: Callable[[List[str], Sequence[Any]], None] = None,
+    profile: RunProfile = None,
+    progress: ExportProgress = None
 ) -> Tuple[str, int]:
     """
     Execute SQL query and export results to CSV file.
-    
+
+    Rows are streamed from the database in batches of EXPORT_BATCH_SIZE and
+    each batch is written as soon as it arrives, so memory use stays flat
+    however many rows the query returns.
+
     Args:
-        db: Database session
+        db: Database session or connection to run the query on
         sql_query: SQL query to execute
         output_dir: Directory to save CSV file
         report_name: Name of the report (for file naming)
-    
+        compression: Optional output compression ("gzip" or "zstd")
+        params: Bind parameters for the query
+        on_batch: Called with (column_names, batch) for every streamed batch
+        profile: Optional RunProfile that receives per-phase timings
+        progress: Optional ExportProgress updated after every written batch
+
     Returns:
         Tuple of (output_path, row_count)
     """
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_name = "".join(c for c in report_name if c.isalnum() or c in (' ', '-', '_')).strip()
-    safe_name = safe_name.replace(' ', '_')
-    filename = f"{safe_name}_{timestamp}.csv"
-    output_path = os.path.join(output_dir, filename)
-    
+    output_path = build_output_path(output_dir, report_name, _output_extension("csv", compression))
+
     # Execute SQL query
-    result = db.execute(text(sql_query))
-    rows = result.fetchall()
-    
-    # Get column names from result
-    column_names = result.keys()
-    
+    column_names, batches = stream_query(
+        db, sql_query, params=params, on_batch=on_batch, profile=profile
+    )
+
     # Write to CSV
     row_count = 0
-    with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
+    with io.TextIOWrapper(open_output(output_path, compression), encoding='utf-8', newline='') as csvfile:
         writer = csv.writer(csvfile)
-        
+
         # Write header
         writer.writerow(column_names)
-        
-        # Write data rows
-        for row in rows:
-            writer.writerow(row)
-            row_count += 1
-    
+
+        # Write data rows one batch at a time
+        if profile is None:
+            for batch in batches:
+                writer.writerows(batch)
+                row_count += len(batch)
+                if progress is not None:
+                    progress.update(row_count, output_path)
+        else:
+            # Serialize into a buffer first so encoding and disk time are measured apart
+            buffer = io.StringIO()
+            buffer_writer = csv.writer(buffer)
+            for batch in batches:
+                with profile.phase("serialize"):
+                    buffer.seek(0)
+                    buffer.truncate()
+                    buffer_writer.writerows(batch)
+                    data = buffer.getvalue()
+                with profile.phase("write"):
+                    csvfile.write(data)
+                row_count += len(batch)
+                if progress is not None:
+                    progress.update(row_count, output_path)
+
+    return output_path, row_count
+
+
+def _json_default(obj: Any) -> Any:
+    """
+    Convert values the JSON encoder does not handle natively.
+    Decimals become strings, as a float would round money and wide NUMERIC
+    values.
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).hex()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def _json_dumps(obj: Any) -> bytes:
+        """Encode a value to JSON bytes (orjson fast path)."""
+        return orjson.dumps(obj, default=_json_default)
+else:
+    _encoder = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+    def _json_dumps(obj: Any) -> bytes:
+        """Encode a value to JSON bytes (stdlib fallback)."""
+        return _encoder.encode(obj).encode("utf-8")
+
+
+def export_to_jsonl(
+    db: Union[Session, Connection],
+    sql_query: str,
+    output_dir: str,
+    report_name: str,
+    compression: str = None,
+    params: Dict[str, Any] = None,
+    on_batch: Callable[[List[str], Sequence[Any]], None] = None,
+    profile: RunProfile = None,
+    progress: ExportProgress = None
+) -> Tuple[str, int]:
+    """
+    Execute SQL query and export results as JSON Lines (one object per row).
+
+    Args:
+        db: Database session or connection to run the query on
+        sql_query: SQL query to execute
+        output_dir: Directory to save the file
+        report_name: Name of the report (for file naming)
+        compression: Optional output compression ("gzip" or "zstd")
+        params: Bind parameters for the query
+        on_batch: Called with (column_names, batch) for every streamed batch
+        profile: Optional RunProfile that receives per-phase timings
+        progress: Optional ExportProgress updated after every written batch
+
+    Returns:
+        Tuple of (output_path, row_count)
+    """
+    output_path = build_output_path(output_dir, report_name, _output_extension("jsonl", compression))
+
+    column_names, batches = stream_query(
+        db, sql_query, params=params, on_batch=on_batch, profile=profile
+    )
+
+    row_count = 0
+    with open_output(output_path, compression) as jsonfile:
+        for batch in batches:
+            with timed(profile, "serialize"):
+                encoded = b"".join(
+                    _json_dumps(dict(zip(column_names, row))) + b"\n" for row in batch
+                )
+            with timed(profile, "write"):
+                jsonfile.write(encoded)
+            row_count += len(batch)
+            if progress is not None:
+                progress.update(row_count, output_path)
+
+    return output_path, row_count
+
+
+def export_to_json(
+    db: Union[Session, Connection],
+    sql_query: str,
+    output_dir: str,
+    report_name: str,
+    compression: str = None,
+    params: Dict[str, Any] = None,
+    on_batch: Callable[[List[str], Sequence[Any]], None] = None,
+    profile: RunProfile = None,
+    progress: ExportProgress = None
+) -> Tuple[str, int]:
+    """
+    Execute SQL query and export results as a single JSON array of objects.
+    The array is written incrementally, one batch at a time.
+
+    Args:
+        db: Database session or connection to run the query on
+        sql_query: SQL query to execute
+        output_dir: Directory to save the file
+        report_name: Name of the report (for file naming)
+        compression: Optional output compression ("gzip" or "zstd")
+        params: Bind parameters for the query
+        on_batch: Called with (column_names, batch) for every streamed batch
+        profile: Optional RunProfile that receives per-phase timings
+        progress: Optional ExportProgress updated after every written batch
+
+    Returns:
+        Tuple of (output_path, row_count)
+    """
+    output_path = build_output_path(output_dir, report_name, _output_extension("json", compression))
+
+    column_names, batches = stream_query(
+        db, sql_query, params=params, on_batch=on_batch, profile=profile
+    )
+
+    row_count = 0
+    with open_output(output_path, compression) as jsonfile:
+        jsonfile.write(b"[")
+        for batch in batches:
+            with timed(profile, "serialize"):
+                encoded = b",\n".join(_json_dumps(dict(zip(column_names, row))) for row in batch)
+            with timed(profile, "write"):
+                jsonfile.write(b",\n" if row_count else b"\n")
+                jsonfile.write(encoded)
+            row_count += len(batch)
+            if progress is not None:
+                progress.update(row_count, output_path)
+        jsonfile.write(b"\n]\n" if row_count else b"]\n")
+
     return output_path, row_count
+
+
+def _arrow_tables(column_names: List[str], batches: Iterator[Sequence[Any]], profile: RunProfile = None):
+    """
+    Convert streamed row batches into Arrow tables.
+
+    Column types are inferred from the values of each batch and only ever
+    widened: a batch whose values don't fit the types seen so far widens
+    them without loss (see _widen_type), and that table and all later ones
+    carry the wider schema. Columns that are entirely NULL in the first batch
+    are typed as strings, and values of string columns are coerced with str().
+
+    Raises:
+        ValueError: If a column's values change to a type no earlier type
+            widens to
+    """
+    schema = None
+    for batch in batches:
+        with timed(profile, "serialize"):
+            table = _arrow_table(column_names, batch, schema)
+        schema = table.schema
+        yield table
+
+
+def _arrow_table(column_names: List[str], batch: Sequence[Any], schema):
+    """Convert one batch of rows into an Arrow table (see _arrow_tables)."""
+    columns = list(zip(*batch)) if batch else [() for _ in column_names]
+
+    fields = []
+    for index, (name, column) in enumerate(zip(column_names, columns)):
+        arrow_type = _arrow_type(column)
+        if schema is None:
+            if pa.types.is_null(arrow_type):
+                arrow_type = pa.string()
+        else:
+            current = schema.field(index).type
+            widened = _widen_type(current, arrow_type)
+            if widened is None:
+                raise ValueError(f"Column {name} changes type from {current} to {arrow_type} between batches")
+            arrow_type = widened
+        fields.append(pa.field(name, arrow_type))
+
+    arrays = [
+        pa.array(
+            [None if v is None else str(v) for v in column]
+            if pa.types.is_string(field.type) else column,
+            type=field.type
+        )
+        for column, field in zip(columns, fields)
+    ]
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def _arrow_type(values: Sequence[Any]):
+    """Infer the Arrow type of a column's values; mixed values are strings."""
+    try:
+        return pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+
+
+def _widen_type(current, new):
+    """
+    Return the narrowest type that holds values of both types without loss,
+    or None if there is none:
+
+    - integers with floats become float64
+    - decimals (and integers) with decimals keep the most integer digits and
+      the largest scale of both
+    - anything with strings becomes a string
+    """
+    if current == new or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if pa.types.is_string(current) or pa.types.is_string(new):
+        return pa.string()
+    if pa.types.is_integer(current) and pa.types.is_integer(new):
+        return pa.int64()
+    numeric = (pa.types.is_integer, pa.types.is_floating)
+    if any(check(current) for check in numeric) and any(check(new) for check in numeric):
+        return pa.float64()
+    if all(pa.types.is_decimal(t) or pa.types.is_integer(t) for t in (current, new)):
+        # int64 needs up to 19 integer digits
+        digits = max(t.precision - t.scale if pa.types.is_decimal(t) else 19 for t in (current, new))
+        scale = max(t.scale if pa.types.is_decimal(t) else 0 for t in (current, new))
+        if digits + scale <= 38:
+            return pa.decimal128(digits + scale, scale)
+        if digits + scale <= 76:
+            return pa.decimal256(digits + scale, scale)
+    return None
+
+
+def _widen_schema(current, new):
+    """Widen two schemas with the same columns field by field (see _widen_type)."""
+    fields = []
+    for current_field, new_field in zip(current, new):
+        widened = _widen_type(current_field.type, new_field.type)
+        if widened is None:
+            raise ValueError(
+                f"Column {current_field.name} changes type from {current_field.type} to {new_field.type}"
+            )
+        fields.append(pa.field(current_field.name, widened))
+    return pa.schema(fields)
+
+
+def _rewrite_parquet(writer, output_path: str, schema, codec: str):
+    """
+    Close a Parquet file being written and rewrite its row groups, cast to a
+    widened schema; returns a writer of the new file. Costs one pass over the
+    rows written so far, once per widening.
+    """
+    writer.close()
+    previous_path = f"{output_path}.narrow"
+    os.replace(output_path, previous_path)
+    try:
+        previous = pq.ParquetFile(previous_path)
+        writer = pq.ParquetWriter(output_path, schema, compression=codec)
+        try:
+            for i in range(previous.num_row_groups):
+                table = previous.read_row_group(i).cast(schema)
+                writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        except Exception:
+            writer.close()
+            raise
+    finally:
+        os.remove(previous_path)
+    return writer
+
+
+def export_to_parquet(
+    db: Union[Session, Connection],
+    sql_query: str,
+    output_dir: str,
+    report_name: str,
+    compression: str = None,
+    params: Dict[str, Any] = None,
+    on_batch: Callable[[List[str], Sequence[Any]], None] = None,
+    profile: RunProfile = None,
+    progress: ExportProgress = None
+) -> Tuple[str, int]:
+    """
+    Execute SQL query and export results to a Parquet file.
+    Each streamed batch is written as its own row group, compressed with
+    PARQUET_COMPRESSION. Parquet compresses internally, so a report-level
+    compression option selects the Parquet codec instead of wrapping the file.
+    If a batch widens a column's type, the row groups written so far are
+    rewritten with the wider type (see _arrow_tables).
+
+    Args:
+        db: Database session or connection to run the query on
+        sql_query: SQL query to execute
+        output_dir: Directory to save the file
+        report_name: Name of the report (for file naming)
+        compression: Optional output compression ("gzip" or "zstd")
+        params: Bind parameters for the query
+        on_batch: Called with (column_names, batch) for every streamed batch
+        profile: Optional RunProfile that receives per-phase timings
+        progress: Optional ExportProgress updated after every written batch
+
+    Returns:
+        Tuple of (output_path, row_count)
+    """
+    if pa is None:
+        raise RuntimeError("Parquet output requires the 'pyarrow' package to be installed")
+
+    output_path = build_output_path(output_dir, report_name, "parquet")
+    codec = compression or PARQUET_COMPRESSION
+    codec = None if codec.lower() == "none" else codec
+
+    column_names, batches = stream_query(
+        db, sql_query, params=params, on_batch=on_batch, profile=profile
+    )
+
+    row_count = 0
+    writer = None
+    try:
+        for table in _arrow_tables(column_names, batches, profile):
+            with timed(profile, "write"):
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema, compression=codec)
+                elif not table.schema.equals(writer.schema):
+                    writer = _rewrite_parquet(writer, output_path, table.schema, codec)
+                writer.write_table(table, row_group_size=max(table.num_rows, 1))
+            row_count += table.num_rows
+            if progress is not None:
+                progress.update(row_count, output_path)
+
+        if writer is None:
+            # Empty result: write a file with the column names and no rows
+            schema = pa.schema([pa.field(name, pa.string()) for name in column_names])
+            writer = pq.ParquetWriter(output_path, schema, compression=codec)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return output_path, row_count
+
+
+def _skip_first_line(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Drop everything up to and including the first newline (a CSV header)."""
+    skipping = True
+    for chunk in chunks:
+        if skipping:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk = chunk[newline + 1:]
+            skipping = False
+        if chunk:
+            yield chunk
+
+
+def _append_compressed(raw, chunks: Iterator[bytes], compression: str = None):
+    """
+    Append data to an open file as a new compressed member (gzip) or frame
+    (zstd). Readers treat concatenated members/frames as one stream.
+    """
+    if compression == "gzip":
+        writer = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL)
+    elif compression == "zstd":
+        writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+    else:
+        writer = None
+
+    target = writer if writer is not None else raw
+    for chunk in chunks:
+        target.write(chunk)
+    if writer is not None:
+        writer.close()
+
+
+def append_previous_output(
+    previous_path: str,
+    output_path: str,
+    output_format: str,
+    compression: str = None
+):
+    """
+    Append a freshly exported delta to the previous output in place and move
+    the combined file to the delta's path.
+
+    Only the delta is read and written: it is added to the previous CSV or
+    JSON Lines file as a new compressed member, so each run costs I/O in the
+    size of its new rows, not of the whole history. The previous run's path
+    no longer exists afterwards. If appending fails, the previous file is
+    truncated back to its original size and left in place.
+
+    Args:
+        previous_path: Output of the previous successful run
+        output_path: Delta output, replaced by the combined output
+        output_format: Output format of both files ("CSV" or "JSONL")
+        compression: Output compression of both files
+    """
+    key = (output_format or "CSV").upper()
+    if key not in APPEND_FORMATS:
+        raise ValueError(f"Incremental APPEND in place is not supported for {output_format} outputs")
+
+    delta = iter_decompressed(output_path)
+    if key == "CSV":
+        delta = _skip_first_line(delta)
+    with open(previous_path, 'r+b') as raw:
+        size = raw.seek(0, os.SEEK_END)
+        try:
+            _append_compressed(raw, delta, compression)
+        except BaseException:
+            raw.truncate(size)
+            raise
+    os.replace(previous_path, output_path)
+
+
+def align_parquet_segment(previous_path: str, output_path: str, compression: str = None):
+    """
+    Give a Parquet APPEND segment the widened schema of the previous segment,
+    so all segments of a report can be read as one dataset.
+
+    Parquet files cannot be appended to without rewriting them, so each run
+    keeps its new rows in its own segment file. Only the previous segment's
+    footer is read; the delta is rewritten only if its schema changes.
+
+    Args:
+        previous_path: Segment of the previous successful run (skipped if gone)
+        output_path: Segment just exported
+        compression: Parquet codec of the segment
+    """
+    if pq is None:
+        raise RuntimeError("Parquet output requires the 'pyarrow' package to be installed")
+    if not previous_path or not os.path.exists(previous_path):
+        return
+    previous_schema = pq.read_schema(previous_path)
+    delta = pq.ParquetFile(output_path)
+    if delta.metadata.num_rows == 0:
+        # An empty result has untyped (string) columns; it takes the previous types
+        schema = previous_schema
+    else:
+        schema = _widen_schema(previous_schema, delta.schema_arrow)
+    if schema.equals(delta.schema_arrow):
+        return
+
+    codec = compression or PARQUET_COMPRESSION
+    codec = None if codec.lower() == "none" else codec
+    temp_path = f"{output_path}.tmp"
+    try:
+        with pq.ParquetWriter(temp_path, schema, compression=codec) as writer:
+            for i in range(delta.num_row_groups):
+                table = delta.read_row_group(i).cast(schema)
+                writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def count_row_groups(output_path: str):
+    """
+    Return the number of row groups in a Parquet output, or None for other
+    formats. Only the file footer is read.
+    """
+    if pq is None or not output_path.endswith(".parquet"):
+        return None
+    return pq.ParquetFile(output_path).metadata.num_row_groups
+
+
+# Output formats that incremental APPEND extends in place; Parquet outputs
+# keep one segment file per run instead (see align_parquet_segment)
+APPEND_FORMATS = ("CSV", "JSONL")
+
+# Exporters keyed by Report.output_format
+EXPORTERS: Dict[str, Callable[..., Tuple[str, int]]] = {
+    "CSV": export_to_csv,
+    "JSON": export_to_json,
+    "JSONL": export_to_jsonl,
+    "PARQUET": export_to_parquet,
+}
+
+# File extensions keyed by Report.output_format
+FORMAT_EXTENSIONS: Dict[str, str] = {
+    "CSV": "csv",
+    "JSON": "json",
+    "JSONL": "jsonl",
+    "PARQUET": "parquet",
+}
+
+# Media types keyed by output file extension, used when serving downloads
+MEDIA_TYPES: Dict[str, str] = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def get_exporter(output_format: str) -> Callable[..., Tuple[str, int]]:
+    """
+    Look up the exporter for an output format.
+
+    Args:
+        output_format: Output format name (case-insensitive, defaults to CSV)
+
+    Returns:
+        Exporter function with the same signature as export_to_csv
+    """
+    key = (output_format or "CSV").upper()
+    if key not in EXPORTERS:
+        raise ValueError(
+            f"Unsupported output format: {output_format}. "
+            f"Must be one of: {', '.join(EXPORTERS)}"
+        )
+    return EXPORTERS[key]
+
+
+def get_output_extension(output_format: str, compression: str = None) -> str:
+    """
+    Return the full file extension (e.g. "csv.gz") an output is written with.
+    Parquet compresses internally and never gets a compression extension.
+    """
+    key = (output_format or "CSV").upper()
+    if key == "PARQUET":
+        return FORMAT_EXTENSIONS[key]
+    return _output_extension(FORMAT_EXTENSIONS[key], compression)
+
+
+def get_media_type(output_path: str) -> str:
+    """Return the media type of an output file's (decompressed) contents."""
+    base_path, _ = split_compression(output_path)
+    extension = os.path.splitext(base_path)[1].lstrip(".").lower()
+    return MEDIA_TYPES.get(extension, "application/octet-stream")
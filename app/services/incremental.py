@@ -0,0 +1,123 @@
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+import os
+
+from app.models import Report, ReportRun, RunStatus, IncrementalMode
+from app.services.exporter import APPEND_FORMATS, get_output_extension
+
+
+class WatermarkTracker:
+    """
+    Batch observer that keeps the highest value of the watermark column
+    seen while a result set is streamed.
+    """
+
+    def __init__(self, column: str):
+        self.column = column
+        self.value = None
+        self._index = None
+
+    def __call__(self, column_names: List[str], batch: Sequence[Any]):
+        if self._index is None:
+            lowered = [name.lower() for name in column_names]
+            if self.column.lower() not in lowered:
+                raise ValueError(f"Watermark column '{self.column}' is not in the query result")
+            self._index = lowered.index(self.column.lower())
+
+        values = [row[self._index] for row in batch if row[self._index] is not None]
+        if values:
+            batch_max = max(values)
+            if self.value is None or batch_max > self.value:
+                self.value = batch_max
+
+
+def encode_watermark(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Encode a watermark value for storage.
+
+    Returns:
+        Tuple of (watermark_value, watermark_type)
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, bool):
+        return str(int(value)), "int"
+    if isinstance(value, int):
+        return str(value), "int"
+    if isinstance(value, float):
+        return repr(value), "float"
+    if isinstance(value, Decimal):
+        return str(value), "decimal"
+    if isinstance(value, datetime):
+        return value.isoformat(), "datetime"
+    if isinstance(value, date):
+        return value.isoformat(), "date"
+    return str(value), "str"
+
+
+def decode_watermark(value: Optional[str], value_type: Optional[str]) -> Any:
+    """Decode a stored watermark back to the type it was read as."""
+    if value is None:
+        return None
+    if value_type == "int":
+        return int(value)
+    if value_type == "float":
+        return float(value)
+    if value_type == "decimal":
+        return Decimal(value)
+    if value_type == "datetime":
+        return datetime.fromisoformat(value)
+    if value_type == "date":
+        return date.fromisoformat(value)
+    return value
+
+
+def build_incremental_query(sql_query: str, watermark_column: str) -> str:
+    """
+    Wrap a report query so it only returns rows past the :watermark bind parameter.
+    """
+    inner = sql_query.strip().rstrip(";")
+    return f"SELECT * FROM ({inner}) AS incremental_source WHERE {watermark_column} > :watermark"
+
+
+def appends_in_place(report: Report) -> bool:
+    """
+    Whether an incremental report extends the previous output in place
+    (APPEND mode in CSV or JSON Lines). Parquet APPEND reports keep one
+    segment file per run, like DELTA reports.
+    """
+    mode = (report.incremental_mode or IncrementalMode.APPEND.value).upper()
+    return mode == IncrementalMode.APPEND.value and (report.output_format or "CSV").upper() in APPEND_FORMATS
+
+
+def get_previous_run(db: Session, report: Report) -> Optional[ReportRun]:
+    """
+    Return the latest successful run of an incremental report that stored a
+    watermark, or None if the next run has to fetch everything.
+
+    When the output is appended in place the previous output is needed as
+    well; if it is gone, or was written in a different format or
+    compression, the next run falls back to a full export.
+    """
+    previous = (
+        db.query(ReportRun)
+        .filter(
+            ReportRun.report_id == report.id,
+            ReportRun.status == RunStatus.SUCCESS.value,
+            ReportRun.watermark_type.isnot(None)
+        )
+        .order_by(ReportRun.finished_at.desc())
+        .first()
+    )
+    if previous is None:
+        return None
+
+    if appends_in_place(report):
+        if not previous.output_path or not os.path.exists(previous.output_path):
+            return None
+        expected = get_output_extension(report.output_format, report.compression)
+        if not os.path.basename(previous.output_path).endswith(f".{expected}"):
+            return None
+    return previous
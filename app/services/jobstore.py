@@ -0,0 +1,247 @@
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+from contextlib import contextmanager
+from sqlalchemy import select
+from typing import Dict, Iterable, Optional
+import logging
+import os
+import pickle
+import threading
+
+from app.db import engine
+from app.services.cluster import SCHEDULER_CLUSTER_MODE
+
+logger = logging.getLogger(__name__)
+
+# Where scheduled jobs live: "memory" rebuilds all jobs on every start;
+# "database" keeps them in a table of the metadata database, so a restart
+# only reconciles the reports that changed and fires missed while the
+# scheduler was down can be caught up
+SCHEDULER_JOBSTORE = os.getenv("SCHEDULER_JOBSTORE", "memory").lower()
+
+# Table of the database job store. Replicas in cluster mode each need their
+# own table, so there the database store is only used if this is set.
+SCHEDULER_JOBSTORE_TABLE = os.getenv("SCHEDULER_JOBSTORE_TABLE", "")
+
+# Rows written per statement when a batch is flushed
+FLUSH_CHUNK_SIZE = 500
+
+
+class ReportJobStore(SQLAlchemyJobStore):
+    """
+    SQLAlchemy job store whose writes can be batched.
+
+    Inside batch(), jobs added, updated or removed by the batching thread are
+    collected and written in one transaction when the batch ends, instead of
+    one transaction per job. Other threads (e.g. the scheduler's own) keep
+    writing directly.
+
+    The scheduler thread advances next_run_time of jobs that fire during a
+    batch, so a batched update only writes if the job's next_run_time is
+    still the one the batch read. Otherwise the job is written with the
+    later of both next run times: a fire the scheduler already moved past is
+    never due again.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    @contextmanager
+    def batch(self):
+        """Collect this thread's writes and flush them together on exit."""
+        if getattr(self._local, "pending", None) is not None:
+            # Nested batch: the outer one flushes
+            yield
+            return
+        self._local.pending = {}
+        self._local.read = {}
+        try:
+            yield
+            pending, read = self._local.pending, self._local.read
+        finally:
+            self._local.pending = self._local.read = None
+        self._flush(pending, read)
+
+    def _pending(self):
+        return getattr(self._local, "pending", None)
+
+    def _remember(self, jobs):
+        """Note the stored next run time of jobs read by a batch, once per job."""
+        read = getattr(self._local, "read", None)
+        if read is not None:
+            for job in jobs:
+                read.setdefault(job.id, datetime_to_utc_timestamp(job.next_run_time))
+
+    def _state(self, job) -> dict:
+        return {
+            "id": job.id,
+            "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+            "job_state": pickle.dumps(job.__getstate__(), self.pickle_protocol),
+        }
+
+    def lookup_job(self, job_id):
+        pending = self._pending()
+        if pending is not None and job_id in pending:
+            operation, row = pending[job_id]
+            return None if operation == "remove" else self._reconstitute_job(row["job_state"])
+        job = super().lookup_job(job_id)
+        if job is not None:
+            self._remember([job])
+        return job
+
+    def get_all_jobs(self):
+        jobs = super().get_all_jobs()
+        self._remember(jobs)
+        return jobs
+
+    def lookup_jobs(self, job_ids: Iterable[str]) -> Dict[str, object]:
+        """Return the stored jobs among job_ids by ID, reading FLUSH_CHUNK_SIZE IDs per query."""
+        job_ids = list(job_ids)
+        columns = self.jobs_t.c
+        jobs = {}
+        with self.engine.begin() as connection:
+            for start in range(0, len(job_ids), FLUSH_CHUNK_SIZE):
+                rows = connection.execute(
+                    select(columns.id, columns.job_state)
+                    .where(columns.id.in_(job_ids[start:start + FLUSH_CHUNK_SIZE]))
+                )
+                for row in rows:
+                    jobs[row.id] = self._reconstitute_job(row.job_state)
+        return jobs
+
+    def add_job(self, job):
+        pending = self._pending()
+        if pending is None:
+            return super().add_job(job)
+        if job.id in pending and pending[job.id][0] != "remove":
+            raise ConflictingIdError(job.id)
+        pending[job.id] = ("add", self._state(job))
+
+    def update_job(self, job):
+        pending = self._pending()
+        if pending is None:
+            return super().update_job(job)
+        operation = pending.get(job.id, ("update", None))[0]
+        if operation == "remove":
+            raise JobLookupError(job.id)
+        # An update of a job added in the same batch is still an insert
+        pending[job.id] = (operation, self._state(job))
+
+    def remove_job(self, job_id):
+        pending = self._pending()
+        if pending is None:
+            return super().remove_job(job_id)
+        if job_id in pending and pending[job_id][0] == "add":
+            del pending[job_id]
+            return
+        pending[job_id] = ("remove", None)
+
+    def shutdown(self):
+        # The engine is the application's (app.db), so it is not disposed here
+        pass
+
+    def _keep_advance(self, connection, row: dict) -> Optional[dict]:
+        """
+        Return a batched update row with the stored next run time if the
+        scheduler has moved the job past the row's, or None if the job is gone.
+        """
+        columns = self.jobs_t.c
+        stored = connection.execute(
+            select(columns.next_run_time, columns.job_state).where(columns.id == row["id"])
+        ).first()
+        if stored is None:
+            return None
+        if row["next_run_time"] is None or stored.next_run_time is None or row["next_run_time"] >= stored.next_run_time:
+            return row
+        state = pickle.loads(row["job_state"])
+        state["next_run_time"] = pickle.loads(stored.job_state)["next_run_time"]
+        return {**row, "next_run_time": stored.next_run_time, "job_state": pickle.dumps(state, self.pickle_protocol)}
+
+    def _flush(self, pending: Dict[str, tuple], read: Dict[str, float]):
+        """
+        Write a batch: removals first, then inserts and updates.
+
+        Args:
+            read: Stored next run time of each job the batch read
+        """
+        if not pending:
+            return
+        by_operation = {"add": [], "update": [], "remove": []}
+        for job_id, (operation, row) in pending.items():
+            by_operation[operation].append(row if row is not None else job_id)
+
+        columns = self.jobs_t.c
+        with self.engine.begin() as connection:
+            # Adds replace leftovers of the same ID, like add_job(replace_existing=True)
+            stale = by_operation["remove"] + [row["id"] for row in by_operation["add"]]
+            for start in range(0, len(stale), FLUSH_CHUNK_SIZE):
+                connection.execute(self.jobs_t.delete().where(columns.id.in_(stale[start:start + FLUSH_CHUNK_SIZE])))
+            for start in range(0, len(by_operation["add"]), FLUSH_CHUNK_SIZE):
+                connection.execute(self.jobs_t.insert(), by_operation["add"][start:start + FLUSH_CHUNK_SIZE])
+            for row in by_operation["update"]:
+                statement = self.jobs_t.update().where(columns.id == row["id"])
+                if row["id"] in read:
+                    base = read[row["id"]]
+                    statement = statement.where(
+                        columns.next_run_time.is_(None) if base is None else columns.next_run_time == base
+                    )
+                result = connection.execute(
+                    statement.values(next_run_time=row["next_run_time"], job_state=row["job_state"])
+                )
+                if result.rowcount == 0 and row["id"] in read:
+                    # The scheduler moved the job on since the batch read it
+                    row = self._keep_advance(connection, row)
+                    if row is not None:
+                        connection.execute(
+                            self.jobs_t.update()
+                            .where(columns.id == row["id"])
+                            .values(next_run_time=row["next_run_time"], job_state=row["job_state"])
+                        )
+        logger.info(
+            f"Wrote scheduler jobs: {len(by_operation['add'])} added, "
+            f"{len(by_operation['update'])} updated, {len(by_operation['remove'])} removed"
+        )
+
+
+def build_jobstore():
+    """Return the default job store selected by SCHEDULER_JOBSTORE."""
+    if SCHEDULER_JOBSTORE == "database":
+        if not SCHEDULER_CLUSTER_MODE:
+            return ReportJobStore(engine=engine, tablename=SCHEDULER_JOBSTORE_TABLE or "apscheduler_jobs")
+        if SCHEDULER_JOBSTORE_TABLE:
+            return ReportJobStore(engine=engine, tablename=SCHEDULER_JOBSTORE_TABLE)
+        logger.warning(
+            "SCHEDULER_JOBSTORE=database needs a SCHEDULER_JOBSTORE_TABLE per replica in cluster mode; "
+            "keeping scheduled jobs in memory"
+        )
+    elif SCHEDULER_JOBSTORE != "memory":
+        logger.error(f"Unknown SCHEDULER_JOBSTORE '{SCHEDULER_JOBSTORE}', keeping scheduled jobs in memory")
+    return MemoryJobStore()
+
+
+def lookup_jobs(store, job_ids: Iterable[str]) -> Dict[str, object]:
+    """
+    Return the jobs of a job store among job_ids by ID, with one query for
+    a database store instead of one per job.
+    """
+    if isinstance(store, ReportJobStore):
+        return store.lookup_jobs(job_ids)
+    if isinstance(store, MemoryJobStore):
+        # Lookups in memory are dictionary accesses
+        jobs = (store.lookup_job(job_id) for job_id in job_ids)
+        return {job.id: job for job in jobs if job is not None}
+    wanted = set(job_ids)
+    return {job.id: job for job in store.get_all_jobs() if job.id in wanted}
+
+
+@contextmanager
+def batch(store):
+    """Batch the writes of a job store if it supports it."""
+    if isinstance(store, ReportJobStore):
+        with store.batch():
+            yield
+    else:
+        yield
@@ -0,0 +1,72 @@
+from typing import Dict, Tuple
+import logging
+import os
+
+from app.models import Report, RunPriority
+
+logger = logging.getLogger(__name__)
+
+# Pool used by reports that don't name one
+DEFAULT_POOL = "default"
+
+# Pool reserved for manual runs triggered with express=true
+EXPRESS_POOL = "express"
+
+# Concurrency of the default pool unless EXECUTION_POOLS sets it
+RUN_WORKERS = int(os.getenv("RUN_WORKERS", "4"))
+
+# Named execution pools and their max concurrency, e.g. "default:4,heavy:1"
+EXECUTION_POOLS = os.getenv("EXECUTION_POOLS", f"{DEFAULT_POOL}:{RUN_WORKERS}")
+
+# Concurrency of the express lane
+EXPRESS_POOL_WORKERS = int(os.getenv("EXPRESS_POOL_WORKERS", "2"))
+
+# Dispatch rank of each priority; higher ranks are dispatched first
+PRIORITY_RANKS = {
+    RunPriority.LOW.value: 0,
+    RunPriority.NORMAL.value: 1,
+    RunPriority.HIGH.value: 2,
+}
+
+# Express runs go before any scheduled priority
+EXPRESS_RANK = 3
+
+
+def _parse_pools(spec: str) -> Dict[str, int]:
+    """Parse "name:size,..." into a dict; the default and express pools always exist."""
+    pools = {}
+    for part in spec.split(","):
+        name, _, size = part.strip().partition(":")
+        if not name:
+            continue
+        try:
+            pools[name.strip().lower()] = max(int(size or 1), 1)
+        except ValueError:
+            logger.error(f"Invalid execution pool size in EXECUTION_POOLS: {part}")
+    pools.setdefault(DEFAULT_POOL, RUN_WORKERS)
+    pools[EXPRESS_POOL] = max(EXPRESS_POOL_WORKERS, 1)
+    return pools
+
+
+# Max concurrency of each pool, by name
+POOL_SIZES = _parse_pools(EXECUTION_POOLS)
+
+
+def pool_exists(name: str) -> bool:
+    """Check whether a pool is configured."""
+    return (name or DEFAULT_POOL).lower() in POOL_SIZES
+
+
+def get_placement(report: Report, express: bool = False) -> Tuple[str, int]:
+    """
+    Return the pool and dispatch rank of a run of a report.
+    Express runs use the express lane whatever the report's pool and priority.
+    """
+    if express:
+        return EXPRESS_POOL, EXPRESS_RANK
+    pool = (report.execution_pool or DEFAULT_POOL).lower()
+    if pool not in POOL_SIZES:
+        logger.warning(f"Report {report.id} uses unknown pool '{pool}', running it on '{DEFAULT_POOL}'")
+        pool = DEFAULT_POOL
+    rank = PRIORITY_RANKS.get((report.priority or RunPriority.NORMAL.value).upper(), 1)
+    return pool, rank
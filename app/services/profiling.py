@@ -0,0 +1,63 @@
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict
+from time import perf_counter
+import os
+import threading
+import tracemalloc
+
+# Record per-phase timings for every run
+RUN_PROFILING = os.getenv("RUN_PROFILING", "true").lower() in ("1", "true", "yes")
+
+# Also record peak Python memory. tracemalloc slows down allocations and is
+# process-wide, so peaks of overlapping runs include each other's allocations.
+RUN_PROFILE_MEMORY = os.getenv("RUN_PROFILE_MEMORY", "false").lower() in ("1", "true", "yes")
+
+# Phases recorded for a run, in execution order
+PHASES = ("queue", "query", "fetch", "serialize", "write", "notify")
+
+_tracemalloc_lock = threading.Lock()
+
+
+class RunProfile:
+    """Accumulates wall time per phase and resource usage for one run."""
+
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.started = perf_counter()
+        self.peak_memory_bytes = None
+        if RUN_PROFILE_MEMORY:
+            with _tracemalloc_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the wall time of the enclosed block to a phase."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += perf_counter() - start
+
+    def add(self, name: str, seconds: float):
+        """Add a duration measured elsewhere to a phase."""
+        self.phases[name] += seconds
+
+    def finish(self) -> float:
+        """Stop profiling and return the total wall time in seconds."""
+        if RUN_PROFILE_MEMORY and tracemalloc.is_tracing():
+            self.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+        return perf_counter() - self.started
+
+
+def start_profile():
+    """Return a RunProfile, or None when profiling is disabled."""
+    return RunProfile() if RUN_PROFILING else None
+
+
+def timed(profile, name: str):
+    """Time a block into a profile phase; a no-op context when profile is None."""
+    if profile is None:
+        return nullcontext()
+    return profile.phase(name)
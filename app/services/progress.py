@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Callable, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import logging
+import os
+
+from app.models import Report, ReportRun, RunStatus
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress updates of a running export; each update is one
+# write to the run's row, so this bounds the write rate per run. 0 disables
+# progress reporting.
+RUN_PROGRESS_INTERVAL_SECONDS = float(os.getenv("RUN_PROGRESS_INTERVAL_SECONDS", "5"))
+
+# Previous successful runs whose row counts give the expected rows of an export
+RUN_PROGRESS_HISTORY_RUNS = 5
+
+
+class ExportProgress:
+    """
+    Tracks the rows and bytes an export has written and hands a snapshot to
+    a callback at most once per RUN_PROGRESS_INTERVAL_SECONDS.
+
+    Exporters call update() after writing each batch; calls between two
+    snapshots only compare a clock reading.
+    """
+
+    def __init__(self, on_update: Callable[["ExportProgress"], None], expected_rows: int = None,
+                 interval_seconds: float = None):
+        self.on_update = on_update
+        self.expected_rows = expected_rows
+        self.interval_seconds = RUN_PROGRESS_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.rows = 0
+        self.bytes = None
+        self.rows_per_second = None
+        self.eta_at: Optional[datetime] = None
+        self.updated_at: Optional[datetime] = None
+        self._last_time = monotonic()
+        self._last_rows = 0
+
+    def update(self, rows: int, output_path: str = None):
+        """Record the rows written so far; takes a snapshot when one is due."""
+        self.rows = rows
+        now = monotonic()
+        if now - self._last_time < self.interval_seconds:
+            return
+
+        if output_path:
+            try:
+                # Size on disk; compressed and buffered writers lag slightly
+                self.bytes = os.path.getsize(output_path)
+            except OSError:
+                pass
+        self.rows_per_second = (rows - self._last_rows) / (now - self._last_time)
+        self._last_time, self._last_rows = now, rows
+        self.updated_at = datetime.now()
+        self.eta_at = None
+        if self.expected_rows and self.rows_per_second > 0:
+            remaining = max(self.expected_rows - rows, 0)
+            self.eta_at = self.updated_at + timedelta(seconds=remaining / self.rows_per_second)
+
+        try:
+            self.on_update(self)
+        except Exception as e:
+            # Progress is informational and never fails the export
+            logger.warning(f"Could not report export progress: {str(e)}")
+
+
+def expected_rows(db: Session, report: Report) -> Optional[int]:
+    """
+    Average row count of the report's last successful runs, or None without
+    history. Incremental reports export only new rows, so they have none.
+    """
+    if report.watermark_column:
+        return None
+    recent = (
+        db.query(ReportRun.row_count)
+        .filter(
+            ReportRun.report_id == str(report.id),
+            ReportRun.status == RunStatus.SUCCESS.value,
+            ReportRun.row_count.isnot(None)
+        )
+        .order_by(ReportRun.started_at.desc())
+        .limit(RUN_PROGRESS_HISTORY_RUNS)
+        .subquery()
+    )
+    average = db.query(func.avg(recent.c.row_count)).scalar()
+    return int(average) if average is not None else None
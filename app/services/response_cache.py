@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import blake2b
+from typing import Hashable, NamedTuple, Optional
+import os
+import threading
+import time
+
+# Report responses kept in memory; 0 disables the cache
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+
+# Longest time a cached response is served. Changes made through this process
+# invalidate it at once; this bounds how long changes made by other replicas
+# sharing the database take to show up.
+REPORT_CACHE_MAX_AGE_SECONDS = float(os.getenv("REPORT_CACHE_MAX_AGE_SECONDS", "300"))
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    body: bytes
+    etag: str
+    expires_at: float  # time.monotonic() deadline
+    valid_until: Optional[datetime]  # Earliest next fire time in the body
+
+
+def make_etag(body: bytes) -> str:
+    """Strong entity tag of a response body."""
+    return '"' + blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an entity tag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Serialized API responses keyed by request, invalidated through a version
+    counter: every change to the cached data bumps the version, and entries
+    built under an older version are never served again.
+
+    Entries also expire when a fire time they show passes, since the
+    scheduler moves next fire times on without any change to the data.
+    """
+
+    def __init__(self, max_entries: int, max_age_seconds: float):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """Drop all entries; call after any change to the cached data."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if (
+                entry.version != self._version
+                or time.monotonic() >= entry.expires_at
+                or (entry.valid_until is not None and datetime.now(entry.valid_until.tzinfo) >= entry.valid_until)
+            ):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, version: int, body: bytes, valid_until: datetime = None) -> CachedResponse:
+        """
+        Store a response built under version (read before querying, so a
+        change made meanwhile keeps the stale body out of the cache).
+        """
+        entry = CachedResponse(version, body, make_etag(body), time.monotonic() + self.max_age_seconds, valid_until)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+
+# Responses of GET /api/reports and GET /api/reports/{id}
+report_cache = ResponseCache(REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_MAX_AGE_SECONDS)
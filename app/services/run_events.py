@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import or_
+import asyncio
+import itertools
+import logging
+import os
+import threading
+
+from app.db import SessionLocal
+from app.models import ReportRun, RunStatus
+from app.services.cluster import SCHEDULER_CLUSTER_MODE
+from app.services.run_queue import WORKER_DISPATCH
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber; a subscriber that falls further behind
+# loses its oldest events
+RUN_EVENTS_QUEUE_SIZE = int(os.getenv("RUN_EVENTS_QUEUE_SIZE", "100"))
+
+# With worker dispatch or cluster mode, runs also execute in other processes;
+# their transitions are picked up by polling the run table at this interval
+# while anyone is subscribed
+RUN_EVENTS_POLL_SECONDS = float(os.getenv("RUN_EVENTS_POLL_SECONDS", "1"))
+
+# Seconds between keep-alive comments on idle event streams
+RUN_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("RUN_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Statuses after which a run does not change any more
+FINISHED_STATUSES = (RunStatus.SUCCESS.value, RunStatus.FAILED.value)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def run_event(report_run: ReportRun) -> dict:
+    """The state of a run as published, in the shape of the run API responses."""
+    return {
+        "id": str(report_run.id),
+        "report_id": str(report_run.report_id),
+        "started_at": _isoformat(report_run.started_at) or "",
+        "running_at": _isoformat(report_run.running_at),
+        "finished_at": _isoformat(report_run.finished_at),
+        "status": report_run.status,
+        "row_count": report_run.row_count,
+        "output_path": report_run.output_path,
+        "output_bytes": report_run.output_bytes,
+        "duration_seconds": report_run.duration_seconds,
+        "coalesced_count": report_run.coalesced_count,
+        "cache_hit": bool(report_run.cache_hit),
+        "error_message": report_run.error_message,
+        "progress": run_progress(report_run),
+    }
+
+
+def run_progress(report_run: ReportRun) -> Optional[dict]:
+    """Export progress of a RUNNING run, or None if none was reported yet."""
+    if report_run.status != RunStatus.RUNNING.value or report_run.progress_updated_at is None:
+        return None
+    return {
+        "rows_written": report_run.progress_rows,
+        "bytes_written": report_run.progress_bytes,
+        "rows_per_second": report_run.progress_rows_per_second,
+        "expected_rows": report_run.progress_expected_rows,
+        "eta": _isoformat(report_run.progress_eta_at),
+        "updated_at": _isoformat(report_run.progress_updated_at),
+    }
+
+
+class Subscription:
+    """Events of one stream, optionally only of one report or run."""
+
+    def __init__(self, report_id: str = None, run_id: str = None):
+        self.report_id = report_id
+        self.run_id = run_id
+        self.queue: asyncio.Queue = asyncio.Queue(RUN_EVENTS_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        return (
+            (self.report_id is None or event["report_id"] == self.report_id)
+            and (self.run_id is None or event["id"] == self.run_id)
+        )
+
+    def offer(self, item: tuple):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+
+class RunEventBroker:
+    """
+    Fans run state transitions and export progress out to the event streams
+    of the API.
+
+    Runs publish from runner threads; publishing only hands the event to
+    the event loop (one call, whatever the number of subscribers), which
+    then copies it to each matching subscriber's bounded queue. Slow
+    subscribers lose old events and never hold up a run.
+    """
+
+    # Runs whose last published state (status and progress time) is
+    # remembered, so polled changes already published locally (or by an
+    # earlier poll) are not repeated
+    _STATUS_MEMORY = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Subscription] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self._statuses: "OrderedDict[str, tuple]" = OrderedDict()
+        self._poller: Optional[asyncio.Task] = None
+
+    def subscribe(self, report_id: str = None, run_id: str = None) -> Subscription:
+        """Register a stream; must be called on the event loop."""
+        subscription = Subscription(report_id, run_id)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers[id(subscription)] = subscription
+        if (WORKER_DISPATCH or SCHEDULER_CLUSTER_MODE) and (self._poller is None or self._poller.done()):
+            self._poller = self._loop.create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.pop(id(subscription), None)
+
+    def publish(self, report_run: ReportRun):
+        """Publish the current state of a run. Never blocks and never raises."""
+        if not self._subscribers:
+            return
+        try:
+            self._publish(run_event(report_run))
+        except Exception as e:
+            logger.warning(f"Could not publish state of run {report_run.id}: {str(e)}")
+
+    def _publish(self, event: dict, if_changed: bool = False):
+        state = (event["status"], (event["progress"] or {}).get("updated_at"))
+        with self._lock:
+            if if_changed and self._statuses.get(event["id"]) == state:
+                return
+            self._statuses[event["id"]] = state
+            self._statuses.move_to_end(event["id"])
+            while len(self._statuses) > self._STATUS_MEMORY:
+                self._statuses.popitem(last=False)
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._dispatch, next(self._ids), event)
+
+    def _dispatch(self, event_id: int, event: dict):
+        for subscription in list(self._subscribers.values()):
+            if subscription.wants(event):
+                subscription.offer((event_id, event))
+
+    def _changed_runs(self, since: datetime) -> list:
+        db = SessionLocal()
+        try:
+            runs = (
+                db.query(ReportRun)
+                .filter(or_(
+                    ReportRun.status.in_([RunStatus.QUEUED.value, RunStatus.RUNNING.value]),
+                    ReportRun.finished_at >= since
+                ))
+                .all()
+            )
+            return [run_event(run) for run in runs]
+        finally:
+            db.close()
+
+    async def _poll(self):
+        """Publish transitions of runs executing in other processes."""
+        loop = asyncio.get_running_loop()
+        since = datetime.now()
+        while self._subscribers:
+            await asyncio.sleep(RUN_EVENTS_POLL_SECONDS)
+            polled_at = datetime.now()
+            try:
+                events = await loop.run_in_executor(None, self._changed_runs, since)
+            except Exception as e:
+                logger.warning(f"Could not poll run states: {str(e)}")
+                continue
+            # Windows overlap, as the clocks of other processes may differ slightly
+            since = polled_at - timedelta(seconds=RUN_EVENTS_POLL_SECONDS)
+            for event in events:
+                self._publish(event, if_changed=True)
+
+
+# Broker of this process
+broker = RunEventBroker()
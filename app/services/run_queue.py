@@ -0,0 +1,216 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import update, delete, or_, select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import logging
+import os
+import time
+
+from app.models import ReportRun, RunQueueEntry, RunStatus
+from app.services.pools import DEFAULT_POOL, POOL_SIZES
+from app.services import run_stats
+
+logger = logging.getLogger(__name__)
+
+# Where runs execute: "local" runs them in the API process (inline or on the
+# background executor); "worker" only enqueues them in the run_queue table,
+# from which `python -m app.worker` processes claim and execute them
+RUN_DISPATCH = os.getenv("RUN_DISPATCH", "local").lower()
+WORKER_DISPATCH = RUN_DISPATCH == "worker"
+
+# How long a claimed run stays owned by a worker without a heartbeat
+RUN_LEASE_SECONDS = int(os.getenv("RUN_LEASE_SECONDS", "60"))
+
+# Runs whose worker died are retried up to this many attempts in total
+RUN_MAX_ATTEMPTS = int(os.getenv("RUN_MAX_ATTEMPTS", "3"))
+
+# Polling interval of callers waiting for a run executed by a worker
+RUN_WAIT_POLL_SECONDS = float(os.getenv("RUN_WAIT_POLL_SECONDS", "0.5"))
+
+# Longest time such a caller waits; a run still unfinished by then is
+# returned as it is
+RUN_WAIT_TIMEOUT_SECONDS = float(os.getenv("RUN_WAIT_TIMEOUT_SECONDS", "300"))
+
+# Number of queue entries considered per claim attempt
+CLAIM_BATCH_SIZE = 10
+
+FINISHED_STATUSES = (RunStatus.SUCCESS.value, RunStatus.FAILED.value)
+
+
+def enqueue(db: Session, report_run: ReportRun, exclusive: bool, pool: str = DEFAULT_POOL, priority: int = 0) -> RunQueueEntry:
+    """
+    Add a queue entry for a new run to the session; the caller commits it
+    together with the run.
+
+    Args:
+        exclusive: Whether no other exclusive run of the report may be pending.
+            Committing a second exclusive entry raises IntegrityError.
+        pool: Execution pool whose workers may claim the run
+        priority: Dispatch rank within the pool; higher is claimed first
+    """
+    entry = RunQueueEntry(
+        run_id=str(report_run.id),
+        report_id=str(report_run.report_id),
+        exclusive_report_id=str(report_run.report_id) if exclusive else None,
+        enqueued_at=report_run.started_at or datetime.now(),
+        pool=pool,
+        priority=priority,
+        attempts=0
+    )
+    db.add(entry)
+    return entry
+
+
+def get_exclusive_run(db: Session, report_id: str) -> Optional[ReportRun]:
+    """Return the pending or executing exclusive run of a report, if any."""
+    entry = db.query(RunQueueEntry).filter(RunQueueEntry.exclusive_report_id == str(report_id)).first()
+    if entry is None:
+        return None
+    return db.query(ReportRun).filter(ReportRun.id == entry.run_id).first()
+
+
+def in_pool(pool: str):
+    """Filter for the entries of a pool; entries without a pool belong to the default pool."""
+    if pool == DEFAULT_POOL:
+        return or_(RunQueueEntry.pool == pool, RunQueueEntry.pool.is_(None))
+    return RunQueueEntry.pool == pool
+
+
+def claim(db: Session, worker_id: str, pool: str = DEFAULT_POOL) -> Optional[str]:
+    """
+    Claim the next run of a pool for a worker: highest priority first, then
+    oldest.
+
+    An entry is claimable if no worker holds it (or its holder's lease expired)
+    and no other run of the same report is executing.
+
+    Returns:
+        ID of the claimed run, or None if nothing is claimable
+    """
+    now = datetime.now()
+    claimable = or_(RunQueueEntry.claimed_by.is_(None), RunQueueEntry.lease_expires_at < now)
+    executing = select(RunQueueEntry.running_report_id).where(RunQueueEntry.running_report_id.isnot(None))
+
+    candidates = (
+        db.query(RunQueueEntry.run_id, RunQueueEntry.claimed_by, RunQueueEntry.attempts)
+        .filter(
+            in_pool(pool),
+            claimable,
+            or_(RunQueueEntry.claimed_by.isnot(None), RunQueueEntry.report_id.notin_(executing))
+        )
+        .order_by(RunQueueEntry.priority.desc(), RunQueueEntry.enqueued_at)
+        .limit(CLAIM_BATCH_SIZE)
+        .all()
+    )
+
+    for candidate in candidates:
+        if candidate.claimed_by is not None and candidate.attempts >= RUN_MAX_ATTEMPTS:
+            _abandon(db, candidate.run_id, candidate.claimed_by, now)
+            continue
+        try:
+            # Conditional on the entry still being claimable, so only one worker wins.
+            # running_report_id is unique: another run of the report executing
+            # makes this fail.
+            result = db.execute(
+                update(RunQueueEntry)
+                .where(RunQueueEntry.run_id == candidate.run_id, claimable)
+                .values(
+                    claimed_by=worker_id,
+                    lease_expires_at=now + timedelta(seconds=RUN_LEASE_SECONDS),
+                    attempts=RunQueueEntry.attempts + 1,
+                    running_report_id=RunQueueEntry.report_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        if result.rowcount == 1:
+            if candidate.claimed_by is not None:
+                logger.warning(f"Worker {worker_id} took over run {candidate.run_id} from {candidate.claimed_by}")
+            return candidate.run_id
+    return None
+
+
+def _abandon(db: Session, run_id: str, claimed_by: str, now: datetime):
+    """Fail a run whose workers kept dying and remove it from the queue."""
+    result = db.execute(
+        delete(RunQueueEntry)
+        .where(
+            RunQueueEntry.run_id == run_id,
+            RunQueueEntry.claimed_by == claimed_by,
+            RunQueueEntry.lease_expires_at < now
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        db.query(ReportRun).filter(ReportRun.id == run_id).update(
+            {
+                ReportRun.status: RunStatus.FAILED.value,
+                ReportRun.finished_at: now,
+                ReportRun.error_message: f"Abandoned after {RUN_MAX_ATTEMPTS} attempts: worker stopped responding"
+            },
+            synchronize_session=False
+        )
+        logger.error(f"Abandoned run {run_id} after {RUN_MAX_ATTEMPTS} attempts")
+    db.commit()
+    if result.rowcount == 1:
+        report_run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
+        if report_run is not None:
+            run_stats.record(db, report_run)
+
+
+def renew(db: Session, worker_id: str):
+    """Extend the leases of all runs held by a worker."""
+    db.execute(
+        update(RunQueueEntry)
+        .where(RunQueueEntry.claimed_by == worker_id)
+        .values(lease_expires_at=datetime.now() + timedelta(seconds=RUN_LEASE_SECONDS))
+    )
+    db.commit()
+
+
+def complete(db: Session, run_id: str):
+    """Remove a finished run from the queue."""
+    db.execute(delete(RunQueueEntry).where(RunQueueEntry.run_id == str(run_id)))
+    db.commit()
+
+
+def wait_for_run(db: Session, report_run: ReportRun) -> ReportRun:
+    """
+    Block until a worker has finished a run, or for at most
+    RUN_WAIT_TIMEOUT_SECONDS, and return its refreshed state.
+    """
+    deadline = time.monotonic() + RUN_WAIT_TIMEOUT_SECONDS
+    db.refresh(report_run)
+    while report_run.status not in FINISHED_STATUSES and time.monotonic() < deadline:
+        time.sleep(RUN_WAIT_POLL_SECONDS)
+        db.refresh(report_run)
+    return report_run
+
+
+def stats(db: Session) -> dict:
+    """Return the number of queued and executing runs in the durable queue, in total and per pool."""
+    rows = (
+        db.query(
+            func.coalesce(RunQueueEntry.pool, DEFAULT_POOL),
+            RunQueueEntry.claimed_by.isnot(None),
+            func.count()
+        )
+        .group_by(func.coalesce(RunQueueEntry.pool, DEFAULT_POOL), RunQueueEntry.claimed_by.isnot(None))
+        .all()
+    )
+    pools = {name: {"max_workers": size, "active_workers": 0, "queue_depth": 0, "max_queue": None} for name, size in POOL_SIZES.items()}
+    for pool, claimed, count in rows:
+        entry = pools.setdefault(pool, {"max_workers": None, "active_workers": 0, "queue_depth": 0, "max_queue": None})
+        entry["active_workers" if claimed else "queue_depth"] += count
+    return {
+        "dispatch": RUN_DISPATCH,
+        "max_workers": None,
+        "active_workers": sum(p["active_workers"] for p in pools.values()),
+        "queue_depth": sum(p["queue_depth"] for p in pools.values()),
+        "max_queue": None,
+        "pools": pools,
+    }
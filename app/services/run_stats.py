@@ -0,0 +1,181 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import logging
+import os
+
+from app.models import ReportRun, RunStatsBucket, RunStatus
+from app.services.metrics import DURATION_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Statuses of finished runs, which are counted in the rollup
+FINISHED_STATUSES = (RunStatus.SUCCESS.value, RunStatus.FAILED.value)
+
+# Longest period the run stats can cover
+RUN_STATS_MAX_DAYS = int(os.getenv("RUN_STATS_MAX_DAYS", "90"))
+
+# Runs read per batch when the rollup is built from the run history
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _bucket(duration_seconds: Optional[float]) -> int:
+    if duration_seconds is None:
+        return -1
+    return bisect_left(DURATION_BUCKETS, duration_seconds)
+
+
+def record(db: Session, report_run: ReportRun):
+    """
+    Count a finished run in the rollup. Failures are logged and never
+    affect the run itself.
+    """
+    if report_run.status not in FINISHED_STATUSES or report_run.finished_at is None:
+        return
+    key = {
+        "report_id": str(report_run.report_id),
+        "day": report_run.finished_at.date(),
+        "status": report_run.status,
+        "bucket": _bucket(report_run.duration_seconds),
+    }
+    duration = report_run.duration_seconds or 0.0
+    try:
+        # Increment in place so concurrent runs of a report don't lose counts;
+        # the first run of a bucket inserts it, racing inserts retry the update
+        for _ in range(2):
+            result = db.execute(
+                update(RunStatsBucket)
+                .where(*[getattr(RunStatsBucket, column) == value for column, value in key.items()])
+                .values(
+                    run_count=RunStatsBucket.run_count + 1,
+                    duration_sum=RunStatsBucket.duration_sum + duration
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                break
+            try:
+                db.add(RunStatsBucket(**key, run_count=1, duration_sum=duration))
+                db.commit()
+                return
+            except IntegrityError:
+                db.rollback()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not record stats for run {report_run.id}: {str(e)}")
+
+
+def backfill(db: Session) -> int:
+    """
+    Build the rollup from the run history if it is empty, e.g. on the first
+    start after upgrading. Fills in missing run durations on the way.
+
+    Returns:
+        Number of runs counted
+    """
+    if db.query(RunStatsBucket).first() is not None:
+        return 0
+
+    buckets: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+    durations = []
+    counted = 0
+    query = (
+        db.query(ReportRun.id, ReportRun.report_id, ReportRun.status,
+                 func.coalesce(ReportRun.running_at, ReportRun.started_at),
+                 ReportRun.finished_at, ReportRun.duration_seconds)
+        .filter(ReportRun.status.in_(FINISHED_STATUSES), ReportRun.finished_at.isnot(None))
+        .yield_per(BACKFILL_BATCH_SIZE)
+    )
+    for run_id, report_id, status, began_at, finished_at, duration in query:
+        if duration is None and began_at is not None:
+            duration = max((finished_at - began_at).total_seconds(), 0.0)
+            durations.append({"id": run_id, "duration_seconds": duration})
+        bucket = buckets[(str(report_id), finished_at.date(), status, _bucket(duration))]
+        bucket[0] += 1
+        bucket[1] += duration or 0.0
+        counted += 1
+
+    for start in range(0, len(durations), BACKFILL_BATCH_SIZE):
+        db.bulk_update_mappings(ReportRun, durations[start:start + BACKFILL_BATCH_SIZE])
+    db.bulk_insert_mappings(RunStatsBucket, [
+        {"report_id": report_id, "day": day, "status": status, "bucket": bucket,
+         "run_count": count, "duration_sum": total}
+        for (report_id, day, status, bucket), (count, total) in buckets.items()
+    ])
+    db.commit()
+    if counted:
+        logger.info(f"Built run stats from {counted} finished runs")
+    return counted
+
+
+def _percentile(counts: List[int], sums: List[float], pct: float) -> Optional[float]:
+    """
+    Estimate a percentile from bucket counts by interpolating inside the
+    bucket it falls in. The last, unbounded bucket reports its mean.
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = pct / 100 * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count == 0:
+            continue
+        if cumulative + count >= rank:
+            if index >= len(DURATION_BUCKETS):
+                return sums[index] / count
+            lower = DURATION_BUCKETS[index - 1] if index > 0 else 0.0
+            upper = DURATION_BUCKETS[index]
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return None
+
+
+def report_stats(db: Session, days: int = 7, report_id: str = None) -> List[dict]:
+    """
+    Per-report run counts, success rate and p50/p95/mean duration of
+    successful runs over the last days (today included), read from the
+    rollup. Percentiles are estimates within the duration buckets.
+    """
+    since = date.today() - timedelta(days=max(days, 1) - 1)
+    query = db.query(RunStatsBucket).filter(RunStatsBucket.day >= since)
+    if report_id:
+        query = query.filter(RunStatsBucket.report_id == str(report_id))
+
+    reports: Dict[str, dict] = {}
+    for row in query.all():
+        stats = reports.get(row.report_id)
+        if stats is None:
+            stats = reports[row.report_id] = {
+                "runs": 0, "succeeded": 0, "failed": 0,
+                "counts": [0] * (len(DURATION_BUCKETS) + 1),
+                "sums": [0.0] * (len(DURATION_BUCKETS) + 1),
+            }
+        stats["runs"] += row.run_count
+        if row.status == RunStatus.SUCCESS.value:
+            stats["succeeded"] += row.run_count
+            if row.bucket >= 0:
+                stats["counts"][row.bucket] += row.run_count
+                stats["sums"][row.bucket] += row.duration_sum
+        else:
+            stats["failed"] += row.run_count
+
+    results = []
+    for key, stats in sorted(reports.items()):
+        timed = sum(stats["counts"])
+        results.append({
+            "report_id": key,
+            "runs": stats["runs"],
+            "succeeded": stats["succeeded"],
+            "failed": stats["failed"],
+            "success_rate": stats["succeeded"] / stats["runs"] if stats["runs"] else None,
+            "p50_seconds": _percentile(stats["counts"], stats["sums"], 50),
+            "p95_seconds": _percentile(stats["counts"], stats["sums"], 95),
+            "mean_seconds": sum(stats["sums"]) / timed if timed else None,
+        })
+    return results
@@ -1,84 +1,450 @@
 from datetime import datetime
+from typing import Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.sql import func
 
-from app.models import Report, ReportRun, RunStatus
-from app.services.exporter import export_to_csv
+from app.datasources import data_sources
+from app.models import Report, ReportRun, RunMetrics, RunStatus, ConcurrencyPolicy, IncrementalMode, generate_uuid
+from app.services.exporter import get_exporter, count_row_groups, append_previous_output, align_parquet_segment
+from app.services import incremental
+from app.services.profiling import start_profile, timed, RunProfile
+from app.services.progress import ExportProgress, RUN_PROGRESS_INTERVAL_SECONDS, expected_rows
+from app.services import metrics
+from app.services import run_stats
+import logging
 from app.services.notifier import send_notification
+from app.services.singleflight import SingleFlight
+from app.services import cache as result_cache
+from app.services import run_queue
+from app.services.run_events import broker as run_events
+from app.services.pools import get_placement
 import os
 
+logger = logging.getLogger(__name__)
 
-def execute_report(db: Session, report_id, output_dir: str = None) -> ReportRun:
+# How long a coalesced trigger waits for the in-flight run's record to be committed
+COALESCE_READY_TIMEOUT = 30
+
+# In-flight run of each report in this process
+single_flight = SingleFlight()
+
+
+class RunInProgressError(Exception):
+    """Raised when a report with the REJECT policy is triggered while it is running."""
+
+    def __init__(self, report_id: str, run_id: str):
+        self.report_id = report_id
+        self.run_id = run_id
+        super().__init__(f"Report {report_id} already has run {run_id} in progress")
+
+
+def get_concurrency_policy(report: Report) -> str:
+    """Return the report's concurrency policy, defaulting to COALESCE."""
+    return (report.concurrency_policy or ConcurrencyPolicy.COALESCE.value).upper()
+
+
+def create_run(db: Session, report_id, express: bool = False) -> Tuple[ReportRun, bool]:
     """
-    Execute a report: run SQL query, export to CSV, and track the run.
+    Create a run record with QUEUED status for a report, applying the
+    report's concurrency policy when a run of it is already in flight:
+    
+    - COALESCE: no new run is created; the in-flight run is returned and
+      its coalesced_count is incremented
+    - QUEUE: a new run is created and executes after the in-flight one
+    - REJECT: RunInProgressError is raised
+    
+    With worker dispatch the run is also added to the durable run queue,
+    and in-flight runs are tracked there instead of in this process.
     
     Args:
         db: Database session
-        report_id: UUID of the report to execute
-        output_dir: Directory for output files (defaults to ./outputs)
+        report_id: UUID of the report to run
+        express: Queue the run in the express lane (worker dispatch)
     
     Returns:
-        ReportRun object with execution results
+        Tuple of (ReportRun, created). created is False when the trigger
+        was attached to an in-flight run.
     """
-    if output_dir is None:
-        output_dir = os.getenv("OUTPUT_DIR", "./outputs")
-    
     # Get report
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report:
         raise ValueError(f"Report with id {report_id} not found")
     
-    # Create run record with QUEUED status
+    run_id = generate_uuid()
+    policy = get_concurrency_policy(report)
+    
+    if run_queue.WORKER_DISPATCH:
+        return _create_queued_run(db, report, run_id, policy, express)
+    
+    if policy != ConcurrencyPolicy.QUEUE.value:
+        inflight, claimed = single_flight.claim(str(report.id), run_id)
+        if not claimed:
+            if policy == ConcurrencyPolicy.REJECT.value:
+                raise RunInProgressError(str(report.id), inflight.run_id)
+            
+            inflight.ready.wait(COALESCE_READY_TIMEOUT)
+            try:
+                attached = (
+                    db.query(ReportRun)
+                    .filter(ReportRun.id == inflight.run_id)
+                    .update(
+                        {ReportRun.coalesced_count: func.coalesce(ReportRun.coalesced_count, 0) + 1},
+                        synchronize_session=False
+                    )
+                )
+                db.commit()
+            except OperationalError as e:
+                # The count is informational; a locked database must not turn
+                # a trigger that was coalesced anyway into an error
+                db.rollback()
+                logger.warning(f"Could not count coalesced trigger on run {inflight.run_id}: {str(e)}")
+                attached = True
+            report_run = db.query(ReportRun).filter(ReportRun.id == inflight.run_id).first() if attached else None
+            if report_run is not None:
+                return report_run, False
+            # The in-flight run's record was never committed; start a run of our own
+            return create_run(db, report_id, express)
+    
+    now = datetime.now()
     report_run = ReportRun(
+        id=run_id,
         report_id=str(report_id),
-        started_at=datetime.now(),
-        status=RunStatus.QUEUED.value
+        started_at=now,
+        status=RunStatus.QUEUED.value,
+        coalesced_count=0
+    )
+    try:
+        db.add(report_run)
+        db.commit()
+        db.refresh(report_run)
+    except Exception:
+        db.rollback()
+        single_flight.release(str(report.id), run_id)
+        raise
+    run_events.publish(report_run)
+    
+    inflight = single_flight.get(str(report.id))
+    if inflight is not None and inflight.run_id == run_id:
+        inflight.ready.set()
+    return report_run, True
+
+
+def _attach_to_run(db: Session, report_run: ReportRun) -> ReportRun:
+    """Count a coalesced trigger on an in-flight run."""
+    db.query(ReportRun).filter(ReportRun.id == report_run.id).update(
+        {ReportRun.coalesced_count: func.coalesce(ReportRun.coalesced_count, 0) + 1},
+        synchronize_session=False
+    )
+    db.commit()
+    db.refresh(report_run)
+    return report_run
+
+
+def _create_queued_run(db: Session, report: Report, run_id: str, policy: str, express: bool = False) -> Tuple[ReportRun, bool]:
+    """
+    create_run for worker dispatch: the run and its queue entry are committed
+    together. COALESCE and REJECT entries are exclusive per report, so when
+    several processes trigger a report at once only one run is created.
+    """
+    exclusive = policy != ConcurrencyPolicy.QUEUE.value
+    if exclusive:
+        active = run_queue.get_exclusive_run(db, report.id)
+        if active is not None:
+            if policy == ConcurrencyPolicy.REJECT.value:
+                raise RunInProgressError(str(report.id), str(active.id))
+            return _attach_to_run(db, active), False
+    
+    now = datetime.now()
+    report_run = ReportRun(
+        id=run_id,
+        report_id=str(report.id),
+        started_at=now,
+        status=RunStatus.QUEUED.value,
+        coalesced_count=0
     )
     db.add(report_run)
+    pool, priority = get_placement(report, express)
+    run_queue.enqueue(db, report_run, exclusive, pool, priority)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another process enqueued an exclusive run of this report first
+        db.rollback()
+        return _create_queued_run(db, report, generate_uuid(), policy, express)
+    db.refresh(report_run)
+    run_events.publish(report_run)
+    return report_run, True
+
+
+def discard_run(db: Session, report_run: ReportRun):
+    """
+    Delete a QUEUED run that will never be executed and release its
+    in-flight slot.
+    """
+    single_flight.release(str(report_run.report_id), str(report_run.id))
+    db.delete(report_run)
     db.commit()
+
+
+def wait_for_run(db: Session, report_run: ReportRun) -> ReportRun:
+    """
+    Block until an in-flight run has finished, or for at most
+    RUN_WAIT_TIMEOUT_SECONDS, and return its refreshed state.
+    """
+    if run_queue.WORKER_DISPATCH:
+        return run_queue.wait_for_run(db, report_run)
+    inflight = single_flight.get(str(report_run.report_id))
+    if inflight is not None and inflight.run_id == str(report_run.id):
+        inflight.done.wait(run_queue.RUN_WAIT_TIMEOUT_SECONDS)
     db.refresh(report_run)
+    return report_run
+
+
+def run_report(db: Session, report_run: ReportRun, output_dir: str = None) -> ReportRun:
+    """
+    Execute a QUEUED run: run SQL query, export in the report's output format,
+    and record the outcome on the run.
+    
+    Args:
+        db: Database session
+        report_run: ReportRun created by create_run
+        output_dir: Directory for output files (defaults to ./outputs)
+    
+    Returns:
+        ReportRun object with execution results
+    """
+    if output_dir is None:
+        output_dir = os.getenv("OUTPUT_DIR", "./outputs")
+    
+    report = report_run.report
     
+    # Runs of the same report never execute concurrently in this process;
+    # with the QUEUE policy later runs wait here until the earlier one is done
+    # (background runs are held back by their pool and rarely wait here)
+    with single_flight.lock(str(report.id)):
+        try:
+            return _run_report(db, report, report_run, output_dir)
+        finally:
+            single_flight.release(str(report.id), str(report_run.id))
+
+
+def _record_metrics(db: Session, report_run: ReportRun, profile: RunProfile):
+    """
+    Persist the phase timings and resource usage of a finished run.
+    Failures are logged and never affect the run itself.
+    """
+    if profile is None:
+        return
+    try:
+        total = profile.finish()
+        phases = profile.phases
+        db.add(RunMetrics(
+            report_run_id=str(report_run.id),
+            queue_seconds=phases.get("queue"),
+            query_seconds=phases.get("query"),
+            fetch_seconds=phases.get("fetch"),
+            serialize_seconds=phases.get("serialize"),
+            write_seconds=phases.get("write"),
+            notify_seconds=phases.get("notify"),
+            total_seconds=total,
+            rows_per_second=(report_run.row_count / total) if report_run.row_count and total > 0 else None,
+            bytes_written=report_run.output_bytes,
+            peak_memory_bytes=profile.peak_memory_bytes
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not record metrics for run {report_run.id}: {str(e)}")
+
+
+def _observe_run(report_run: ReportRun):
+    """Count a finished run in the process metrics exposed at /metrics."""
+    metrics.observe_run(
+        report_run.report_id, report_run.status, report_run.duration_seconds,
+        report_run.row_count, report_run.output_bytes
+    )
+
+
+def _save_progress(db: Session, report_run: ReportRun, progress: ExportProgress):
+    """Save an export's progress on its run and publish it to event streams."""
+    report_run.progress_rows = progress.rows
+    report_run.progress_bytes = progress.bytes
+    report_run.progress_rows_per_second = progress.rows_per_second
+    report_run.progress_expected_rows = progress.expected_rows
+    report_run.progress_eta_at = progress.eta_at
+    report_run.progress_updated_at = progress.updated_at
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    run_events.publish(report_run)
+
+
+def _finish(report_run: ReportRun, status: str):
+    report_run.status = status
+    report_run.finished_at = datetime.now()
+    # Runs that never left the queue count from their creation
+    began_at = report_run.running_at or report_run.started_at
+    if began_at:
+        report_run.duration_seconds = (report_run.finished_at - began_at).total_seconds()
+
+
+def _run_report(db: Session, report: Report, report_run: ReportRun, output_dir: str) -> ReportRun:
+    """Execute a run and record its outcome (see run_report)."""
+    profile = start_profile()
     try:
         # Update status to RUNNING
         report_run.status = RunStatus.RUNNING.value
+        # started_at stays the creation time, which run history pages by
+        report_run.running_at = datetime.now()
         db.commit()
+        run_events.publish(report_run)
+        if profile is not None:
+            profile.add("queue", (report_run.running_at - report_run.started_at).total_seconds())
+        
+        # Incremental reports only fetch rows past the previous run's watermark
+        sql_query = report.sql_query
+        params = None
+        tracker = None
+        previous_run = None
+        if report.watermark_column:
+            tracker = incremental.WatermarkTracker(report.watermark_column)
+            previous_run = incremental.get_previous_run(db, report)
+            if previous_run is not None:
+                sql_query = incremental.build_incremental_query(sql_query, report.watermark_column)
+                params = {
+                    "watermark": incremental.decode_watermark(
+                        previous_run.watermark_value, previous_run.watermark_type
+                    )
+                }
+        
+        # Serve the output from the result cache if a fresh entry exists
+        use_cache = report.cache_ttl_seconds and not report.watermark_column
+        cache_key = result_cache.cache_key(report) if use_cache else None
+        cached = result_cache.lookup(db, cache_key, report.cache_ttl_seconds) if cache_key else None
         
-        # Execute query and export to CSV
-        output_path, row_count = export_to_csv(
-            db=db,
-            sql_query=report.sql_query,
-            output_dir=output_dir,
-            report_name=report.name
-        )
+        if cached is not None:
+            with timed(profile, "write"):
+                output_path = result_cache.materialize(cached, output_dir, report.name)
+            row_count = cached.row_count
+            report_run.cache_hit = True
+        else:
+            # Execute query on the report's data source (never the metadata
+            # session) and export in the report's output format
+            exporter = get_exporter(report.output_format)
+            progress = None
+            if RUN_PROGRESS_INTERVAL_SECONDS > 0:
+                progress = ExportProgress(
+                    lambda snapshot: _save_progress(db, report_run, snapshot),
+                    expected_rows(db, report)
+                )
+            with data_sources.get_engine(report.data_source).connect() as source:
+                output_path, row_count = exporter(
+                    db=source,
+                    sql_query=sql_query,
+                    output_dir=output_dir,
+                    report_name=report.name,
+                    compression=report.compression,
+                    params=params,
+                    on_batch=tracker,
+                    profile=profile,
+                    progress=progress
+                )
+            if cache_key:
+                result_cache.store(db, cache_key, output_path, row_count)
+        
+        watermark = None
+        if tracker is not None:
+            mode = (report.incremental_mode or IncrementalMode.APPEND.value).upper()
+            if previous_run is not None and incremental.appends_in_place(report):
+                with timed(profile, "write"):
+                    append_previous_output(
+                        previous_run.output_path, output_path,
+                        report.output_format, report.compression
+                    )
+                row_count += previous_run.row_count or 0
+            elif previous_run is not None and mode == IncrementalMode.APPEND.value and output_path.endswith(".parquet"):
+                # This run's rows form a new segment of the report's Parquet dataset
+                with timed(profile, "write"):
+                    align_parquet_segment(previous_run.output_path, output_path, report.compression)
+            # No new rows keeps the previous high-water mark
+            watermark = tracker.value
+            if watermark is None and params is not None:
+                watermark = params["watermark"]
         
         # Update run with success details
-        report_run.status = RunStatus.SUCCESS.value
-        report_run.finished_at = datetime.now()
+        _finish(report_run, RunStatus.SUCCESS.value)
         report_run.row_count = row_count
         report_run.output_path = output_path
+        report_run.output_bytes = os.path.getsize(output_path)
+        report_run.row_group_count = count_row_groups(output_path)
+        # Only a successful export advances the watermark
+        report_run.watermark_value, report_run.watermark_type = incremental.encode_watermark(watermark)
         db.commit()
         db.refresh(report_run)
+        run_events.publish(report_run)
         
         # Ensure report relationship is loaded
         _ = report_run.report
         
         # Send notification
-        send_notification(db, report_run)
+        with timed(profile, "notify"):
+            send_notification(db, report_run)
+        _record_metrics(db, report_run, profile)
+        _observe_run(report_run)
+        run_stats.record(db, report_run)
         
     except Exception as e:
         # Update run with failure details
-        report_run.status = RunStatus.FAILED.value
-        report_run.finished_at = datetime.now()
+        _finish(report_run, RunStatus.FAILED.value)
         report_run.error_message = str(e)
         db.commit()
         db.refresh(report_run)
+        run_events.publish(report_run)
         
         # Ensure report relationship is loaded
         _ = report_run.report
         
         # Send failure notification
-        send_notification(db, report_run)
+        with timed(profile, "notify"):
+            send_notification(db, report_run)
+        _record_metrics(db, report_run, profile)
+        _observe_run(report_run)
+        run_stats.record(db, report_run)
         
         # Re-raise to allow caller to handle
         raise
     
     return report_run
+
+
+def execute_report(db: Session, report_id, output_dir: str = None, wait: bool = True, express: bool = False) -> ReportRun:
+    """
+    Execute a report: run SQL query, export in the report's output format, and track the run.
+    
+    If the report is already running and its concurrency policy is COALESCE,
+    no new query is started: the trigger is attached to the in-flight run,
+    which is returned once it finishes (or immediately if wait is False).
+    With worker dispatch the run is only enqueued and a worker process
+    executes it.
+    
+    Args:
+        db: Database session
+        report_id: UUID of the report to execute
+        output_dir: Directory for output files (defaults to ./outputs)
+        wait: Whether to wait for an in-flight run this trigger was attached to
+        express: Queue the run in the express lane (worker dispatch)
+    
+    Returns:
+        ReportRun object with execution results
+    
+    Raises:
+        RunInProgressError: if the report is running and its policy is REJECT
+    """
+    report_run, created = create_run(db, report_id, express)
+    if not created or run_queue.WORKER_DISPATCH:
+        # Attached to an in-flight run, or enqueued for a worker process
+        return wait_for_run(db, report_run) if wait else report_run
+    return run_report(db, report_run, output_dir)
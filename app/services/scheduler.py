@@ -1,45 +1,233 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.date import DateTrigger
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 import logging
+import os
+import time
 
 from app.db import SessionLocal
 from app.models import Report
-from app.services.runner import execute_report
+from app.services.runner import create_run, discard_run, RunInProgressError
+from app.services.executor import submit_run, QueueFullError
+from app.services.pools import get_placement
+from app.services import metrics
+from app.services.cluster import SCHEDULER_CLUSTER_MODE, coordinator, fire_slot
+from app.services import spreading
+from app.services import jobstore
+from app.services.timeline import cron_index
+from app.services.response_cache import report_cache
 
 logger = logging.getLogger(__name__)
 
-# Global scheduler instance
-scheduler = BackgroundScheduler()
+# What happens at startup to fires missed while the scheduler was down (only
+# with the database job store, which remembers when each job was due):
+# "skip" drops them, "coalesce" runs each report once, "all" runs every
+# missed fire, up to SCHEDULER_CATCHUP_MAX per report
+SCHEDULER_MISFIRE_POLICY = os.getenv("SCHEDULER_MISFIRE_POLICY", "skip").lower()
+SCHEDULER_CATCHUP_MAX = int(os.getenv("SCHEDULER_CATCHUP_MAX", "10"))
 
+# Global scheduler instance and the store of its jobs
+job_store = jobstore.build_jobstore()
+scheduler = BackgroundScheduler(jobstores={"default": job_store})
 
-def trigger_report(report_id):
+
+def _record_fire_metrics(event):
+    """Scheduler listener measuring how late jobs are handed to the executor."""
+    if event.code == EVENT_JOB_MISSED:
+        metrics.scheduler_missed_total.inc()
+        return
+    for scheduled_time in event.scheduled_run_times:
+        lag = (datetime.now(scheduled_time.tzinfo) - scheduled_time).total_seconds()
+        metrics.scheduler_lag_seconds.observe(max(lag, 0.0))
+
+
+scheduler.add_listener(_record_fire_metrics, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
+
+
+def trigger_report(report_id, offset_seconds: int = 0):
     """
     Trigger a report execution (called by scheduler).
     
+    In cluster mode the fire only executes if this node claims its lease.
+    If the per-slice start cap is reached, the run is deferred to the next
+    slice with room left.
+    
     Args:
         report_id: UUID string of the report to execute
+        offset_seconds: How far the job fires after the cron time (spreading)
+    """
+    # The cron time, so all nodes agree on the fire whatever their offset
+    _fire(str(report_id), fire_slot(datetime.now() - timedelta(seconds=offset_seconds)))
+
+
+def _fire(report_id: str, fire_time):
+    """Claim (in cluster mode) and start or defer the fire of a report at a cron time."""
+    if SCHEDULER_CLUSTER_MODE and not coordinator.claim(report_id, fire_time):
+        logger.info(f"Scheduled run of report {report_id} is handled by another node")
+        return
+    
+    start_at = spreading.start_limiter.reserve()
+    if start_at is not None:
+        logger.info(f"Start cap reached, deferring scheduled run of report {report_id} to {start_at}")
+        scheduler.add_job(
+            _run_fire,
+            trigger=DateTrigger(run_date=start_at),
+            args=[report_id, fire_time],
+            name=f"deferred {report_id}",
+            misfire_grace_time=None
+        )
+        return
+    _run_fire(report_id, fire_time)
+
+
+def _run_fire(report_id: str, fire_time):
+    """Execute a fire, releasing its lease afterwards in cluster mode."""
+    if SCHEDULER_CLUSTER_MODE:
+        coordinator.execute(report_id, fire_time, _execute_scheduled_report)
+    else:
+        _execute_scheduled_report(report_id)
+
+
+def _on_recovered_fire(report_id: str, fire_time):
+    # Run on the scheduler's thread pool, not the heartbeat thread
+    scheduler.add_job(_run_fire, args=[report_id, fire_time], name=f"recover {report_id}")
+
+
+def _execute_scheduled_report(report_id):
+    """
+    Create a run for a scheduled fire and hand it to the report's execution
+    pool (or, with worker dispatch, to the durable run queue).
+    
+    Returns:
+        Future of the run when it executes in this process, else None
     """
     db = SessionLocal()
     try:
         logger.info(f"Triggering report execution for report_id: {report_id}")
-        # Convert string to UUID if needed, or use string directly
-        from uuid import UUID as UUIDType
-        if isinstance(report_id, str):
-            report_id_uuid = report_id
-        else:
-            report_id_uuid = str(report_id)
-        execute_report(db, report_id_uuid)
+        report_run, created = create_run(db, str(report_id))
+        if not created:
+            logger.info(f"Scheduled run of report {report_id} was coalesced into run {report_run.id}")
+            return None
+        pool, priority = get_placement(report_run.report)
+        try:
+            return submit_run(report_run.id, pool=pool, priority=priority, report_id=report_run.report_id)
+        except QueueFullError as e:
+            # Don't leave a QUEUED run behind that nothing will execute
+            discard_run(db, report_run)
+            logger.warning(f"Skipped scheduled run of report {report_id}: {str(e)}")
+    except RunInProgressError as e:
+        logger.info(f"Skipped scheduled run of report {report_id}: {str(e)}")
     except Exception as e:
         logger.error(f"Error executing report {report_id}: {str(e)}")
     finally:
         db.close()
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _cron_trigger(schedule_cron: str) -> Optional[CronTrigger]:
+    # Triggers are stateless, so reports with the same expression share one;
+    # parsing is most of the cost of reconciling thousands of reports
+    cron_parts = schedule_cron.split()
+    if len(cron_parts) != 5:
+        return None
+    
+    minute, hour, day, month, day_of_week = cron_parts
+    return CronTrigger(
+        minute=minute,
+        hour=hour,
+        day=day,
+        month=month,
+        day_of_week=day_of_week
+    )
+
+
+def build_trigger(schedule_cron: str, offset_seconds: int = 0) -> Optional[BaseTrigger]:
+    """
+    Build the trigger of a cron expression ("minute hour day month day_of_week"),
+    optionally firing offset_seconds after each cron time.
+    
+    Returns:
+        Trigger, or None if the expression doesn't have five fields
+    """
+    trigger = _cron_trigger(" ".join((schedule_cron or "").split()))
+    if trigger is None:
+        return None
+    if offset_seconds:
+        return spreading.OffsetTrigger(trigger, offset_seconds)
+    return trigger
+
+
+def _apply_job(report_id: str, name: str, schedule_cron: str, offset_seconds: int = 0, job=None) -> str:
+    """
+    Add, modify or keep the job of an active report.
+    
+    Args:
+        offset_seconds: Spreading offset from the cron time
+        job: The report's current job, if known (avoids a lookup)
+    
+    Returns:
+        "added", "updated" or "unchanged"
+    """
+    trigger = build_trigger(schedule_cron, offset_seconds)
+    if trigger is None:
+        raise ValueError(f"Invalid cron expression: {schedule_cron}")
+    kwargs = {"offset_seconds": offset_seconds}
+    cron_index.put(report_id, name, schedule_cron, offset_seconds, trigger)
+    
+    if job is None:
+        job = scheduler.get_job(report_id)
+    if job is None:
+        scheduler.add_job(
+            func=trigger_report,
+            trigger=trigger,
+            args=[report_id],
+            kwargs=kwargs,
+            id=report_id,
+            name=name,
+            replace_existing=True
+        )
+        report_cache.invalidate()
+        return "added"
+    
+    changed = False
+    if str(job.trigger) != str(trigger):
+        # Recomputes the next fire time from now; the job is never absent
+        scheduler.reschedule_job(report_id, trigger=trigger)
+        changed = True
+    if job.name != name or job.kwargs != kwargs:
+        scheduler.modify_job(report_id, name=name, kwargs=kwargs)
+        changed = True
+    if changed:
+        # Report responses show the schedule offset and next fire time
+        report_cache.invalidate()
+    return "updated" if changed else "unchanged"
+
+
+def _report_offset(report_id: str) -> int:
+    """Return the spreading offset of one report, reading its run history."""
+    if spreading.SCHEDULE_SPREAD_SECONDS <= 0:
+        return 0
+    db = SessionLocal()
+    try:
+        durations = spreading.expected_durations(db, [report_id])
+    finally:
+        db.close()
+    return spreading.schedule_offset(report_id, durations.get(report_id))
 
 
 def schedule_report(report: Report):
     """
-    Schedule a single report based on its cron expression.
+    Schedule a single report based on its cron expression, or update its
+    existing job if the schedule changed.
     
     Args:
         report: Report model instance
@@ -50,67 +238,226 @@ def schedule_report(report: Report):
             logger.warning("Scheduler is not running. Starting scheduler...")
             scheduler.start()
         
-        # Parse cron expression (format: "minute hour day month day_of_week")
-        cron_parts = report.schedule_cron.split()
-        if len(cron_parts) != 5:
-            logger.error(f"Invalid cron expression for report {report.id}: {report.schedule_cron}")
-            return
-        
-        minute, hour, day, month, day_of_week = cron_parts
+        report_id = str(report.id)
+        try:
+            outcome = _apply_job(report_id, report.name, report.schedule_cron, _report_offset(report_id))
+        except Exception:
+            # Never leave the previous schedule firing
+            unschedule_report(report_id)
+            raise
+        if outcome != "unchanged":
+            logger.info(f"Scheduled report '{report.name}' (ID: {report.id}) with cron: {report.schedule_cron}")
         
-        # Create cron trigger
-        trigger = CronTrigger(
-            minute=minute,
-            hour=hour,
-            day=day,
-            month=month,
-            day_of_week=day_of_week
+    except Exception as e:
+        logger.error(f"Error scheduling report {report.id}: {str(e)}")
+        # Don't re-raise - let report creation succeed even if scheduling fails
+
+
+def get_schedule_info(report_id) -> Tuple[Optional[int], Optional[datetime]]:
+    """
+    Return the spreading offset and next effective fire time of a report's
+    job, or (None, None) if it isn't scheduled.
+    """
+    job = scheduler.get_job(str(report_id))
+    if job is None:
+        return None, None
+    return job.kwargs.get("offset_seconds", 0), getattr(job, "next_run_time", None)
+
+
+def get_schedule_infos(report_ids) -> Dict[str, Tuple[Optional[int], Optional[datetime]]]:
+    """
+    Return get_schedule_info() for many reports, by report ID, reading the
+    job store once instead of once per report.
+    """
+    report_ids = [str(report_id) for report_id in report_ids]
+    if scheduler.running:
+        jobs = jobstore.lookup_jobs(job_store, report_ids)
+    else:
+        # Jobs added before the scheduler started are only known to it
+        wanted = set(report_ids)
+        jobs = {job.id: job for job in scheduler.get_jobs() if job.id in wanted}
+    infos = {}
+    for report_id in report_ids:
+        job = jobs.get(report_id)
+        infos[report_id] = (
+            (None, None) if job is None
+            else (job.kwargs.get("offset_seconds", 0), getattr(job, "next_run_time", None))
         )
-        
-        # Add job to scheduler
+    return infos
+
+
+def unschedule_report(report_id):
+    """
+    Remove the job of a report, if it has one.
+    """
+    cron_index.remove(report_id)
+    try:
+        scheduler.remove_job(str(report_id))
+        report_cache.invalidate()
+        logger.info(f"Unscheduled report {report_id}")
+    except JobLookupError:
+        pass
+
+
+def sync_report_schedule(report: Report):
+    """
+    Bring the job of one report in line with its definition: schedule or
+    update it if the report is active, remove it otherwise. Other jobs are
+    not touched.
+    """
+    if report.is_active:
+        schedule_report(report)
+    else:
+        unschedule_report(report.id)
+
+
+def _report_jobs() -> Dict[str, object]:
+    """Return the scheduler's report jobs by report ID."""
+    return {job.id: job for job in scheduler.get_jobs() if job.func is trigger_report}
+
+
+def _missed_fires(job, now: datetime) -> List[datetime]:
+    """
+    Return the cron times of the fires a job missed up to now that the
+    misfire policy replays. Must be read from the job as stored, before its
+    trigger or offset is changed.
+    """
+    offset = timedelta(seconds=job.kwargs.get("offset_seconds", 0))
+    limit = {"coalesce": 1, "all": SCHEDULER_CATCHUP_MAX}.get(SCHEDULER_MISFIRE_POLICY, 0)
+    missed = []
+    fire_time = job.next_run_time
+    while fire_time is not None and fire_time <= now and len(missed) < limit:
+        missed.append(fire_slot((fire_time - offset).astimezone().replace(tzinfo=None)))
+        fire_time = job.trigger.get_next_fire_time(fire_time, now)
+    return missed
+
+
+def _catch_up(report_id: str, missed: List[datetime], trigger: BaseTrigger, now: datetime) -> int:
+    """
+    Queue the missed fires of a report whose job was past due while the
+    scheduler was down, and move the job to its next fire time after now.
+    
+    Catch-up fires are queued as one-off jobs keyed by their cron time, so in
+    cluster mode a fire another node already ran fails to claim its lease
+    and isn't repeated.
+    
+    Returns:
+        Number of catch-up fires queued
+    """
+    for cron_time in missed:
         scheduler.add_job(
-            func=trigger_report,
-            trigger=trigger,
-            args=[report.id],
-            id=str(report.id),
-            name=report.name,
-            replace_existing=True
+            _fire,
+            args=[report_id, cron_time],
+            name=f"catch-up {report_id}",
+            misfire_grace_time=None
         )
+    scheduler.modify_job(report_id, next_run_time=trigger.get_next_fire_time(None, now))
+    report_cache.invalidate()
+    return len(missed)
+
+
+def reconcile_scheduler(db: Session = None, catch_up: bool = False) -> Dict[str, int]:
+    """
+    Diff the active reports in the database against the scheduled jobs and
+    apply only the differences: add missing jobs, update changed schedules
+    and remove jobs of inactive or deleted reports. Jobs are never removed
+    and re-added, so unchanged reports keep firing throughout.
+    
+    Args:
+        db: Database session (a new one is opened if not given)
+        catch_up: Apply SCHEDULER_MISFIRE_POLICY to jobs that are past due,
+            i.e. missed fires while the scheduler was down, whether or not
+            their schedule changed since. Only meaningful at startup, before
+            the scheduler resumes.
+    
+    Returns:
+        Number of jobs added, updated, removed and unchanged, and of
+        catch-up fires queued
+    """
+    counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "caught_up": 0}
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        active_reports = (
+            db.query(Report.id, Report.name, Report.schedule_cron)
+            .filter(Report.is_active == True)
+            .all()
+        )
+        durations = spreading.expected_durations(db) if spreading.SCHEDULE_SPREAD_SECONDS > 0 else {}
+    finally:
+        if own_session:
+            db.close()
+    
+    now = datetime.now(scheduler.timezone)
+    # With the database job store, all changes are written in one transaction
+    with jobstore.batch(job_store):
+        jobs = _report_jobs()
+        for report in active_reports:
+            report_id = str(report.id)
+            job = jobs.pop(report_id, None)
+            # Read before _apply_job, which may replace the stored schedule
+            past_due = catch_up and job is not None and job.next_run_time is not None and job.next_run_time <= now
+            missed = _missed_fires(job, now) if past_due else []
+            try:
+                offset = spreading.schedule_offset(report_id, durations.get(report_id))
+                outcome = _apply_job(report_id, report.name, report.schedule_cron, offset, job)
+            except Exception as e:
+                logger.error(f"Error scheduling report {report_id}: {str(e)}")
+                # Never leave the previous schedule firing
+                unschedule_report(report_id)
+                if job is not None:
+                    counts["removed"] += 1
+                continue
+            counts[outcome] += 1
+            if past_due:
+                try:
+                    trigger = build_trigger(report.schedule_cron, offset)
+                    counts["caught_up"] += _catch_up(report_id, missed, trigger, now)
+                except Exception as e:
+                    logger.error(f"Error catching up report {report_id}: {str(e)}")
         
-        logger.info(f"Scheduled report '{report.name}' (ID: {report.id}) with cron: {report.schedule_cron}")
-        
-    except Exception as e:
-        logger.error(f"Error scheduling report {report.id}: {str(e)}")
-        # Don't re-raise - let report creation succeed even if scheduling fails
+        # Whatever is left belongs to reports that are inactive or gone
+        for report_id in jobs:
+            unschedule_report(report_id)
+            counts["removed"] += 1
+    
+    logger.info(
+        f"Reconciled scheduler with {len(active_reports)} active reports: "
+        f"{counts['added']} added, {counts['updated']} updated, "
+        f"{counts['removed']} removed, {counts['unchanged']} unchanged"
+        + (f", {counts['caught_up']} missed fires queued ({SCHEDULER_MISFIRE_POLICY})" if catch_up else "")
+    )
+    return counts
 
 
 def load_and_schedule_reports():
     """
-    Load all active reports from database and schedule them.
+    Load all active reports from database and schedule them, catching up
+    fires missed while the scheduler was down.
     """
-    db = SessionLocal()
     try:
-        active_reports = db.query(Report).filter(Report.is_active == True).all()
-        
-        logger.info(f"Loading {len(active_reports)} active reports")
-        
-        for report in active_reports:
-            schedule_report(report)
-            
+        reconcile_scheduler(catch_up=True)
     except Exception as e:
         logger.error(f"Error loading reports: {str(e)}")
-    finally:
-        db.close()
 
 
 def start_scheduler():
     """
     Start the scheduler and load all active reports.
+    
+    Jobs are reconciled (and missed fires caught up) while the scheduler is
+    paused, so stored jobs that are past due don't fire before the misfire
+    policy has been applied.
     """
     if not scheduler.running:
-        scheduler.start()
-        logger.info("Scheduler started")
+        started = time.perf_counter()
+        scheduler.start(paused=True)
+        if SCHEDULER_CLUSTER_MODE:
+            coordinator.start(_on_recovered_fire)
         load_and_schedule_reports()
+        scheduler.resume()
+        logger.info(f"Scheduler started in {time.perf_counter() - started:.2f}s")
     else:
         logger.warning("Scheduler is already running")
 
@@ -119,6 +466,8 @@ def stop_scheduler():
     """
     Stop the scheduler gracefully.
     """
+    if SCHEDULER_CLUSTER_MODE:
+        coordinator.stop()
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler stopped")
@@ -129,10 +478,7 @@ def stop_scheduler():
 def reload_scheduler():
     """
     Reload all reports from database and reschedule them.
-    Useful when reports are added, updated, or deleted.
+    Kept for callers that changed many reports; only the differences are
+    applied (see reconcile_scheduler).
     """
-    # Remove all existing jobs
-    scheduler.remove_all_jobs()
-    
-    # Reload and schedule
-    load_and_schedule_reports()
+    return reconcile_scheduler()
@@ -0,0 +1,71 @@
+import threading
+from typing import Dict, Optional
+
+
+class InFlightRun:
+    """
+    A run that is queued or executing. ready is set once its ReportRun row
+    has been committed, done once the run has finished.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.ready = threading.Event()
+        self.done = threading.Event()
+
+
+class SingleFlight:
+    """
+    Tracks at most one in-flight run per report within this process.
+
+    claim() registers a new in-flight run for a report or returns the one that
+    is already registered; release() marks it finished and wakes up waiters.
+    lock() returns a per-report lock that serializes execution.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, InFlightRun] = {}
+        self._report_locks: Dict[str, threading.Lock] = {}
+
+    def claim(self, report_id: str, run_id: str):
+        """
+        Claim the in-flight slot for a report on behalf of run_id.
+
+        Returns:
+            Tuple of (InFlightRun, claimed). claimed is False when another run
+            already holds the slot; the returned InFlightRun is then that run.
+        """
+        with self._lock:
+            existing = self._inflight.get(report_id)
+            if existing is not None:
+                return existing, False
+            inflight = InFlightRun(run_id)
+            self._inflight[report_id] = inflight
+            return inflight, True
+
+    def get(self, report_id: str) -> Optional[InFlightRun]:
+        """Return the in-flight run for a report, if any."""
+        with self._lock:
+            return self._inflight.get(report_id)
+
+    def release(self, report_id: str, run_id: Optional[str] = None):
+        """
+        Release the in-flight slot for a report and wake up waiters.
+        If run_id is given, the slot is only released if it belongs to that run.
+        """
+        with self._lock:
+            inflight = self._inflight.get(report_id)
+            if inflight is None or (run_id is not None and inflight.run_id != run_id):
+                return
+            del self._inflight[report_id]
+        inflight.ready.set()
+        inflight.done.set()
+
+    def lock(self, report_id: str) -> threading.Lock:
+        """Return the lock that serializes execution of a report."""
+        with self._lock:
+            report_lock = self._report_locks.get(report_id)
+            if report_lock is None:
+                report_lock = self._report_locks[report_id] = threading.Lock()
+            return report_lock
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from apscheduler.triggers.base import BaseTrigger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import hashlib
+import math
+import os
+import threading
+
+from app.models import ReportRun, RunMetrics, RunStatus
+
+# Spread fires of each cron time over this many seconds: every report gets a
+# fixed offset inside the window instead of all of them starting at :00.
+# 0 disables spreading.
+SCHEDULE_SPREAD_SECONDS = int(os.getenv("SCHEDULE_SPREAD_SECONDS", "0"))
+
+# Runs from this many days back estimate how long a report takes
+SCHEDULE_HISTORY_DAYS = int(os.getenv("SCHEDULE_HISTORY_DAYS", "14"))
+
+# At most SCHEDULE_MAX_STARTS_PER_SLICE scheduled runs start per slice of
+# SCHEDULE_SLICE_SECONDS; later fires are deferred to the next free slice.
+# 0 disables the cap.
+SCHEDULE_SLICE_SECONDS = int(os.getenv("SCHEDULE_SLICE_SECONDS", "10"))
+SCHEDULE_MAX_STARTS_PER_SLICE = int(os.getenv("SCHEDULE_MAX_STARTS_PER_SLICE", "0"))
+
+
+def schedule_offset(report_id: str, expected_seconds: Optional[float] = None, window: int = None) -> int:
+    """
+    Return a report's offset in seconds from its cron time.
+
+    The position inside the window comes from a hash of the report ID, so it
+    is the same on every node and across restarts. Reports expected to run
+    long are confined to the start of the window, so that they still finish
+    within it where possible.
+    """
+    if window is None:
+        window = SCHEDULE_SPREAD_SECONDS
+    if window <= 0:
+        return 0
+
+    # Whole minutes, so small changes in run time don't move the report
+    expected = math.ceil((expected_seconds or 0) / 60) * 60
+    span = max(window - expected, 1)
+    position = int(hashlib.sha256(str(report_id).encode("utf-8")).hexdigest()[:8], 16) / 2 ** 32
+    return int(position * span)
+
+
+def expected_durations(db: Session, report_ids: Iterable[str] = None) -> Dict[str, float]:
+    """
+    Return the average run time in seconds of recent successful runs per report.
+    Reports without recorded runs are missing from the result.
+    """
+    since = datetime.now() - timedelta(days=SCHEDULE_HISTORY_DAYS)
+    query = (
+        db.query(ReportRun.report_id, func.avg(RunMetrics.total_seconds))
+        .join(RunMetrics, RunMetrics.report_run_id == ReportRun.id)
+        .filter(
+            ReportRun.status == RunStatus.SUCCESS.value,
+            ReportRun.finished_at >= since
+        )
+        .group_by(ReportRun.report_id)
+    )
+    if report_ids is not None:
+        query = query.filter(ReportRun.report_id.in_([str(report_id) for report_id in report_ids]))
+    return {str(report_id): float(seconds) for report_id, seconds in query.all() if seconds is not None}
+
+
+class OffsetTrigger(BaseTrigger):
+    """Fires a fixed number of seconds after each fire time of another trigger."""
+
+    def __init__(self, trigger: BaseTrigger, offset_seconds: int):
+        self.trigger = trigger
+        self.offset_seconds = offset_seconds
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        offset = timedelta(seconds=self.offset_seconds)
+        previous = previous_fire_time - offset if previous_fire_time else None
+        next_fire_time = self.trigger.get_next_fire_time(previous, now - offset)
+        return next_fire_time + offset if next_fire_time else None
+
+    def __str__(self):
+        return f"{self.trigger} +{self.offset_seconds}s"
+
+    def __repr__(self):
+        return f"<OffsetTrigger ({self.trigger!r}, offset_seconds={self.offset_seconds})>"
+
+
+class StartLimiter:
+    """
+    Caps the number of scheduled runs starting per time slice.
+
+    reserve() books a start in the earliest slice with room left and never
+    blocks, so scheduler threads aren't held up by the cap.
+    """
+
+    def __init__(self, slice_seconds: int, max_starts: int):
+        self.slice_seconds = max(slice_seconds, 1)
+        self.max_starts = max_starts
+        self._lock = threading.Lock()
+        self._starts: Dict[int, int] = {}
+
+    def reserve(self, now: datetime = None) -> Optional[datetime]:
+        """
+        Book a start.
+
+        Returns:
+            None to start now, or the start of the later slice the run was booked in
+        """
+        if self.max_starts <= 0:
+            return None
+
+        now = now or datetime.now()
+        current = int(now.timestamp() // self.slice_seconds)
+        with self._lock:
+            for past in [s for s in self._starts if s < current]:
+                del self._starts[past]
+            booked = current
+            while self._starts.get(booked, 0) >= self.max_starts:
+                booked += 1
+            self._starts[booked] = self._starts.get(booked, 0) + 1
+
+        if booked == current:
+            return None
+        return datetime.fromtimestamp(booked * self.slice_seconds)
+
+
+# Global limiter instance
+start_limiter = StartLimiter(SCHEDULE_SLICE_SECONDS, SCHEDULE_MAX_STARTS_PER_SLICE)
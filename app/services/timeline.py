@@ -0,0 +1,227 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+from apscheduler.triggers.base import BaseTrigger
+from sqlalchemy.orm import Session
+import logging
+import os
+import threading
+import time
+
+from app.services import spreading
+from app.utils.cron import CompiledCron, compile_cron
+
+logger = logging.getLogger(__name__)
+
+# Expected run times come from a run history query that is reused for this
+# many seconds across timeline requests
+TIMELINE_HISTORY_CACHE_SECONDS = int(os.getenv("TIMELINE_HISTORY_CACHE_SECONDS", "60"))
+
+# Longest window the timeline can cover
+TIMELINE_MAX_HOURS = int(os.getenv("TIMELINE_MAX_HOURS", "744"))
+
+# Fire times taken from a trigger per report when its expression can't be compiled
+_MAX_TRIGGER_FIRES = 50000
+
+
+class IndexEntry(NamedTuple):
+    report_id: str
+    name: str
+    cron: Optional[CompiledCron]  # None if only the trigger understands the expression
+    offset_seconds: int
+    trigger: Optional[BaseTrigger]
+
+
+class CronIndex:
+    """
+    Compiled cron expressions of all scheduled reports, kept in step with
+    the scheduler's jobs, so the fires of the whole catalog can be computed
+    without asking the scheduler one job at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, IndexEntry] = {}
+
+    def put(self, report_id: str, name: str, schedule_cron: str, offset_seconds: int = 0, trigger: BaseTrigger = None):
+        """Add or replace the entry of a scheduled report."""
+        try:
+            cron = compile_cron(" ".join((schedule_cron or "").split()))
+        except ValueError:
+            # Accepted by the trigger (e.g. "last" day), so fall back to it
+            cron = None
+        entry = IndexEntry(str(report_id), name, cron, offset_seconds, trigger)
+        with self._lock:
+            self._entries[entry.report_id] = entry
+
+    def remove(self, report_id: str):
+        with self._lock:
+            self._entries.pop(str(report_id), None)
+
+    def entries(self) -> List[IndexEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Index of the scheduler in this process
+cron_index = CronIndex()
+
+_durations_lock = threading.Lock()
+_durations: Dict[str, float] = {}
+_durations_loaded_at: float = 0.0
+
+
+def _expected_durations(db: Session) -> Dict[str, float]:
+    global _durations, _durations_loaded_at
+    with _durations_lock:
+        if time.monotonic() - _durations_loaded_at >= TIMELINE_HISTORY_CACHE_SECONDS:
+            _durations = spreading.expected_durations(db)
+            _durations_loaded_at = time.monotonic()
+        return _durations
+
+
+def _trigger_fires(trigger: BaseTrigger, start: datetime, end: datetime) -> List[datetime]:
+    """Fire times of a trigger in [start, end), asking it one fire at a time."""
+    now = start.astimezone()
+    fires = []
+    fire_time = trigger.get_next_fire_time(None, now)
+    while fire_time is not None and len(fires) < _MAX_TRIGGER_FIRES:
+        fire_time = fire_time.astimezone().replace(tzinfo=None)
+        if fire_time >= end:
+            break
+        fires.append(fire_time)
+        fire_time = trigger.get_next_fire_time(fire_time.astimezone(), fire_time.astimezone())
+    return fires
+
+
+def build_timeline(
+    entries: List[IndexEntry],
+    start: datetime,
+    end: datetime,
+    slot_minutes: int,
+    durations: Dict[str, float] = None,
+    include_reports: bool = False
+) -> dict:
+    """
+    Merge the upcoming fires of the given reports in [start, end) into slots
+    of slot_minutes aligned to the clock.
+
+    Fires are aggregated per cron expression: reports sharing one are
+    bucketed by spreading offset, so the cost grows with the distinct cron
+    times in the window, not with the number of reports.
+
+    Returns:
+        Window, totals and the non-empty slots in time order, each with the
+        number of fires and the sum of the reports' expected run seconds
+    """
+    durations = durations or {}
+    slot_seconds = slot_minutes * 60
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    window_start = midnight + timedelta(seconds=(start - midnight).total_seconds() // slot_seconds * slot_seconds)
+    earliest = (start - window_start).total_seconds()
+    latest = (end - window_start).total_seconds()
+
+    fires = defaultdict(int)
+    expected = defaultdict(float)
+    reports = defaultdict(list)
+
+    def add(slot: int, count: int, seconds: float, report_ids: List[str]):
+        fires[slot] += count
+        expected[slot] += seconds
+        if include_reports:
+            reports[slot].extend(report_ids)
+
+    by_expression: Dict[str, List[IndexEntry]] = defaultdict(list)
+    for entry in entries:
+        if entry.cron is not None:
+            by_expression[entry.cron.expression].append(entry)
+        elif entry.trigger is not None:
+            seconds = durations.get(entry.report_id, 0.0)
+            for fire_time in _trigger_fires(entry.trigger, start, end):
+                add(int((fire_time - window_start).total_seconds() // slot_seconds), 1, seconds, [entry.report_id])
+
+    for group in by_expression.values():
+        # Reports of the expression by offset: (count, expected seconds, IDs)
+        offsets: Dict[int, list] = {}
+        for entry in group:
+            bucket = offsets.setdefault(entry.offset_seconds, [0, 0.0, []])
+            bucket[0] += 1
+            bucket[1] += durations.get(entry.report_id, 0.0)
+            bucket[2].append(entry.report_id)
+        max_offset = max(offsets)
+
+        # Cron times from the largest offset back, so offset fires landing in
+        # the window are included
+        cron_start = start - timedelta(seconds=max_offset)
+        shift = (cron_start.replace(second=0, microsecond=0) - window_start).total_seconds()
+        # Cron times whose fires all land inside the window, by position in
+        # their slot, then counted per slot
+        inner: Dict[float, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        for minute in group[0].cron.fire_minutes(cron_start, end):
+            cron_time = shift + minute * 60
+            if earliest <= cron_time and cron_time + max_offset < latest:
+                inner[cron_time % slot_seconds][int(cron_time // slot_seconds)] += 1
+                continue
+            # Near the ends of the window, each offset is checked
+            for offset, (count, seconds, report_ids) in offsets.items():
+                if earliest <= cron_time + offset < latest:
+                    add(int((cron_time + offset) // slot_seconds), count, seconds, report_ids)
+
+        for position, counts in inner.items():
+            # Offsets by how many slots they move a fire at this position
+            moves: Dict[int, list] = {}
+            for offset, (count, seconds, report_ids) in offsets.items():
+                move = moves.setdefault(int((position + offset) // slot_seconds), [0, 0.0, []])
+                move[0] += count
+                move[1] += seconds
+                move[2].extend(report_ids)
+            for slot, times in counts.items():
+                for move, (count, seconds, report_ids) in moves.items():
+                    add(slot + move, times * count, times * seconds, report_ids * times)
+
+    slots = []
+    for slot in sorted(fires):
+        item = {
+            "start": window_start + timedelta(seconds=slot * slot_seconds),
+            "fires": fires[slot],
+            "expected_seconds": round(expected[slot], 3),
+        }
+        if include_reports:
+            item["report_ids"] = sorted(reports[slot])
+        slots.append(item)
+
+    return {
+        "start": start,
+        "end": end,
+        "slot_minutes": slot_minutes,
+        "reports": len(entries),
+        "total_fires": sum(fires.values()),
+        "total_expected_seconds": round(sum(expected.values()), 3),
+        "peak_fires": max(fires.values(), default=0),
+        "slots": slots,
+    }
+
+
+def upcoming_timeline(db: Session, hours: int, slot_minutes: int, include_reports: bool = False) -> dict:
+    """
+    Return the merged timeline of the fires of all scheduled reports over
+    the next hours, with expected run times from recent run history.
+    """
+    started = time.perf_counter()
+    start = datetime.now()
+    timeline = build_timeline(
+        cron_index.entries(),
+        start,
+        start + timedelta(hours=hours),
+        slot_minutes,
+        _expected_durations(db),
+        include_reports
+    )
+    logger.debug(
+        f"Built timeline of {timeline['total_fires']} fires for {timeline['reports']} reports "
+        f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    return timeline
@@ -0,0 +1,559 @@
+"""
+Scheduler simulation and benchmark on a virtual clock.
+
+Creates synthetic reports in an in-memory SQLite database and drives the
+real scheduler code (app.services.scheduler) and runner over a simulated
+period, much faster than real time. Cron fires are processed by
+APScheduler's own job logic and executed on a simulated scheduler thread
+pool; runs go through create_run and run_report on simulated execution
+pools, taking a synthetic query duration of virtual time. Scheduler
+settings are read from the environment as usual, so two configurations can
+be compared by running the tool twice:
+
+    python -m app.simulate --reports 2000 --hours 24
+    SCHEDULE_SPREAD_SECONDS=600 python -m app.simulate --reports 2000 --hours 24
+"""
+import os
+
+# The simulation must never touch a real database or coordinate with other
+# nodes, so these are set before the application modules read them
+os.environ["DATABASE_URL"] = os.getenv("SIMULATION_DATABASE_URL", "sqlite://")
+os.environ["SCHEDULER_JOBSTORE"] = "memory"
+os.environ["SCHEDULER_CLUSTER_MODE"] = "false"
+os.environ["RUN_DISPATCH"] = "local"
+
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
+from apscheduler.executors.base import BaseExecutor, run_job
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.base import BaseScheduler
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import heapq
+import importlib
+import itertools
+import json
+import logging
+import math
+import random
+import sys
+import tempfile
+import time
+
+from app.db import engine, init_db, SessionLocal
+from app.models import Report, ReportRun
+from app.services import scheduler as scheduler_service
+from app.services.executor import QueueFullError, RUN_QUEUE_SIZE
+from app.services.jobstore import ReportJobStore
+from app.services.pools import POOL_SIZES, DEFAULT_POOL
+from app.services.runner import run_report
+from app.utils.validators import validate_cron_expression
+
+logger = logging.getLogger(__name__)
+
+# Cron expressions of the synthetic reports with their weights. {minute} and
+# {hour} are replaced by a random value per report.
+DEFAULT_CRON_MIX = "0 * * * *=30;0 9 * * *=30;*/15 * * * *=10;{minute} {hour} * * *=30"
+
+# Modules whose datetime.now() reads the virtual clock
+_CLOCK_MODULES = [
+    "apscheduler.schedulers.base",
+    "apscheduler.executors.base",
+    "apscheduler.triggers.date",
+    "app.services.scheduler",
+    "app.services.spreading",
+    "app.services.cluster",
+    "app.services.runner",
+    "app.services.cache",
+]
+
+
+class VirtualClock:
+    """Simulated current time (naive, local), moved forward by the simulation."""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def now(self, tz=None) -> datetime:
+        return self.current if tz is None else self.current.astimezone(tz)
+
+
+@contextmanager
+def virtual_time(clock: VirtualClock):
+    """Make datetime.now() return the virtual time in the scheduling modules."""
+    class VirtualDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now(tz)
+
+    patched = []
+    for name in _CLOCK_MODULES:
+        module = importlib.import_module(name)
+        patched.append((module, module.datetime))
+        module.datetime = VirtualDatetime
+    try:
+        yield
+    finally:
+        for module, original in patched:
+            module.datetime = original
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values, None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+class VirtualExecutor(BaseExecutor):
+    """Hands fires submitted by the scheduler to the simulation's thread pool."""
+
+    def __init__(self, simulation: "Simulation"):
+        super().__init__()
+        self.simulation = simulation
+
+    def _do_submit_job(self, job, run_times):
+        self.simulation.queue_fire(job, run_times)
+
+
+class VirtualScheduler(BaseScheduler):
+    """Scheduler without a thread of its own; the simulation processes its jobs."""
+
+    def __init__(self, executor: VirtualExecutor, job_store):
+        super().__init__(executors={"default": executor}, jobstores={"default": job_store})
+        self.wakeup_requested = False
+
+    def shutdown(self, wait=True):
+        super().shutdown(wait)
+
+    def wakeup(self):
+        self.wakeup_requested = True
+
+
+class SimulatedPools:
+    """
+    Execution pools in virtual time, with the sizes, queue bound and dispatch
+    order of the real RunExecutor. Runs execute with run_report when their
+    simulated duration has passed.
+    """
+
+    def __init__(self, simulation: "Simulation"):
+        self.simulation = simulation
+        self._queues: Dict[str, list] = {name: [] for name in POOL_SIZES}
+        self._active: Dict[str, Dict[str, datetime]] = {name: {} for name in POOL_SIZES}
+        self._running_reports: Dict[str, Dict[str, str]] = {name: {} for name in POOL_SIZES}  # run ID -> report ID
+        self._sequence = itertools.count()
+        self.busy_seconds: Dict[str, float] = {name: 0.0 for name in POOL_SIZES}
+        self.peak_queue: Dict[str, int] = {name: 0 for name in POOL_SIZES}
+
+    def submit_run(self, run_id: str, output_dir: str = None, pool: str = DEFAULT_POOL, priority: int = 0,
+                   report_id: str = None) -> Future:
+        """Stands in for executor.submit_run."""
+        pool = pool if pool in POOL_SIZES else DEFAULT_POOL
+        queue = self._queues[pool]
+        if len(self._active[pool]) + len(queue) >= POOL_SIZES[pool] + RUN_QUEUE_SIZE:
+            self.simulation.stats["rejected"] += 1
+            raise QueueFullError(f"Run queue of pool {pool} is full")
+        future = Future()
+        heapq.heappush(queue, (
+            -priority, next(self._sequence), str(run_id), self.simulation.clock.current, future,
+            str(report_id) if report_id else None
+        ))
+        self.peak_queue[pool] = max(self.peak_queue[pool], len(queue))
+        self._dispatch(pool)
+        return future
+
+    def _dispatch(self, pool: str):
+        queue = self._queues[pool]
+        # Like RunPool, runs of a report that is executing stay queued
+        held = []
+        while queue and len(self._active[pool]) < POOL_SIZES[pool]:
+            entry = heapq.heappop(queue)
+            _, _, run_id, submitted_at, future, report_id = entry
+            if report_id is not None and report_id in self._running_reports[pool].values():
+                held.append(entry)
+                continue
+            if report_id is not None:
+                self._running_reports[pool][run_id] = report_id
+            now = self.simulation.clock.current
+            self.simulation.queue_waits.append((now - submitted_at).total_seconds())
+            self._active[pool][run_id] = now
+            duration = self.simulation.run_duration(run_id)
+            self.simulation.schedule(now + timedelta(seconds=duration), self._finish, pool, run_id, future)
+        for entry in held:
+            heapq.heappush(queue, entry)
+
+    def _finish(self, pool: str, run_id: str, future: Future):
+        started_at = self._active[pool].pop(run_id)
+        self._running_reports[pool].pop(run_id, None)
+        finished_at = self.simulation.clock.current
+        self.busy_seconds[pool] += (finished_at - started_at).total_seconds()
+        self.simulation.execute_run(run_id, started_at, finished_at)
+        future.set_result(None)
+        self._dispatch(pool)
+
+    def close(self, end: datetime):
+        """Count the runs still executing at the end of the simulated period."""
+        for pool, active in self._active.items():
+            for started_at in active.values():
+                self.busy_seconds[pool] += (end - started_at).total_seconds()
+
+
+class Simulation:
+    """
+    Discrete-event simulation of the scheduler and runner.
+
+    The virtual clock jumps from one event to the next: a scheduler wakeup,
+    a scheduler thread becoming free or a run finishing. A fire occupies a
+    scheduler thread for the real time its code took (or fire_cost_ms), so
+    lag and missed fires reflect the cost of the scheduling code itself.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        hours: float,
+        fire_threads: int = 10,
+        fire_cost_ms: float = None,
+        seed: int = 0,
+        jobstore: str = "memory"
+    ):
+        self.clock = VirtualClock(start)
+        self.end = start + timedelta(hours=hours)
+        self.hours = hours
+        self.fire_threads = fire_threads
+        self.fire_cost_ms = fire_cost_ms
+        self.random = random.Random(seed)
+        self.output_dir = tempfile.TemporaryDirectory(prefix="simulation-")
+
+        self._events = []  # heap of (time, sequence, callback, args)
+        self._sequence = itertools.count()
+        self._fires = []  # FIFO of (job, run_times) waiting for a scheduler thread
+        self._free_threads = fire_threads
+        self.executor = VirtualExecutor(self)
+        # The database job store lives in the simulation's own database
+        self.job_store = ReportJobStore(engine=engine) if jobstore == "database" else MemoryJobStore()
+        self.scheduler = VirtualScheduler(self.executor, self.job_store)
+        self.scheduler.add_listener(self._on_event, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+        self.pools = SimulatedPools(self)
+
+        self.report_durations: Dict[str, float] = {}
+        self.duration_jitter = 0.0
+        self.fire_lags: List[float] = []
+        self.queue_waits: List[float] = []
+        self.fire_costs: List[float] = []
+        self.stats = {
+            "fires": 0, "missed": 0, "skipped": 0, "deferred": 0,
+            "rejected": 0, "succeeded": 0, "failed": 0,
+        }
+
+    def create_reports(
+        self,
+        count: int,
+        cron_mix: str = DEFAULT_CRON_MIX,
+        mean_duration: float = 30.0,
+        duration_spread: float = 1.0,
+        duration_jitter: float = 0.2,
+        rows: int = 10,
+        policy: str = "COALESCE"
+    ):
+        """
+        Create synthetic reports.
+
+        Args:
+            count: Number of reports
+            cron_mix: "expression=weight;..." distribution of schedules
+            mean_duration: Median simulated run time in seconds
+            duration_spread: Log-normal sigma of run times across reports
+            duration_jitter: Log-normal sigma of run times across runs of a report
+            rows: Rows returned by each report query
+            policy: Concurrency policy of the reports
+        """
+        expressions, weights = [], []
+        for item in cron_mix.split(";"):
+            expression, _, weight = item.rpartition("=")
+            expressions.append(expression.strip())
+            weights.append(float(weight))
+
+        sql_query = (
+            f"WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r WHERE n < {max(rows, 1)}) "
+            f"SELECT n AS id, 'row ' || n AS label FROM r"
+        )
+        self.duration_jitter = duration_jitter
+        db = SessionLocal()
+        try:
+            for i in range(count):
+                schedule_cron = self.random.choices(expressions, weights)[0].format(
+                    minute=self.random.randrange(60), hour=self.random.randrange(24)
+                )
+                is_valid, error = validate_cron_expression(schedule_cron)
+                if not is_valid:
+                    raise ValueError(f"{schedule_cron}: {error}")
+                report = Report(
+                    name=f"simulated-{i:05d}",
+                    sql_query=sql_query,
+                    schedule_cron=schedule_cron,
+                    output_format="CSV",
+                    concurrency_policy=policy,
+                    is_active=True
+                )
+                db.add(report)
+                db.flush()
+                self.report_durations[str(report.id)] = mean_duration * self.random.lognormvariate(0, duration_spread)
+            db.commit()
+        finally:
+            db.close()
+
+    def run_duration(self, run_id: str) -> float:
+        db = SessionLocal()
+        try:
+            report_id = db.query(ReportRun.report_id).filter(ReportRun.id == run_id).scalar()
+        finally:
+            db.close()
+        return self.report_durations.get(str(report_id), 0.0) * self.random.lognormvariate(0, self.duration_jitter)
+
+    def schedule(self, when: datetime, callback, *args):
+        heapq.heappush(self._events, (when, next(self._sequence), callback, args))
+
+    def queue_fire(self, job, run_times):
+        self._fires.append((job, run_times))
+
+    def _on_event(self, event):
+        if event.code == EVENT_JOB_MISSED:
+            self.stats["missed"] += 1
+        else:
+            self.stats["skipped"] += len(event.scheduled_run_times)
+
+    def _dispatch_fires(self):
+        """Execute queued fires on free scheduler threads."""
+        while self._fires and self._free_threads > 0:
+            job, run_times = self._fires.pop(0)
+            self._free_threads -= 1
+            now = self.clock.current
+            started = time.perf_counter()
+            events = run_job(job, job._jobstore_alias, run_times, self.executor._logger.name)
+            cost = time.perf_counter() - started
+            self.executor._run_job_success(job.id, events)
+
+            for event in events:
+                if event.code == EVENT_JOB_MISSED:
+                    continue
+                if job.func is scheduler_service.trigger_report:
+                    self.stats["fires"] += 1
+                    self.fire_lags.append((now - event.scheduled_run_time.astimezone().replace(tzinfo=None)).total_seconds())
+                elif job.func is scheduler_service._run_fire:
+                    self.stats["deferred"] += 1
+            self.fire_costs.append(cost)
+            busy = self.fire_cost_ms / 1000 if self.fire_cost_ms is not None else cost
+            self.schedule(now + timedelta(seconds=busy), self._free_thread)
+
+    def _free_thread(self):
+        self._free_threads += 1
+
+    def execute_run(self, run_id: str, started_at: datetime, finished_at: datetime):
+        """
+        Execute a run whose simulated duration has passed. The runner records
+        it as running from started_at; the finish time is then set to the
+        simulated one. Runs hold their in-flight slot until here, as they do
+        while a real query executes.
+        """
+        finished_now = self.clock.current
+        self.clock.current = started_at
+        db = SessionLocal()
+        try:
+            report_run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
+            run_report(db, report_run, self.output_dir.name)
+            self.stats["succeeded"] += 1
+        except Exception as e:
+            logger.debug(f"Simulated run {run_id} failed: {str(e)}")
+            self.stats["failed"] += 1
+        finally:
+            db.query(ReportRun).filter(ReportRun.id == run_id).update({
+                ReportRun.finished_at: finished_at,
+                ReportRun.duration_seconds: (finished_at - started_at).total_seconds()
+            })
+            db.commit()
+            db.close()
+            self.clock.current = finished_now
+
+    def run(self) -> dict:
+        """Simulate the period and return the measurements."""
+        real_started = time.perf_counter()
+        original_scheduler, original_submit = scheduler_service.scheduler, scheduler_service.submit_run
+        original_store = scheduler_service.job_store
+        scheduler_service.scheduler = self.scheduler
+        scheduler_service.submit_run = self.pools.submit_run
+        scheduler_service.job_store = self.job_store
+        try:
+            with virtual_time(self.clock):
+                self.scheduler.start()
+                reconciled_at = time.perf_counter()
+                scheduler_service.reconcile_scheduler()
+                reconcile_seconds = time.perf_counter() - reconciled_at
+                # What a restart does with the jobs already in the store
+                reconciled_at = time.perf_counter()
+                scheduler_service.reconcile_scheduler(catch_up=True)
+                restart_reconcile_seconds = time.perf_counter() - reconciled_at
+                next_wakeup = self.clock.current
+                while True:
+                    if self.scheduler.wakeup_requested:
+                        self.scheduler.wakeup_requested = False
+                        next_wakeup = self.clock.current
+                    next_event = self._events[0][0] if self._events else None
+                    if next_event is not None and (next_wakeup is None or next_event <= next_wakeup):
+                        if next_event >= self.end:
+                            break
+                        when, _, callback, args = heapq.heappop(self._events)
+                        self.clock.current = max(when, self.clock.current)
+                        callback(*args)
+                    elif next_wakeup is not None and next_wakeup < self.end:
+                        self.clock.current = max(next_wakeup, self.clock.current)
+                        wait_seconds = self.scheduler._process_jobs()
+                        next_wakeup = (
+                            self.clock.current + timedelta(seconds=wait_seconds)
+                            if wait_seconds is not None else None
+                        )
+                    else:
+                        break
+                    self._dispatch_fires()
+                self.clock.current = self.end
+                self.pools.close(self.end)
+                self.scheduler.shutdown(wait=False)
+        finally:
+            scheduler_service.scheduler = original_scheduler
+            scheduler_service.submit_run = original_submit
+            scheduler_service.job_store = original_store
+            self.output_dir.cleanup()
+
+        db = SessionLocal()
+        try:
+            coalesced = sum(count or 0 for (count,) in db.query(ReportRun.coalesced_count).all())
+        finally:
+            db.close()
+        completed = self.stats["succeeded"] + self.stats["failed"]
+        window = self.hours * 3600
+        return {
+            "reports": len(self.report_durations),
+            "start": (self.end - timedelta(hours=self.hours)).isoformat(),
+            "hours": self.hours,
+            "real_seconds": round(time.perf_counter() - real_started, 3),
+            "jobstore": "database" if isinstance(self.job_store, ReportJobStore) else "memory",
+            "reconcile_seconds": round(reconcile_seconds, 3),
+            "restart_reconcile_seconds": round(restart_reconcile_seconds, 3),
+            "fires": {
+                "executed": self.stats["fires"],
+                "missed": self.stats["missed"],
+                "skipped_max_instances": self.stats["skipped"],
+                "deferred_starts": self.stats["deferred"],
+                "mean_cost_ms": round(sum(self.fire_costs) / len(self.fire_costs) * 1000, 3) if self.fire_costs else None,
+            },
+            "fire_lag_seconds": summarize(self.fire_lags),
+            "queue_wait_seconds": summarize(self.queue_waits),
+            "runs": {
+                "succeeded": self.stats["succeeded"],
+                "failed": self.stats["failed"],
+                "coalesced": coalesced,
+                "rejected_queue_full": self.stats["rejected"],
+                "throughput_per_hour": round(completed / self.hours, 2) if self.hours else None,
+            },
+            "pools": {
+                name: {
+                    "workers": size,
+                    "utilization": round(self.pools.busy_seconds[name] / (size * window), 4) if window else None,
+                    "peak_queue": self.pools.peak_queue[name],
+                }
+                for name, size in POOL_SIZES.items()
+            },
+        }
+
+
+def _format_seconds(summary: Dict[str, Optional[float]]) -> str:
+    return "  ".join(
+        f"{key} {value:.3f}s" if value is not None else f"{key} -"
+        for key, value in summary.items()
+    )
+
+
+def print_report(result: dict):
+    fires, runs = result["fires"], result["runs"]
+    print(
+        f"Simulated {result['reports']} reports over {result['hours']}h from {result['start']} "
+        f"in {result['real_seconds']}s"
+    )
+    print(
+        f"Reconcile:   {result['reconcile_seconds']}s on first start, "
+        f"{result['restart_reconcile_seconds']}s on restart ({result['jobstore']} job store)"
+    )
+    print(
+        f"Fires:       {fires['executed']} executed, {fires['missed']} missed, "
+        f"{fires['skipped_max_instances']} skipped (max instances), {fires['deferred_starts']} deferred starts, "
+        f"mean cost {fires['mean_cost_ms']}ms"
+    )
+    print(f"Fire lag:    {_format_seconds(result['fire_lag_seconds'])}")
+    print(f"Queue wait:  {_format_seconds(result['queue_wait_seconds'])}")
+    print(
+        f"Runs:        {runs['succeeded']} succeeded, {runs['failed']} failed, {runs['coalesced']} coalesced, "
+        f"{runs['rejected_queue_full']} rejected (queue full), {runs['throughput_per_hour']}/h"
+    )
+    for name, pool in result["pools"].items():
+        print(f"Pool {name}: {pool['workers']} workers, {pool['utilization']:.1%} utilized, peak queue {pool['peak_queue']}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Simulate the scheduler and runner on a virtual clock")
+    parser.add_argument("--reports", type=int, default=500, help="Number of synthetic reports")
+    parser.add_argument("--hours", type=float, default=24, help="Simulated period")
+    parser.add_argument("--start", default=None, help="Start of the period (ISO format, default: next midnight)")
+    parser.add_argument("--cron", default=DEFAULT_CRON_MIX, help="Schedules as 'expression=weight;...'")
+    parser.add_argument("--mean-duration", type=float, default=30.0, help="Median run time in seconds")
+    parser.add_argument("--duration-spread", type=float, default=1.0, help="Log-normal sigma of run times across reports")
+    parser.add_argument("--duration-jitter", type=float, default=0.2, help="Log-normal sigma of run times across runs")
+    parser.add_argument("--rows", type=int, default=10, help="Rows returned by each report query")
+    parser.add_argument("--policy", default="COALESCE", help="Concurrency policy of the reports")
+    parser.add_argument("--fire-threads", type=int, default=10, help="Scheduler threads (APScheduler's default is 10)")
+    parser.add_argument("--fire-cost-ms", type=float, default=None, help="Scheduler thread time per fire (default: measured)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobstore", choices=["memory", "database"], default="memory",
+                        help="Job store of the scheduler (see SCHEDULER_JOBSTORE)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's info logs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.verbose:
+        # Skipped and missed fires are logged one by one and counted anyway
+        logging.getLogger().setLevel(logging.ERROR)
+
+    if args.start:
+        start = datetime.fromisoformat(args.start)
+    else:
+        start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    init_db()
+    simulation = Simulation(start, args.hours, args.fire_threads, args.fire_cost_ms, args.seed, args.jobstore)
+    simulation.create_reports(
+        args.reports, args.cron, args.mean_duration, args.duration_spread,
+        args.duration_jitter, args.rows, args.policy.upper()
+    )
+    result = simulation.run()
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List
+
+
+# Fields of a cron expression with their value ranges. Days of the week count
+# from 0 = Monday, like the scheduler's (APScheduler) cron triggers.
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("day_of_week", 0, 6),
+)
+
+_NAMES = {
+    "month": {name: number for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+    )},
+    "day_of_week": {name: number for number, name in enumerate(["mon", "tue", "wed", "thu", "fri", "sat", "sun"])},
+}
+
+
+def _value(token: str, field: str, min_val: int, max_val: int) -> int:
+    token = token.strip().lower()
+    if token in _NAMES.get(field, {}):
+        return _NAMES[field][token]
+    value = int(token)  # ValueError for anything else
+    if not min_val <= value <= max_val:
+        raise ValueError(token)
+    return value
+
+
+def _parse_field(part: str, field: str, min_val: int, max_val: int) -> int:
+    """
+    Return the bitmask of the values a field matches (bit n set = value n).
+    Handles: *, */n, n, n-m, n-m/s, n/s and comma-separated lists of these.
+    """
+    mask = 0
+    for segment in part.split(","):
+        base, _, step = segment.partition("/")
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(segment)
+        if base == "*":
+            first, last = min_val, max_val
+        elif "-" in base:
+            start, end = base.split("-", 1)
+            first, last = _value(start, field, min_val, max_val), _value(end, field, min_val, max_val)
+            if first > last:
+                raise ValueError(segment)
+        else:
+            first = _value(base, field, min_val, max_val)
+            # "n/s" runs from n to the end of the range
+            last = max_val if "/" in segment else first
+        for value in range(first, last + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+class CompiledCron:
+    """
+    A cron expression compiled to one bitmask per field, for computing many
+    fire times without building triggers.
+
+    As with the scheduler's triggers, a time matches when every field
+    matches, including both day and day_of_week.
+    """
+
+    __slots__ = ("expression", "minutes", "hours", "days", "months", "weekdays", "_times_of_day")
+
+    def __init__(self, expression: str, minutes: int, hours: int, days: int, months: int, weekdays: int):
+        self.expression = expression
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = weekdays
+        self._times_of_day = [
+            hour * 60 + minute
+            for hour in range(24) if hours >> hour & 1
+            for minute in range(60) if minutes >> minute & 1
+        ]
+
+    def matches_day(self, day: date) -> bool:
+        """Return whether the expression fires at some time on a day."""
+        return bool(self.days >> day.day & 1 and self.months >> day.month & 1 and self.weekdays >> day.weekday() & 1)
+
+    def fire_minutes(self, start: datetime, end: datetime) -> List[int]:
+        """
+        Return the fire times in [start, end) as whole minutes since the
+        minute of start.
+        """
+        origin = start.replace(second=0, microsecond=0)
+        # The current minute has begun unless start is on the minute
+        earliest = 1 if start > origin else 0
+        span = (end - origin).total_seconds() / 60
+        fires = []
+        day = origin.date()
+        day_offset = -(origin.hour * 60 + origin.minute)
+        while day_offset < span:
+            if self.matches_day(day):
+                for time_of_day in self._times_of_day:
+                    minute = day_offset + time_of_day
+                    if minute < earliest:
+                        continue
+                    if minute >= span:
+                        break
+                    fires.append(minute)
+            day += timedelta(days=1)
+            day_offset += 24 * 60
+        return fires
+
+    def fire_times(self, start: datetime, end: datetime) -> List[datetime]:
+        """Return the fire times in [start, end)."""
+        origin = start.replace(second=0, microsecond=0)
+        return [origin + timedelta(minutes=minute) for minute in self.fire_minutes(start, end)]
+
+
+@lru_cache(maxsize=4096)
+def compile_cron(expression: str) -> CompiledCron:
+    """
+    Compile a cron expression ("minute hour day month day_of_week").
+
+    Raises:
+        ValueError: If the expression is malformed, naming the invalid field
+    """
+    if not expression or not isinstance(expression, str):
+        raise ValueError("Cron expression must be a non-empty string")
+    parts = expression.split()
+    if len(parts) != 5:
+        raise ValueError("Cron expression must have exactly 5 fields: minute hour day month day_of_week")
+
+    masks = []
+    for part, (field, min_val, max_val) in zip(parts, CRON_FIELDS):
+        try:
+            masks.append(_parse_field(part, field, min_val, max_val))
+        except ValueError:
+            raise ValueError(f"Invalid {field} field: {part}") from None
+    return CompiledCron(" ".join(parts), *masks)
@@ -0,0 +1,68 @@
+import hashlib
+import re
+
+
+# Quoted strings and identifiers are kept verbatim; everything else is normalized
+_SQL_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*')          # 'string literal'
+    | (?P<ident>"(?:[^"]|"")*")         # "quoted identifier"
+    | (?P<line_comment>--[^\n]*)        # -- comment
+    | (?P<block_comment>/\*.*?\*/)      # /* comment */
+    | (?P<space>\s+)
+    | (?P<word>[\w$]+)
+    | (?P<punct>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Normalize a SQL query so that queries differing only in whitespace,
+    keyword/identifier case or comments compare equal.
+    Quoted strings and identifiers are left untouched.
+
+    Args:
+        sql_query: SQL query string
+
+    Returns:
+        Normalized SQL query string
+    """
+    parts = []
+    previous_kind = None
+    pending_space = False
+    for match in _SQL_TOKEN_PATTERN.finditer(sql_query or ""):
+        kind = match.lastgroup
+        if kind in ("space", "line_comment", "block_comment"):
+            pending_space = True
+            continue
+        # Whitespace is only significant between two words ("a b" vs "ab")
+        if pending_space and kind == "word" and previous_kind == "word":
+            parts.append(" ")
+        pending_space = False
+        previous_kind = kind
+        token = match.group()
+        parts.append(token if kind in ("string", "ident") else token.lower())
+
+    normalized = "".join(parts)
+    # A trailing semicolon doesn't change the query
+    return normalized.rstrip(";").rstrip()
+
+
+def sql_fingerprint(sql_query: str, *qualifiers: str) -> str:
+    """
+    Return a stable fingerprint of a normalized SQL query.
+
+    Args:
+        sql_query: SQL query string
+        qualifiers: Extra values that must also match (e.g. data source, format)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(normalize_sql(sql_query).encode("utf-8"))
+    for qualifier in qualifiers:
+        digest.update(b"\x00")
+        digest.update(str(qualifier or "").encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Tuple
+import base64
+import json
+
+
+def encode_cursor(started_at: datetime, run_id: str) -> str:
+    """
+    Encode the position after a run in a list ordered by (started_at, id)
+    as an opaque, URL-safe cursor.
+    """
+    payload = json.dumps([started_at.isoformat(), str(run_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        started_at, run_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(started_at), str(run_id)
+    except Exception:
+        raise ValueError("Invalid cursor") from None
@@ -1,12 +1,18 @@
 import re
 from typing import Tuple
 
+from app.utils.cron import compile_cron
+
 
 def validate_cron_expression(cron: str) -> Tuple[bool, str]:
     """
     Validate cron expression format.
     Expected format: "minute hour day month day_of_week"
-    Each field can be: number, *, */n, n-m, n,m, or combinations.
+    Each field can be: number, *, */n, n-m, n-m/s, n,m, or combinations;
+    months and days of the week can also be given by name (jan, mon).
+    Days of the week count from 0 = Monday, as APScheduler's CronTrigger
+    (also CronTrigger.from_crontab) reads them; the scheduler builds its
+    triggers with it, so any expression valid here is schedulable.
     
     Args:
         cron: Cron expression string
@@ -17,117 +23,14 @@ def validate_cron_expression(cron: str) -> Tuple[bool, str]:
     if not cron or not isinstance(cron, str):
         return False, "Cron expression must be a non-empty string"
     
-    parts = cron.strip().split()
-    
-    if len(parts) != 5:
-        return False, "Cron expression must have exactly 5 fields: minute hour day month day_of_week"
-    
-    # Basic pattern for cron field validation
-    cron_field_pattern = re.compile(
-        r'^(\*|(\d+(-\d+)?)(,\d+(-\d+)?)*|(\d+|\*)/\d+)$'
-    )
-    
-    field_names = ["minute", "hour", "day", "month", "day_of_week"]
-    
-    for i, part in enumerate(parts):
-        # Allow * for all fields
-        if part == "*":
-            continue
-        
-        # Check if it matches basic cron field pattern
-        if not cron_field_pattern.match(part):
-            return False, f"Invalid {field_names[i]} field: {part}"
-        
-        # Additional validation for specific fields
-        if i == 0:  # minute
-            if not validate_minute_field(part):
-                return False, f"Invalid minute field: {part}"
-        elif i == 1:  # hour
-            if not validate_hour_field(part):
-                return False, f"Invalid hour field: {part}"
-        elif i == 2:  # day
-            if not validate_day_field(part):
-                return False, f"Invalid day field: {part}"
-        elif i == 3:  # month
-            if not validate_month_field(part):
-                return False, f"Invalid month field: {part}"
-        elif i == 4:  # day_of_week
-            if not validate_day_of_week_field(part):
-                return False, f"Invalid day_of_week field: {part}"
+    try:
+        compile_cron(cron)
+    except ValueError as e:
+        return False, str(e)
     
     return True, ""
 
 
-def validate_minute_field(field: str) -> bool:
-    """Validate minute field (0-59)."""
-    return validate_numeric_range(field, 0, 59)
-
-
-def validate_hour_field(field: str) -> bool:
-    """Validate hour field (0-23)."""
-    return validate_numeric_range(field, 0, 23)
-
-
-def validate_day_field(field: str) -> bool:
-    """Validate day field (1-31)."""
-    return validate_numeric_range(field, 1, 31)
-
-
-def validate_month_field(field: str) -> bool:
-    """Validate month field (1-12)."""
-    return validate_numeric_range(field, 1, 12)
-
-
-def validate_day_of_week_field(field: str) -> bool:
-    """Validate day of week field (0-6, where 0=Sunday)."""
-    return validate_numeric_range(field, 0, 6)
-
-
-def validate_numeric_range(field: str, min_val: int, max_val: int) -> bool:
-    """
-    Validate that numeric values in cron field are within range.
-    Handles: *, */n, n, n-m, n,m, n-m,n
-    """
-    if field == "*":
-        return True
-    
-    # Handle */n
-    if "/" in field:
-        parts = field.split("/")
-        if len(parts) != 2 or parts[0] != "*":
-            return False
-        try:
-            val = int(parts[1])
-            return min_val <= val <= max_val
-        except ValueError:
-            return False
-    
-    # Handle ranges and lists
-    for segment in field.split(","):
-        if "-" in segment:
-            range_parts = segment.split("-")
-            if len(range_parts) != 2:
-                return False
-            try:
-                start = int(range_parts[0])
-                end = int(range_parts[1])
-                if not (min_val <= start <= max_val and min_val <= end <= max_val):
-                    return False
-                if start > end:
-                    return False
-            except ValueError:
-                return False
-        else:
-            try:
-                val = int(segment)
-                if not (min_val <= val <= max_val):
-                    return False
-            except ValueError:
-                return False
-    
-    return True
-
-
 def validate_sql_query(sql_query: str) -> Tuple[bool, str]:
     """
     Basic SQL query validation.
@@ -175,7 +78,7 @@ def validate_output_format(output_format: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    valid_formats = ["CSV", "JSON"]
+    valid_formats = ["CSV", "JSON", "JSONL", "PARQUET"]
     
     if not output_format or not isinstance(output_format, str):
         return False, "Output format must be a non-empty string"
@@ -184,3 +87,117 @@ def validate_output_format(output_format: str) -> Tuple[bool, str]:
         return False, f"Output format must be one of: {', '.join(valid_formats)}"
     
     return True, ""
+
+
+def validate_compression(compression: str) -> Tuple[bool, str]:
+    """
+    Validate output compression.
+    Empty values and "none" mean the output is written uncompressed.
+    
+    Args:
+        compression: Compression name string
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    valid_compressions = ["none", "gzip", "zstd"]
+    
+    if compression is None:
+        return True, ""
+    
+    if not isinstance(compression, str):
+        return False, "Compression must be a string"
+    
+    if compression.strip() and compression.strip().lower() not in valid_compressions:
+        return False, f"Compression must be one of: {', '.join(valid_compressions)}"
+    
+    return True, ""
+
+
+def validate_concurrency_policy(policy: str) -> Tuple[bool, str]:
+    """
+    Validate a report's concurrency policy.
+    
+    Args:
+        policy: Policy name string (COALESCE, QUEUE or REJECT)
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    valid_policies = ["COALESCE", "QUEUE", "REJECT"]
+    
+    if not policy or not isinstance(policy, str):
+        return False, "Concurrency policy must be a non-empty string"
+    
+    if policy.upper() not in valid_policies:
+        return False, f"Concurrency policy must be one of: {', '.join(valid_policies)}"
+    
+    return True, ""
+
+
+def validate_watermark_column(column: str) -> Tuple[bool, str]:
+    """
+    Validate the watermark column of an incremental report.
+    It is injected into the report query, so only plain identifiers are allowed.
+    
+    Args:
+        column: Column name string
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if not column or not isinstance(column, str):
+        return False, "Watermark column must be a non-empty string"
+    
+    if not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', column):
+        return False, f"Invalid watermark column: {column}"
+    
+    return True, ""
+
+
+def validate_incremental_mode(mode: str, output_format: str = None) -> Tuple[bool, str]:
+    """
+    Validate the incremental mode of a report.
+    APPEND needs an output format that can be appended to.
+    
+    Args:
+        mode: Mode string (APPEND or DELTA)
+        output_format: Output format of the report
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    valid_modes = ["APPEND", "DELTA"]
+    appendable_formats = ["CSV", "JSONL", "PARQUET"]
+    
+    if not mode or not isinstance(mode, str):
+        return False, "Incremental mode must be a non-empty string"
+    
+    if mode.upper() not in valid_modes:
+        return False, f"Incremental mode must be one of: {', '.join(valid_modes)}"
+    
+    if mode.upper() == "APPEND" and output_format and output_format.upper() not in appendable_formats:
+        return False, f"APPEND mode requires one of these output formats: {', '.join(appendable_formats)}"
+    
+    return True, ""
+
+
+def validate_priority(priority: str) -> Tuple[bool, str]:
+    """
+    Validate a report's priority class.
+    
+    Args:
+        priority: Priority name string (HIGH, NORMAL or LOW)
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    valid_priorities = ["HIGH", "NORMAL", "LOW"]
+    
+    if not priority or not isinstance(priority, str):
+        return False, "Priority must be a non-empty string"
+    
+    if priority.upper() not in valid_priorities:
+        return False, f"Priority must be one of: {', '.join(valid_priorities)}"
+    
+    return True, ""
@@ -0,0 +1,143 @@
+"""
+Standalone worker executing report runs from the durable run queue.
+
+The API and scheduler enqueue runs when RUN_DISPATCH=worker; start one or
+more workers next to them, e.g. one per CPU core:
+
+    python -m app.worker
+"""
+from typing import Dict
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+
+from app.db import init_db, SessionLocal
+from app.models import ReportRun
+from app.services import run_queue
+from app.services.runner import run_report
+from app.services.pools import POOL_SIZES
+
+logger = logging.getLogger(__name__)
+
+# Pools served by this worker process, e.g. "default,express" (default: all).
+# Each gets as many threads as its EXECUTION_POOLS size.
+WORKER_POOLS = os.getenv("WORKER_POOLS", "")
+
+# How long an idle worker thread waits before polling the queue again
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1"))
+
+
+class Worker:
+    """
+    Claims runs from the run queue and executes them on worker threads.
+    Every pool served has its own threads, which only claim runs of that
+    pool, so a pool's concurrency per worker is its thread count.
+    A heartbeat thread renews the leases of claimed runs; if the process dies,
+    the leases expire and another worker re-runs them.
+    """
+
+    def __init__(self, worker_id: str, pool_threads: Dict[str, int], poll_seconds: float):
+        self.worker_id = worker_id
+        self.pool_threads = pool_threads
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        # Leases are renewed until the runs in progress have finished
+        self._finished = threading.Event()
+
+    def run(self):
+        """Execute runs until stop() is called; runs in progress are finished first."""
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True)
+        heartbeat.start()
+        threads = [
+            threading.Thread(target=self._work_loop, args=(pool,), name=f"worker-{pool}-{i}")
+            for pool, count in self.pool_threads.items()
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        pools = ", ".join(f"{pool} x{count}" for pool, count in self.pool_threads.items())
+        logger.info(f"Worker {self.worker_id} started for pools: {pools}")
+
+        for thread in threads:
+            thread.join()
+        self._finished.set()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def stop(self):
+        """Stop claiming new runs."""
+        self._stop.set()
+
+    def _work_loop(self, pool: str):
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                run_id = run_queue.claim(db, self.worker_id, pool)
+                if run_id is None:
+                    db.close()
+                    self._stop.wait(self.poll_seconds)
+                    continue
+                self._execute(db, run_id)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Worker {self.worker_id} failed to process the queue: {str(e)}")
+                self._stop.wait(self.poll_seconds)
+            finally:
+                db.close()
+
+    def _execute(self, db, run_id: str):
+        try:
+            report_run = db.query(ReportRun).filter(ReportRun.id == run_id).first()
+            if report_run is None:
+                logger.warning(f"Queued run {run_id} no longer exists")
+            elif report_run.status in run_queue.FINISHED_STATUSES:
+                # Finished before a previous worker could remove it from the queue
+                logger.info(f"Run {run_id} already finished")
+            else:
+                logger.info(f"Worker {self.worker_id} executing run {run_id}")
+                run_report(db, report_run)
+        except Exception as e:
+            # The runner has already recorded the failure on the run
+            logger.error(f"Run {run_id} failed: {str(e)}")
+        finally:
+            run_queue.complete(db, run_id)
+
+    def _heartbeat_loop(self):
+        while not self._finished.wait(run_queue.RUN_LEASE_SECONDS / 3):
+            db = SessionLocal()
+            try:
+                run_queue.renew(db, self.worker_id)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Worker {self.worker_id} could not renew leases: {str(e)}")
+            finally:
+                db.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    init_db()
+
+    worker_id = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    served = [name.strip().lower() for name in WORKER_POOLS.split(",") if name.strip()] or list(POOL_SIZES)
+    unknown = [name for name in served if name not in POOL_SIZES]
+    if unknown:
+        raise SystemExit(f"Unknown pools in WORKER_POOLS: {', '.join(unknown)}")
+    worker = Worker(worker_id, {name: POOL_SIZES[name] for name in served}, WORKER_POLL_SECONDS)
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, finishing runs in progress...")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,16 @@ CREATE TABLE IF NOT EXISTS reports (
     name VARCHAR(255) NOT NULL,
     description TEXT,
     sql_query TEXT NOT NULL,
+    data_source VARCHAR(100),
     schedule_cron VARCHAR(100) NOT NULL,
     output_format VARCHAR(50) DEFAULT 'CSV',
+    compression VARCHAR(20),
+    concurrency_policy VARCHAR(20) DEFAULT 'COALESCE',
+    cache_ttl_seconds INTEGER,
+    watermark_column VARCHAR(255),
+    incremental_mode VARCHAR(20) DEFAULT 'APPEND',
+    priority VARCHAR(20) DEFAULT 'NORMAL',
+    execution_pool VARCHAR(50) DEFAULT 'default',
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -20,11 +28,36 @@ CREATE TABLE IF NOT EXISTS report_runs (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     report_id UUID NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
     started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    running_at TIMESTAMP WITH TIME ZONE,
     finished_at TIMESTAMP WITH TIME ZONE,
+    duration_seconds DOUBLE PRECISION,
     status run_status NOT NULL DEFAULT 'QUEUED',
     row_count INTEGER,
     output_path VARCHAR(500),
-    error_message TEXT
+    output_bytes BIGINT,
+    row_group_count INTEGER,
+    coalesced_count INTEGER DEFAULT 0,
+    cache_hit BOOLEAN DEFAULT FALSE,
+    watermark_value TEXT,
+    watermark_type VARCHAR(20),
+    error_message TEXT,
+    progress_rows BIGINT,
+    progress_bytes BIGINT,
+    progress_rows_per_second DOUBLE PRECISION,
+    progress_expected_rows BIGINT,
+    progress_eta_at TIMESTAMP WITH TIME ZONE,
+    progress_updated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Create run_stats table (rollup of finished runs per report, day, status and duration bucket)
+CREATE TABLE IF NOT EXISTS run_stats (
+    report_id VARCHAR(36) NOT NULL,
+    day DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    bucket INTEGER NOT NULL,
+    run_count INTEGER NOT NULL DEFAULT 0,
+    duration_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (report_id, day, status, bucket)
 );
 
 -- Create notification_log table
@@ -37,12 +70,73 @@ CREATE TABLE IF NOT EXISTS notification_log (
     message TEXT
 );
 
+-- Create run_metrics table
+CREATE TABLE IF NOT EXISTS run_metrics (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    report_run_id UUID NOT NULL UNIQUE REFERENCES report_runs(id) ON DELETE CASCADE,
+    queue_seconds DOUBLE PRECISION,
+    query_seconds DOUBLE PRECISION,
+    fetch_seconds DOUBLE PRECISION,
+    serialize_seconds DOUBLE PRECISION,
+    write_seconds DOUBLE PRECISION,
+    notify_seconds DOUBLE PRECISION,
+    total_seconds DOUBLE PRECISION,
+    rows_per_second DOUBLE PRECISION,
+    bytes_written BIGINT,
+    peak_memory_bytes BIGINT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create result_cache table
+CREATE TABLE IF NOT EXISTS result_cache (
+    cache_key VARCHAR(64) PRIMARY KEY,
+    file_path VARCHAR(500) NOT NULL,
+    extension VARCHAR(20) NOT NULL,
+    row_count INTEGER NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_used_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Create schedule_leases table (cluster mode)
+CREATE TABLE IF NOT EXISTS schedule_leases (
+    report_id VARCHAR(36) NOT NULL,
+    fire_time TIMESTAMP NOT NULL,  -- Scheduler-local time, identical on every node
+    owner VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'CLAIMED',
+    attempts INTEGER NOT NULL DEFAULT 1,
+    claimed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (report_id, fire_time)
+);
+
+-- Create run_queue table (runs executed by worker processes)
+CREATE TABLE IF NOT EXISTS run_queue (
+    run_id VARCHAR(36) PRIMARY KEY,
+    report_id VARCHAR(36) NOT NULL,
+    exclusive_report_id VARCHAR(36) UNIQUE,
+    running_report_id VARCHAR(36) UNIQUE,
+    enqueued_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    pool VARCHAR(50),
+    priority INTEGER DEFAULT 0,
+    claimed_by VARCHAR(255),
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_report_runs_report_id ON report_runs(report_id);
+CREATE INDEX IF NOT EXISTS idx_report_runs_report_id_started_at ON report_runs(report_id, started_at, id);
 CREATE INDEX IF NOT EXISTS idx_report_runs_status ON report_runs(status);
 CREATE INDEX IF NOT EXISTS idx_report_runs_started_at ON report_runs(started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_report_runs_status_started_at ON report_runs(status, started_at);
+CREATE INDEX IF NOT EXISTS idx_report_runs_duration_seconds ON report_runs(duration_seconds);
 CREATE INDEX IF NOT EXISTS idx_reports_is_active ON reports(is_active);
 CREATE INDEX IF NOT EXISTS idx_notification_log_report_run_id ON notification_log(report_run_id);
+CREATE INDEX IF NOT EXISTS ix_result_cache_last_used_at ON result_cache(last_used_at);
+CREATE INDEX IF NOT EXISTS ix_schedule_leases_expires_at ON schedule_leases(expires_at);
+CREATE INDEX IF NOT EXISTS ix_run_queue_enqueued_at ON run_queue(enqueued_at);
+CREATE INDEX IF NOT EXISTS ix_run_queue_pool ON run_queue(pool);
 
 -- Insert sample data for testing
 INSERT INTO reports (name, description, sql_query, schedule_cron, output_format, is_active) VALUES
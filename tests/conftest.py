@@ -0,0 +1,81 @@
+"""
+Shared fixtures. The application reads its settings from the environment
+when its modules are imported, so they are set here first: a throwaway
+SQLite metadata database (a file, so that exports stream from a second
+connection as they do in production), the in-memory job store and local
+run dispatch.
+"""
+import os
+import tempfile
+
+_data_dir = tempfile.mkdtemp(prefix="reporting-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/metadata.db"
+os.environ["SCHEDULER_JOBSTORE"] = "memory"
+os.environ["SCHEDULER_CLUSTER_MODE"] = "false"
+os.environ["RUN_DISPATCH"] = "local"
+
+import pytest
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app import models  # noqa: F401  (registers the tables)
+from app.db import Base, SessionLocal, engine, init_db
+from app.services import scheduler as scheduler_service
+from app.services.timeline import CronIndex
+
+init_db()
+
+
+@pytest.fixture
+def db():
+    """A metadata session; all rows written by the test are deleted afterwards."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """A paused scheduler with an in-memory job store in place of the application's."""
+    paused = BackgroundScheduler()
+    paused.start(paused=True)
+    monkeypatch.setattr(scheduler_service, "scheduler", paused)
+    monkeypatch.setattr(scheduler_service, "job_store", paused._jobstores["default"])
+    monkeypatch.setattr(scheduler_service, "cron_index", CronIndex())
+    yield paused
+    paused.shutdown(wait=False)
+
+
+@pytest.fixture
+def client():
+    """An API client. The startup hooks (scheduler, stats backfill) are not run."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    return str(tmp_path / "outputs")
+
+
+@pytest.fixture
+def make_report(db):
+    """Create a report; keyword arguments override the defaults."""
+    def make(**values):
+        report = models.Report(**{
+            "name": "test report",
+            "sql_query": "SELECT 1 AS n",
+            "schedule_cron": "0 9 * * *",
+            "output_format": "csv",
+            "is_active": False,
+            **values
+        })
+        db.add(report)
+        db.commit()
+        return report
+    return make
@@ -0,0 +1,95 @@
+import pytest
+
+from app.models import Report
+from app.services.response_cache import report_cache
+
+
+@pytest.fixture(autouse=True)
+def paused_scheduler(scheduler):
+    report_cache.invalidate()
+    return scheduler
+
+
+def _definition(name, **values):
+    return {"name": name, "sql_query": "SELECT 1 AS n", "schedule_cron": "0 9 * * *", **values}
+
+
+def test_bulk_upsert_creates_updates_and_keeps_reports(client, db, make_report, scheduler):
+    by_id = make_report(name="by id", is_active=True)
+    by_name, = client.post("/api/reports/bulk", json={"reports": [_definition("by name")]}).json()["reports"]
+
+    response = client.post("/api/reports/bulk", json={"reports": [
+        _definition("renamed", id=by_id.id, schedule_cron="0 6 * * *"),
+        _definition("by name"),
+        _definition("new", is_active=False),
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["updated"], body["unchanged"]) == (1, 1, 1)
+    assert [(r["name"], r["action"]) for r in body["reports"]] == [
+        ("renamed", "updated"), ("by name", "unchanged"), ("new", "created")
+    ]
+    assert (body["scheduler"]["updated"], body["scheduler"]["unchanged"]) == (1, 1)
+    db.expire_all()
+    assert db.get(Report, by_id.id).name == "renamed"
+    assert {job.id for job in scheduler.get_jobs()} == {by_id.id, by_name["id"]}
+
+
+def test_bulk_upsert_writes_nothing_if_any_definition_is_invalid(client, db):
+    response = client.post("/api/reports/bulk", json={"reports": [
+        _definition("fine"),
+        _definition("bad cron", schedule_cron="0 9 * *"),
+        _definition("fine"),
+    ]})
+
+    assert response.status_code == 400
+    assert [error["index"] for error in response.json()["detail"]] == [1, 2]
+    assert "Duplicate name" in response.json()["detail"][1]["error"]
+    assert db.query(Report).count() == 0
+
+
+def test_ambiguous_names_need_an_id(client, make_report):
+    make_report(name="twin")
+    make_report(name="twin")
+
+    response = client.post("/api/reports/bulk", json={"reports": [_definition("twin")]})
+
+    assert response.status_code == 400
+    assert "give the id" in response.json()["detail"][0]["error"]
+
+
+def test_export_round_trips_through_bulk_upsert(client, make_report):
+    make_report(name="a", compression="gzip", cache_ttl_seconds=60)
+    make_report(name="b", priority="HIGH")
+
+    exported = client.get("/api/reports/export").json()
+    response = client.post("/api/reports/bulk", json=exported)
+
+    assert [report["name"] for report in exported["reports"]] == ["a", "b"]
+    assert response.json()["unchanged"] == 2
+
+
+def test_bulk_activate_and_deactivate(client, db, make_report, scheduler):
+    reports = [make_report(name=f"r{i}") for i in range(3)]
+    ids = [report.id for report in reports]
+
+    activated = client.post("/api/reports/bulk/activate", json={"ids": ids + ids[:1]}).json()
+    again = client.post("/api/reports/bulk/activate", json={"ids": ids[:1]}).json()
+    deactivated = client.post("/api/reports/bulk/deactivate", json={"ids": ids[1:]}).json()
+
+    assert (activated["updated"], activated["scheduler"]["added"]) == (3, 3)
+    assert (again["updated"], again["unchanged"], again["scheduler"]) == (0, 1, {})
+    assert deactivated["scheduler"]["removed"] == 2
+    assert [job.id for job in scheduler.get_jobs()] == ids[:1]
+
+
+def test_bulk_activate_of_unknown_ids_changes_nothing(client, db, make_report):
+    report = make_report()
+
+    response = client.post("/api/reports/bulk/activate", json={"ids": [report.id, "missing"]})
+
+    assert response.status_code == 404
+    assert "missing" in response.json()["detail"]
+    db.expire_all()
+    assert db.get(Report, report.id).is_active is False
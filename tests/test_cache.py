@@ -0,0 +1,103 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services import cache, runner
+from app.utils.fingerprint import normalize_sql, sql_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "RESULT_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def _output(directory, name, size):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def test_normalize_sql_ignores_whitespace_case_and_comments():
+    assert normalize_sql("SELECT  a,b\n FROM t -- all\nWHERE x = 1;") == normalize_sql("select a, b /* c */ from T where X=1")
+
+
+def test_normalize_sql_keeps_quoted_strings_and_identifiers():
+    assert normalize_sql("SELECT 'A  b' FROM \"Tbl\"") == "select'A  b'from\"Tbl\""
+    assert normalize_sql("SELECT 'a'") != normalize_sql("SELECT 'A'")
+    assert normalize_sql("SELECT a b") != normalize_sql("SELECT ab")
+
+
+def test_fingerprint_depends_on_qualifiers():
+    assert sql_fingerprint("SELECT 1", "default", "CSV") == sql_fingerprint("select 1;", "default", "CSV")
+    assert sql_fingerprint("SELECT 1", "default", "CSV") != sql_fingerprint("SELECT 1", "default", "JSON")
+
+
+def test_cache_key_separates_formats_and_compression(make_report):
+    csv = make_report(sql_query="SELECT 1", output_format="csv")
+    same = make_report(sql_query="select  1 ;", output_format="CSV")
+    gzipped = make_report(sql_query="SELECT 1", output_format="csv", compression="gzip")
+
+    assert cache.cache_key(csv) == cache.cache_key(same)
+    assert cache.cache_key(csv) != cache.cache_key(gzipped)
+
+
+def test_lookup_hits_within_ttl_and_materializes_a_copy(db, output_dir, tmp_path):
+    cache.store(db, "key", _output(str(tmp_path), "run.csv.gz", 10), row_count=3)
+
+    entry = cache.lookup(db, "key", ttl_seconds=60)
+
+    assert entry.row_count == 3
+    assert entry.extension == "csv.gz"
+    output_path = cache.materialize(entry, output_dir, "report")
+    assert output_path.endswith(".csv.gz")
+    assert os.path.getsize(output_path) == 10
+
+
+def test_lookup_misses_expired_and_missing_entries(db, tmp_path):
+    cache.store(db, "old", _output(str(tmp_path), "old.csv", 10), row_count=1)
+    cache.store(db, "gone", _output(str(tmp_path), "gone.csv", 10), row_count=1)
+    entry = db.get(models.ResultCacheEntry, "old")
+    entry.created_at = datetime.now() - timedelta(seconds=120)
+    db.commit()
+    os.remove(db.get(models.ResultCacheEntry, "gone").file_path)
+
+    assert cache.lookup(db, "old", ttl_seconds=60) is None
+    assert cache.lookup(db, "old", ttl_seconds=300) is not None
+    assert cache.lookup(db, "gone", ttl_seconds=60) is None
+    assert cache.lookup(db, "unknown", ttl_seconds=60) is None
+
+
+def test_eviction_removes_least_recently_used_entries(db, tmp_path):
+    now = datetime.now()
+    for age, key in enumerate(["c", "b", "a"]):
+        cache.store(db, key, _output(str(tmp_path), f"{key}.csv", 100), row_count=1)
+        entry = db.get(models.ResultCacheEntry, key)
+        entry.last_used_at = now - timedelta(minutes=3 - age)
+        db.commit()
+    # Using "c" makes "b" the least recently used entry
+    cache.lookup(db, "c", ttl_seconds=60)
+
+    cache.evict(db, max_bytes=250)
+
+    remaining = {entry.cache_key for entry in db.query(models.ResultCacheEntry)}
+    assert remaining == {"a", "c"}
+    assert sorted(os.listdir(cache.RESULT_CACHE_DIR)) == sorted(
+        os.path.basename(db.get(models.ResultCacheEntry, key).file_path) for key in remaining
+    )
+
+
+def test_second_run_within_ttl_is_served_from_cache(db, make_report, output_dir):
+    report = make_report(sql_query="SELECT 1 AS n, 'a' AS label", cache_ttl_seconds=60)
+
+    first = runner.execute_report(db, report.id, output_dir=output_dir)
+    second = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert (first.cache_hit, second.cache_hit) == (False, True)
+    assert second.row_count == 1
+    assert second.output_path != first.output_path
+    with open(second.output_path) as f:
+        assert f.read() == "n,label\n1,a\n"
@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import LeaseStatus, ScheduleLease
+from app.services import cluster
+
+FIRE = datetime(2024, 5, 1, 9, 0)
+
+
+@pytest.fixture
+def nodes(db):
+    """Coordinators of two replicas, node-a and node-b."""
+    made = []
+    for node_id in ("node-a", "node-b"):
+        coordinator = cluster.LeaseCoordinator(lease_seconds=60, check_seconds=1, max_attempts=2)
+        coordinator.node_id = node_id
+        made.append(coordinator)
+    return made
+
+
+def _lease(db, report_id="r1"):
+    db.expire_all()
+    return db.get(ScheduleLease, (report_id, FIRE))
+
+
+def _expire(db, report_id="r1"):
+    lease = _lease(db, report_id)
+    lease.expires_at = datetime.now() - timedelta(seconds=1)
+    db.commit()
+
+
+def test_fire_slot_truncates_to_the_minute():
+    assert cluster.fire_slot(datetime(2024, 5, 1, 9, 0, 42, 5)) == FIRE
+
+
+def test_only_one_node_claims_a_fire(db, nodes, monkeypatch):
+    monkeypatch.setattr(cluster, "CLUSTER_CLAIM_STAGGER", 0)
+    start = threading.Barrier(8)
+    results = []
+
+    def claim(coordinator):
+        start.wait()
+        results.append((coordinator.node_id, coordinator.claim("r1", FIRE)))
+
+    threads = [threading.Thread(target=claim, args=(nodes[i % 2],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    winners = [node_id for node_id, claimed in results if claimed]
+    assert len(winners) == 1
+    lease = _lease(db)
+    assert (lease.owner, lease.status, lease.attempts) == (winners[0], LeaseStatus.CLAIMED.value, 1)
+
+
+def test_run_executes_only_on_the_claiming_node(db, nodes):
+    ran = []
+
+    assert nodes[0].run("r1", FIRE, ran.append) is True
+    assert nodes[1].run("r1", FIRE, ran.append) is False
+
+    assert ran == ["r1"]
+    assert _lease(db).status == LeaseStatus.DONE.value
+
+
+def test_lease_is_held_until_the_run_future_is_done(db, nodes):
+    future = Future()
+
+    nodes[0].run("r1", FIRE, lambda report_id: future)
+
+    assert _lease(db).status == LeaseStatus.CLAIMED.value
+    future.set_result(None)
+    assert _lease(db).status == LeaseStatus.DONE.value
+
+
+def test_release_ignores_leases_of_other_nodes(db, nodes):
+    nodes[0].claim("r1", FIRE)
+
+    nodes[1].release("r1", FIRE)
+
+    assert _lease(db).status == LeaseStatus.CLAIMED.value
+
+
+def test_heartbeat_keeps_live_leases_from_being_taken_over(db, nodes):
+    nodes[0].claim("r1", FIRE)
+    _expire(db)
+
+    nodes[0]._heartbeat(db, datetime.now())
+
+    assert nodes[1]._take_over_expired(db, datetime.now()) == []
+    assert _lease(db).owner == "node-a"
+
+
+def test_expired_lease_is_taken_over_by_one_node(db, nodes):
+    nodes[0].claim("r1", FIRE)
+    _expire(db)
+    now = datetime.now()
+
+    taken = nodes[1]._take_over_expired(db, now)
+
+    assert taken == [("r1", FIRE)]
+    assert nodes[0]._take_over_expired(db, now) == []
+    lease = _lease(db)
+    assert (lease.owner, lease.attempts, lease.status) == ("node-b", 2, LeaseStatus.CLAIMED.value)
+
+
+def test_lease_is_abandoned_after_max_attempts(db, nodes):
+    nodes[0].claim("r1", FIRE)
+    _expire(db)
+    nodes[1]._take_over_expired(db, datetime.now())
+    _expire(db)
+
+    assert nodes[0]._take_over_expired(db, datetime.now()) == []
+
+    lease = _lease(db)
+    assert (lease.owner, lease.status) == ("node-b", LeaseStatus.ABANDONED.value)
+
+
+def test_prune_deletes_only_old_finished_leases(db, nodes):
+    now = datetime.now()
+    old = now - timedelta(hours=cluster.CLUSTER_LEASE_RETENTION_HOURS + 1)
+    for report_id, fire_time, status in [
+        ("done-old", old, LeaseStatus.DONE.value),
+        ("claimed-old", old, LeaseStatus.CLAIMED.value),
+        ("done-new", now, LeaseStatus.DONE.value),
+    ]:
+        db.add(ScheduleLease(
+            report_id=report_id, fire_time=fire_time, owner="node-a", status=status,
+            attempts=1, claimed_at=fire_time, expires_at=fire_time
+        ))
+    db.commit()
+
+    nodes[0]._prune(db, now)
+
+    assert {lease.report_id for lease in db.query(ScheduleLease)} == {"claimed-old", "done-new"}
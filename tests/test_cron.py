@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+
+from app.utils.cron import compile_cron
+from app.utils.validators import validate_cron_expression
+
+UTC = timezone.utc
+
+EXPRESSIONS = [
+    "* * * * *",
+    "*/15 * * * *",
+    "0 9 * * *",
+    "30 8-17/3 * * *",
+    "0 9 * * 0",
+    "0 9 * * 6",
+    "0 9 * * 1-5",
+    "0 9 * * mon,wed,fri",
+    "0 9 * * sat-sun",
+    "5 4 1 * *",
+    "0 0 29 2 *",
+    "0 0 31 * *",
+    "0 12 1-7 * 0",
+    "10/20 6 * jan-feb *",
+    "0 0,12 */10 * 2/2",
+]
+
+
+def _trigger_fires(trigger, start, end):
+    """Fire times of an APScheduler trigger in [start, end), as naive UTC."""
+    fires = []
+    fire_time = trigger.get_next_fire_time(None, start.replace(tzinfo=UTC))
+    while fire_time is not None and fire_time.replace(tzinfo=None) < end:
+        fires.append(fire_time.replace(tzinfo=None))
+        fire_time = trigger.get_next_fire_time(fire_time, fire_time + timedelta(seconds=1))
+    return fires
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_compiled_cron_fires_like_the_scheduler_trigger(expression):
+    minute, hour, day, month, day_of_week = expression.split()
+    trigger = CronTrigger(minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week, timezone=UTC)
+    # Across a 31st and a leap day, from inside a minute
+    start, end = datetime(2024, 1, 25, 0, 0, 30), datetime(2024, 3, 5)
+
+    assert compile_cron(expression).fire_times(start, end) == _trigger_fires(trigger, start, end)
+
+
+@pytest.mark.parametrize("expression", ["0 9 * * 0", "0 9 * * 1-5", "0 9 * * 6"])
+def test_days_of_week_match_crontab_parsing_by_the_scheduler(expression):
+    trigger = CronTrigger.from_crontab(expression, timezone=UTC)
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 15)
+
+    assert compile_cron(expression).fire_times(start, end) == _trigger_fires(trigger, start, end)
+
+
+def test_day_of_week_zero_is_monday():
+    fires = compile_cron("0 9 * * 0").fire_times(datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+    assert {fire.strftime("%A") for fire in fires} == {"Monday"}
+    assert len(fires) == 5
+
+
+def test_fire_minutes_count_from_the_start_minute():
+    assert compile_cron("*/20 * * * *").fire_minutes(datetime(2024, 1, 1, 10, 0), datetime(2024, 1, 1, 11, 0)) == [0, 20, 40]
+    # Inside a minute, that minute's fire has passed
+    assert compile_cron("*/20 * * * *").fire_minutes(datetime(2024, 1, 1, 10, 0, 1), datetime(2024, 1, 1, 11, 0)) == [20, 40]
+
+
+@pytest.mark.parametrize("expression, field", [
+    ("60 * * * *", "minute"),
+    ("* 24 * * *", "hour"),
+    ("* * 0 * *", "day"),
+    ("* * * 13 *", "month"),
+    ("* * * * 7", "day_of_week"),
+    ("* * * * fri-mon", "day_of_week"),
+    ("*/0 * * * *", "minute"),
+])
+def test_invalid_fields_are_named(expression, field):
+    with pytest.raises(ValueError, match=f"Invalid {field} field"):
+        compile_cron(expression)
+    assert validate_cron_expression(expression)[0] is False
+
+
+@pytest.mark.parametrize("expression", ["", "* * * *", "* * * * * *"])
+def test_expressions_need_five_fields(expression):
+    valid, error = validate_cron_expression(expression)
+
+    assert not valid and error
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app import datasources
+from app.datasources import DEFAULT_DATA_SOURCE, DataSourceRegistry
+from app.db import DATABASE_URL
+from app.models import RunStatus
+from app.services import runner
+
+
+@pytest.fixture
+def warehouse(tmp_path, monkeypatch):
+    """A registry with a "warehouse" SQLite data source, used by runs and the API."""
+    url = f"sqlite:///{tmp_path}/warehouse.db"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE sales (amount INTEGER)")
+        conn.exec_driver_sql("INSERT INTO sales VALUES (10), (20), (30)")
+    engine.dispose()
+    registry = DataSourceRegistry({DEFAULT_DATA_SOURCE: DATABASE_URL, "warehouse": url})
+    monkeypatch.setattr(datasources, "data_sources", registry)
+    monkeypatch.setattr(runner, "data_sources", registry)
+    monkeypatch.setattr("app.api.datasources.data_sources", registry)
+    monkeypatch.setattr("app.api.reports.data_sources", registry)
+    yield registry
+    registry.dispose()
+
+
+def test_data_sources_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DATA_SOURCE_WAREHOUSE", "postgresql://warehouse/db")
+    monkeypatch.setenv("DATA_SOURCE_POOL_SIZE", "10")
+    monkeypatch.setenv("DATA_SOURCE_EMPTY", "")
+
+    urls = datasources._load_data_source_urls()
+
+    assert urls["warehouse"] == "postgresql://warehouse/db"
+    assert urls[DEFAULT_DATA_SOURCE] == DATABASE_URL
+    assert "pool_size" not in urls and "empty" not in urls
+
+
+def test_engines_are_created_once_per_data_source(warehouse):
+    engine = warehouse.get_engine("warehouse")
+
+    assert warehouse.get_engine("warehouse") is engine
+    assert warehouse.get_engine(None) is warehouse.get_engine(DEFAULT_DATA_SOURCE) is not engine
+    assert warehouse.exists(None) and not warehouse.exists("crm")
+    with pytest.raises(ValueError, match="Unknown data source: crm"):
+        warehouse.get_engine("crm")
+
+
+def test_report_runs_on_its_data_source(db, make_report, output_dir, warehouse):
+    report = make_report(sql_query="SELECT SUM(amount) AS total FROM sales", data_source="warehouse")
+
+    report_run = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert report_run.status == RunStatus.SUCCESS.value
+    with open(report_run.output_path) as f:
+        assert f.read().splitlines() == ["total", "60"]
+
+
+def test_api_lists_data_sources_without_urls(client, warehouse):
+    warehouse.get_engine("warehouse")
+
+    response = client.get("/api/data-sources")
+
+    assert [item["name"] for item in response.json()] == [DEFAULT_DATA_SOURCE, "warehouse"]
+    assert response.json()[1]["pool_status"]
+    assert "sqlite" not in response.text
+
+
+def test_api_rejects_unknown_data_sources(client, warehouse):
+    response = client.post("/api/reports", json={
+        "name": "crm report", "sql_query": "SELECT 1", "schedule_cron": "0 9 * * *",
+        "data_source": "crm", "is_active": False
+    })
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown data source: crm"
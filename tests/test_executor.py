@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from app.services.executor import QueueFullError, RunPool
+
+
+@pytest.fixture
+def pool():
+    run_pool = RunPool("test", max_workers=2, max_queue=10)
+    yield run_pool
+    run_pool.shutdown()
+
+
+def test_runs_of_one_key_do_not_hold_workers_of_other_keys(pool):
+    release = threading.Event()
+    running = []
+    lock = threading.Lock()
+
+    def run(name):
+        with lock:
+            running.append(name)
+        release.wait(5)
+        return name
+
+    slow = [pool.submit(run, f"a{i}", key="a") for i in range(4)]
+    other = pool.submit(run, "b", key="b")
+
+    # One worker takes the first "a" run, the other serves "b" instead of
+    # waiting behind the remaining "a" runs
+    deadline = time.monotonic() + 5
+    while len(running) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert running == ["a0", "b"]
+    assert pool.stats()["active_workers"] == 2
+
+    release.set()
+    assert [future.result(5) for future in slow] == ["a0", "a1", "a2", "a3"]
+    assert other.result(5) == "b"
+
+
+def test_runs_of_one_key_execute_one_at_a_time_in_order(pool):
+    active = []
+    order = []
+
+    def run(name):
+        active.append(name)
+        assert len(active) == 1
+        time.sleep(0.01)
+        order.append(name)
+        active.remove(name)
+
+    futures = [pool.submit(run, i, key="a") for i in range(5)]
+    for future in futures:
+        future.result(5)
+    assert order == list(range(5))
+
+
+def test_priority_beats_submission_order(pool):
+    gate = threading.Event()
+    order = []
+    blockers = [pool.submit(gate.wait, 5) for _ in range(2)]
+    futures = [
+        pool.submit(order.append, "low", priority=0),
+        pool.submit(order.append, "high", priority=2),
+    ]
+    gate.set()
+    for future in blockers + futures:
+        future.result(5)
+    assert order == ["high", "low"]
+
+
+def test_full_queue_is_rejected():
+    run_pool = RunPool("tiny", max_workers=1, max_queue=1)
+    gate = threading.Event()
+    try:
+        run_pool.submit(gate.wait, 5)
+        run_pool.submit(gate.wait, 5)
+        with pytest.raises(QueueFullError):
+            run_pool.submit(gate.wait, 5)
+    finally:
+        gate.set()
+        run_pool.shutdown()
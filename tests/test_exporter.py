@@ -0,0 +1,207 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine
+
+from app.services import exporter
+
+
+@pytest.fixture
+def source():
+    """A connection to an in-memory data source."""
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def _stream_batches(monkeypatch, column_names, batches):
+    """Make the exporters stream the given batches instead of querying."""
+    monkeypatch.setattr(exporter, "stream_query", lambda *args, **kwargs: (column_names, iter(batches)))
+
+
+def test_parquet_widens_int_column_to_float_in_later_batch(source, output_dir, monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 3)
+    sql = (
+        "WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r WHERE n < 9) "
+        "SELECT n, CASE WHEN n > 3 THEN n + 0.5 ELSE n END AS v FROM r"
+    )
+
+    output_path, row_count = exporter.export_to_parquet(source, sql, output_dir, "widen")
+
+    table = pq.read_table(output_path)
+    assert row_count == 9
+    assert table.schema.field("v").type == pa.float64()
+    assert table.column("v").to_pylist() == [1, 2, 3, 4.5, 5.5, 6.5, 7.5, 8.5, 9.5]
+    assert pq.ParquetFile(output_path).metadata.num_row_groups == 3
+
+
+def test_parquet_widens_decimal_scale_in_later_batch(output_dir, monkeypatch):
+    _stream_batches(monkeypatch, ["avg"], [
+        [(Decimal("12.5"),), (Decimal("7.25"),)],
+        [(Decimal("3.333333"),), (Decimal("123456.1"),)],
+    ])
+
+    output_path, row_count = exporter.export_to_parquet(None, "", output_dir, "decimals")
+
+    table = pq.read_table(output_path)
+    assert row_count == 4
+    assert table.schema.field("avg").type == pa.decimal128(12, 6)
+    assert table.column("avg").to_pylist() == [
+        Decimal("12.5"), Decimal("7.25"), Decimal("3.333333"), Decimal("123456.1")
+    ]
+
+
+def test_parquet_rejects_types_that_cannot_widen(output_dir, monkeypatch):
+    _stream_batches(monkeypatch, ["v"], [[(Decimal("1.5"),)], [(2.5,)]])
+
+    with pytest.raises(ValueError, match="changes type"):
+        exporter.export_to_parquet(None, "", output_dir, "conflict")
+
+
+def test_parquet_types_all_null_first_batch_as_string(output_dir, monkeypatch):
+    _stream_batches(monkeypatch, ["v"], [[(None,)], [(5,)]])
+
+    output_path, _ = exporter.export_to_parquet(None, "", output_dir, "nulls")
+
+    assert pq.read_table(output_path).column("v").to_pylist() == [None, "5"]
+
+
+@pytest.mark.parametrize("current, new, widened", [
+    (pa.int64(), pa.float64(), pa.float64()),
+    (pa.float64(), pa.int64(), pa.float64()),
+    (pa.decimal128(3, 1), pa.decimal128(7, 6), pa.decimal128(8, 6)),
+    (pa.int64(), pa.decimal128(4, 2), pa.decimal128(21, 2)),
+    (pa.string(), pa.int64(), pa.string()),
+    (pa.int64(), pa.null(), pa.int64()),
+    (pa.decimal128(3, 1), pa.float64(), None),
+    (pa.timestamp("us"), pa.int64(), None),
+])
+def test_widen_type(current, new, widened):
+    assert exporter._widen_type(current, new) == widened
+
+
+NUMBERS_SQL = (
+    "WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r WHERE n < :last) "
+    "SELECT n, 'row ' || n AS label FROM r"
+)
+
+
+def _read(output_path):
+    return b"".join(exporter.iter_decompressed(output_path)).decode("utf-8")
+
+
+def test_stream_query_yields_fixed_size_batches(source):
+    batches_seen = []
+
+    column_names, batches = exporter.stream_query(
+        source, NUMBERS_SQL, batch_size=4, params={"last": 10},
+        on_batch=lambda columns, batch: batches_seen.append(len(batch))
+    )
+
+    assert column_names == ["n", "label"]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert batches_seen == [4, 4, 2]
+
+
+def test_csv_export_writes_every_batch(source, output_dir, monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 3)
+
+    output_path, row_count = exporter.export_to_csv(source, NUMBERS_SQL, output_dir, "numbers", params={"last": 7})
+
+    assert row_count == 7
+    assert output_path.endswith(".csv")
+    lines = _read(output_path).splitlines()
+    assert lines[0] == "n,label"
+    assert lines[1:] == [f"{n},row {n}" for n in range(1, 8)]
+
+
+def test_csv_export_of_empty_result_writes_header(source, output_dir):
+    output_path, row_count = exporter.export_to_csv(source, NUMBERS_SQL + " WHERE n > 99", output_dir, "empty", params={"last": 3})
+
+    assert row_count == 0
+    assert _read(output_path) == "n,label\r\n"
+
+
+
+@pytest.mark.parametrize("last", [0, 1, 7])
+def test_json_export_writes_one_array_across_batches(source, output_dir, monkeypatch, last):
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 3)
+    sql = NUMBERS_SQL + " WHERE n <= :last"
+
+    output_path, row_count = exporter.export_to_json(source, sql, output_dir, "numbers", params={"last": last})
+
+    assert row_count == last
+    assert json.loads(_read(output_path)) == [{"n": n, "label": f"row {n}"} for n in range(1, last + 1)]
+
+
+def test_jsonl_export_writes_one_object_per_line(source, output_dir, monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 3)
+
+    output_path, row_count = exporter.export_to_jsonl(source, NUMBERS_SQL, output_dir, "numbers", params={"last": 7})
+
+    assert row_count == 7
+    lines = _read(output_path).splitlines()
+    assert [json.loads(line) for line in lines] == [{"n": n, "label": f"row {n}"} for n in range(1, 8)]
+
+
+def test_json_export_encodes_decimals_as_strings_and_datetimes_as_iso(output_dir, monkeypatch):
+    _stream_batches(monkeypatch, ["amount", "at"], [[(Decimal("12345678901234567.89"), datetime(2024, 5, 1, 9, 30))]])
+
+    output_path, _ = exporter.export_to_jsonl(None, "", output_dir, "types")
+
+    assert json.loads(_read(output_path)) == {"amount": "12345678901234567.89", "at": "2024-05-01T09:30:00"}
+
+
+def test_get_exporter_looks_up_formats_case_insensitively():
+    assert exporter.get_exporter("jsonl") is exporter.export_to_jsonl
+    assert exporter.get_exporter(None) is exporter.export_to_csv
+    with pytest.raises(ValueError, match="Unsupported output format"):
+        exporter.get_exporter("xml")
+
+
+@pytest.mark.parametrize("output_format", ["CSV", "JSON", "JSONL"])
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_compressed_exports_decompress_to_the_plain_output(source, output_dir, monkeypatch, output_format, compression):
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 3)
+    export = exporter.get_exporter(output_format)
+
+    plain_path, _ = export(source, NUMBERS_SQL, output_dir, "plain", params={"last": 10})
+    output_path, row_count = export(source, NUMBERS_SQL, output_dir, "packed", compression=compression, params={"last": 10})
+
+    assert row_count == 10
+    assert output_path.endswith("." + exporter.get_output_extension(output_format, compression))
+    assert exporter.split_compression(output_path)[1] == compression
+    assert _read(output_path) == _read(plain_path)
+
+
+@pytest.mark.parametrize("compression, codec", [(None, "SNAPPY"), ("gzip", "GZIP"), ("zstd", "ZSTD")])
+def test_parquet_compression_selects_the_codec(source, output_dir, compression, codec):
+    output_path, _ = exporter.export_to_parquet(source, NUMBERS_SQL, output_dir, "packed", compression=compression, params={"last": 10})
+
+    assert output_path.endswith(".parquet")
+    assert pq.ParquetFile(output_path).metadata.row_group(0).column(0).compression == codec
+    assert pq.read_table(output_path).column("n").to_pylist() == list(range(1, 11))
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("None", None), (" GZIP ", "gzip"), ("zstd", "zstd")])
+def test_normalize_compression(value, expected):
+    assert exporter.normalize_compression(value) == expected
+
+
+def test_normalize_compression_rejects_unknown_codecs():
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        exporter.normalize_compression("brotli")
+
+
+def test_runs_in_the_same_second_get_distinct_paths(output_dir):
+    first = exporter.build_output_path(output_dir, "daily sales!", "csv")
+    open(first, "w").close()
+    second = exporter.build_output_path(output_dir, "daily sales!", "csv")
+
+    assert first != second
+    assert first.startswith(f"{output_dir}/daily_sales_")
@@ -0,0 +1,212 @@
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db import engine
+from app.models import IncrementalMode, RunStatus
+from app.services import exporter, incremental, runner
+
+
+@pytest.fixture
+def events():
+    """A source table in the metadata database; returns a function adding rows 1..n."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS incremental_events")
+        conn.exec_driver_sql("CREATE TABLE incremental_events (id INTEGER, label TEXT)")
+
+    def add(*ids):
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO incremental_events (id, label) VALUES (:id, :label)"),
+                [{"id": i, "label": f"event {i}"} for i in ids]
+            )
+    yield add
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE incremental_events")
+
+
+def _ids(output_path):
+    """Read the id column of an output file."""
+    if output_path.endswith(".parquet"):
+        return pq.read_table(output_path).column("id").to_pylist()
+    lines = b"".join(exporter.iter_decompressed(output_path)).decode("utf-8").splitlines()
+    if ".jsonl" in output_path:
+        return [json.loads(line)["id"] for line in lines]
+    return [int(line.split(",")[0]) for line in lines[1:]]
+
+
+def test_build_incremental_query_wraps_the_report_query():
+    assert incremental.build_incremental_query("SELECT * FROM t WHERE a = 1;\n", "updated_at") == (
+        "SELECT * FROM (SELECT * FROM t WHERE a = 1) AS incremental_source WHERE updated_at > :watermark"
+    )
+
+
+@pytest.mark.parametrize("value", [
+    7, 2.5, Decimal("10.25"), datetime(2024, 5, 1, 9, 30, 15, 250), date(2024, 5, 1), "b-17"
+])
+def test_watermarks_round_trip_with_their_type(value):
+    stored, value_type = incremental.encode_watermark(value)
+
+    decoded = incremental.decode_watermark(stored, value_type)
+
+    assert decoded == value and type(decoded) is type(value)
+
+
+def test_tracker_keeps_the_highest_value_across_batches():
+    tracker = incremental.WatermarkTracker("ID")
+
+    tracker(["label", "id"], [("a", 3), ("b", None), ("c", 9)])
+    tracker(["label", "id"], [("d", 4)])
+
+    assert tracker.value == 9
+
+
+def test_tracker_rejects_a_missing_column():
+    with pytest.raises(ValueError, match="not in the query result"):
+        incremental.WatermarkTracker("updated_at")(["id"], [(1,)])
+
+
+@pytest.mark.parametrize("output_format, compression", [
+    ("csv", None), ("csv", "gzip"), ("jsonl", "zstd")
+])
+def test_append_mode_adds_new_rows_to_the_previous_output(db, make_report, output_dir, events, output_format, compression):
+    report = make_report(
+        sql_query="SELECT id, label FROM incremental_events",
+        output_format=output_format,
+        compression=compression,
+        watermark_column="id",
+        incremental_mode=IncrementalMode.APPEND.value
+    )
+    events(1, 2, 3)
+    first = runner.execute_report(db, report.id, output_dir=output_dir)
+    events(4, 5)
+
+    second = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert second.status == RunStatus.SUCCESS.value
+    assert (first.row_count, second.row_count) == (3, 5)
+    assert (first.watermark_value, second.watermark_value) == ("3", "5")
+    assert _ids(second.output_path) == [1, 2, 3, 4, 5]
+
+
+def test_append_mode_extends_the_previous_file_in_place(db, make_report, output_dir, events):
+    report = make_report(
+        sql_query="SELECT id, label FROM incremental_events",
+        compression="gzip",
+        watermark_column="id",
+        incremental_mode=IncrementalMode.APPEND.value
+    )
+    events(1, 2, 3)
+    first = runner.execute_report(db, report.id, output_dir=output_dir)
+    first_path, first_inode = first.output_path, os.stat(first.output_path).st_ino
+    events(4, 5)
+
+    second = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    # The combined output is the previous file moved on, not a copy of it
+    assert not os.path.exists(first_path)
+    assert os.stat(second.output_path).st_ino == first_inode
+    assert sorted(os.listdir(output_dir)) == [os.path.basename(second.output_path)]
+
+
+def test_failed_append_leaves_the_previous_output_intact(tmp_path):
+    previous_path = os.path.join(tmp_path, "previous.csv.gz")
+    with exporter.gzip.open(previous_path, "wb") as f:
+        f.write(b"id,label\n1,event 1\n")
+    with open(previous_path, "rb") as f:
+        original = f.read()
+
+    with pytest.raises(FileNotFoundError):
+        exporter.append_previous_output(
+            previous_path, os.path.join(tmp_path, "missing.csv.gz"), "CSV", "gzip"
+        )
+
+    with open(previous_path, "rb") as f:
+        assert f.read() == original
+
+
+def test_parquet_append_mode_writes_one_segment_per_run(db, make_report, output_dir, events):
+    report = make_report(
+        sql_query="SELECT id, label FROM incremental_events",
+        output_format="parquet",
+        watermark_column="id",
+        incremental_mode=IncrementalMode.APPEND.value
+    )
+    events(1, 2, 3)
+    first = runner.execute_report(db, report.id, output_dir=output_dir)
+    events(4, 5)
+
+    second = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert (first.row_count, second.row_count) == (3, 2)
+    assert second.watermark_value == "5"
+    assert _ids(first.output_path) == [1, 2, 3]
+    assert _ids(second.output_path) == [4, 5]
+    dataset = pq.ParquetDataset([first.output_path, second.output_path]).read()
+    assert sorted(dataset.column("id").to_pylist()) == [1, 2, 3, 4, 5]
+
+
+def test_parquet_segment_takes_the_widened_schema_of_the_previous_one(tmp_path):
+    previous_path = os.path.join(tmp_path, "previous.parquet")
+    output_path = os.path.join(tmp_path, "segment.parquet")
+    pq.write_table(pa.table({"amount": pa.array([1.5], pa.float64())}), previous_path)
+    pq.write_table(pa.table({"amount": pa.array([2], pa.int64())}), output_path)
+
+    exporter.align_parquet_segment(previous_path, output_path)
+
+    assert pq.read_table(output_path).column("amount").to_pylist() == [2.0]
+    assert pq.read_schema(output_path).field("amount").type == pa.float64()
+
+
+def test_empty_parquet_segment_takes_the_previous_types(tmp_path):
+    previous_path = os.path.join(tmp_path, "previous.parquet")
+    output_path = os.path.join(tmp_path, "segment.parquet")
+    pq.write_table(pa.table({"id": pa.array([1], pa.int64())}), previous_path)
+    pq.write_table(pa.table({"id": pa.array([], pa.string())}), output_path)
+
+    exporter.align_parquet_segment(previous_path, output_path)
+
+    assert pq.read_schema(output_path).field("id").type == pa.int64()
+    assert pq.ParquetFile(output_path).metadata.num_rows == 0
+
+
+def test_delta_mode_outputs_only_new_rows_and_keeps_the_watermark_without_them(db, make_report, output_dir, events):
+    report = make_report(
+        sql_query="SELECT id, label FROM incremental_events",
+        watermark_column="id",
+        incremental_mode=IncrementalMode.DELTA.value
+    )
+    events(1, 2, 3)
+    runner.execute_report(db, report.id, output_dir=output_dir)
+    events(4, 5)
+    second = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    third = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert _ids(second.output_path) == [4, 5]
+    assert third.row_count == 0
+    assert (third.watermark_value, third.watermark_type) == ("5", "int")
+
+
+def test_failed_run_does_not_advance_the_watermark(db, make_report, output_dir, events):
+    report = make_report(
+        sql_query="SELECT id, label FROM incremental_events",
+        watermark_column="id",
+        incremental_mode=IncrementalMode.DELTA.value
+    )
+    events(1, 2)
+    runner.execute_report(db, report.id, output_dir=output_dir)
+    report.watermark_column = "missing"
+    db.commit()
+
+    with pytest.raises(OperationalError):
+        runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert incremental.get_previous_run(db, report).watermark_value == "2"
@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.db import engine
+from app.services.jobstore import ReportJobStore
+
+
+def noop():
+    pass
+
+
+@pytest.fixture
+def store_and_scheduler():
+    store = ReportJobStore(engine=engine, tablename="test_apscheduler_jobs")
+    scheduler = BackgroundScheduler(jobstores={"default": store}, timezone=timezone.utc)
+    scheduler.start(paused=True)
+    store.remove_all_jobs()
+    yield store, scheduler
+    scheduler.shutdown(wait=False)
+    store.jobs_t.drop(engine, checkfirst=True)
+
+
+def _in_other_thread(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+
+def test_batched_update_keeps_next_run_time_advanced_by_scheduler(store_and_scheduler):
+    store, scheduler = store_and_scheduler
+    due = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(minutes=1)
+    scheduler.add_job(noop, IntervalTrigger(minutes=1), id="job", name="old", next_run_time=due)
+
+    with store.batch():
+        scheduler.modify_job("job", name="new")
+        # The scheduler thread fires the job meanwhile and moves it on
+        _in_other_thread(lambda: scheduler.modify_job("job", next_run_time=due + timedelta(minutes=1)))
+
+    job = scheduler.get_job("job")
+    assert job.name == "new"
+    assert job.next_run_time == due + timedelta(minutes=1)
+
+
+def test_batched_reschedule_to_earlier_time_is_written(store_and_scheduler):
+    store, scheduler = store_and_scheduler
+    scheduler.add_job(noop, CronTrigger(hour=23, minute=59, timezone=timezone.utc), id="job")
+    before = scheduler.get_job("job").next_run_time
+
+    with store.batch():
+        scheduler.reschedule_job("job", trigger=IntervalTrigger(seconds=30))
+
+    job = scheduler.get_job("job")
+    assert isinstance(job.trigger, IntervalTrigger)
+    assert job.next_run_time < before
+
+
+def test_batch_writes_adds_updates_and_removals_together(store_and_scheduler):
+    store, scheduler = store_and_scheduler
+    for i in range(3):
+        scheduler.add_job(noop, IntervalTrigger(minutes=1), id=f"job{i}")
+
+    ids = []
+    with store.batch():
+        scheduler.add_job(noop, IntervalTrigger(minutes=1), id="added")
+        scheduler.modify_job("job0", name="renamed")
+        scheduler.remove_job("job1")
+        # Nothing is written before the batch ends
+        _in_other_thread(lambda: ids.extend(job.id for job in store.get_all_jobs()))
+
+    assert sorted(ids) == ["job0", "job1", "job2"]
+    assert sorted(job.id for job in scheduler.get_jobs()) == ["added", "job0", "job2"]
+    assert scheduler.get_job("job0").name == "renamed"
+
+
+
+def test_lookup_jobs_reads_many_jobs_in_one_call(store_and_scheduler):
+    store, scheduler = store_and_scheduler
+    for name in ("a", "b", "c"):
+        scheduler.add_job(noop, IntervalTrigger(minutes=1), id=name, name=name)
+
+    jobs = store.lookup_jobs(["a", "c", "missing"])
+
+    assert sorted(jobs) == ["a", "c"]
+    assert jobs["c"].name == "c"
+    assert jobs["a"].next_run_time == scheduler.get_job("a").next_run_time
@@ -0,0 +1,65 @@
+from app.services.metrics import Counter, Gauge, Histogram, Registry
+
+
+def _render(*metrics):
+    registry = Registry()
+    for metric in metrics:
+        registry.register(metric)
+    return registry.render().splitlines()
+
+
+def test_counter_renders_one_series_per_label_set():
+    counter = Counter("runs_total", "Runs", ["status"])
+    counter.inc(status="SUCCESS")
+    counter.inc(2, status="SUCCESS")
+    counter.inc(status='quote"d\nline')
+
+    assert _render(counter) == [
+        "# HELP runs_total Runs",
+        "# TYPE runs_total counter",
+        'runs_total{status="SUCCESS"} 3',
+        'runs_total{status="quote\\"d\\nline"} 1',
+    ]
+
+
+def test_unlabelled_counter_starts_at_zero():
+    assert _render(Counter("missed_total", "Missed"))[-1] == "missed_total 0"
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("duration_seconds", "Durations", buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert _render(histogram)[2:] == [
+        'duration_seconds_bucket{le="1.0"} 2',
+        'duration_seconds_bucket{le="5.0"} 3',
+        'duration_seconds_bucket{le="+Inf"} 4',
+        "duration_seconds_sum 14.5",
+        "duration_seconds_count 4",
+    ]
+
+
+def test_gauge_callbacks_are_read_at_scrape_time():
+    depth = [0]
+    gauge = Gauge("queue_depth", "Depth", callback=lambda: depth[0])
+    per_pool = Gauge("pool_depth", "Depth", ["pool"], callback=lambda: {("default",): depth[0] * 2})
+    depth[0] = 3
+
+    lines = _render(gauge, per_pool)
+
+    assert "queue_depth 3" in lines
+    assert 'pool_depth{pool="default"} 6' in lines
+
+
+def test_metrics_endpoint_labels_requests_by_route(client, make_report):
+    report = make_report()
+    client.get(f"/api/reports/{report.id}/runs")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/reports/{report_id}/runs",status="200"' in response.text
+    assert report.id not in response.text
+    assert "run_executor_queue_depth" in response.text
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from app.models import RunPriority
+from app.services import pools
+from app.services.executor import RunExecutor
+
+
+def test_parse_pools_always_has_default_and_express(monkeypatch):
+    monkeypatch.setattr(pools, "EXPRESS_POOL_WORKERS", 0)
+
+    assert pools._parse_pools("Heavy:2, light , bad:x,:3") == {
+        "heavy": 2, "light": 1, pools.DEFAULT_POOL: pools.RUN_WORKERS, pools.EXPRESS_POOL: 1
+    }
+    assert pools._parse_pools("default:8")[pools.DEFAULT_POOL] == 8
+
+
+@pytest.mark.parametrize("priority, rank", [
+    (RunPriority.LOW.value, 0), (None, 1), ("high", 2)
+])
+def test_placement_ranks_by_priority(make_report, priority, rank):
+    report = make_report(priority=priority)
+
+    assert pools.get_placement(report) == (pools.DEFAULT_POOL, rank)
+
+
+def test_express_runs_go_to_the_express_lane_first(make_report):
+    report = make_report(priority=RunPriority.HIGH.value)
+
+    assert pools.get_placement(report, express=True) == (pools.EXPRESS_POOL, pools.EXPRESS_RANK)
+
+
+def test_unknown_pool_falls_back_to_default(make_report):
+    report = make_report(execution_pool="gone")
+
+    assert pools.get_placement(report)[0] == pools.DEFAULT_POOL
+    assert not pools.pool_exists("gone")
+    assert pools.pool_exists(None)
+
+
+def test_a_busy_pool_does_not_hold_up_others():
+    executor = RunExecutor({pools.DEFAULT_POOL: 1, "heavy": 1}, max_queue=10)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    try:
+        executor.submit("heavy", 0, block)
+        started.wait(5)
+        queued = executor.submit("heavy", 0, lambda: "heavy")
+
+        assert executor.submit(pools.DEFAULT_POOL, 0, lambda: "default").result(timeout=5) == "default"
+        assert not queued.done()
+        stats = executor.stats()["pools"]["heavy"]
+        assert (stats["active_workers"], stats["queue_depth"]) == (1, 1)
+    finally:
+        release.set()
+        executor.shutdown()
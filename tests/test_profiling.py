@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+import pytest
+
+from app.services import profiling, runner
+from app.services.profiling import RunProfile, timed
+
+
+def test_phases_accumulate_wall_time():
+    profile = RunProfile()
+
+    for _ in range(2):
+        with profile.phase("fetch"):
+            time.sleep(0.01)
+    profile.add("queue", 1.5)
+
+    assert profile.phases["fetch"] >= 0.02
+    assert profile.phases["queue"] == 1.5
+    assert profile.finish() >= 0.02
+
+
+def test_timed_without_a_profile_does_nothing():
+    with timed(None, "write"):
+        pass
+
+
+def test_memory_peak_is_only_measured_when_enabled(monkeypatch):
+    assert RunProfile().finish() is not None and RunProfile().peak_memory_bytes is None
+
+    monkeypatch.setattr(profiling, "RUN_PROFILE_MEMORY", True)
+    try:
+        profile = RunProfile()
+        buffer = bytearray(5_000_000)
+        profile.finish()
+        del buffer
+    finally:
+        tracemalloc.stop()
+
+    assert profile.peak_memory_bytes >= 5_000_000
+
+
+def test_run_records_phase_timings(client, db, make_report, output_dir, monkeypatch):
+    monkeypatch.setattr(runner, "start_profile", RunProfile)
+    report = make_report(sql_query="SELECT 1 AS n UNION ALL SELECT 2")
+    report_run = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    metrics = client.get(f"/api/runs/{report_run.id}").json()["metrics"]
+
+    assert metrics["total_seconds"] > 0
+    assert metrics["query_seconds"] is not None and metrics["write_seconds"] is not None
+    assert metrics["bytes_written"] == report_run.output_bytes
+    assert metrics["rows_per_second"] > 0
+    assert client.get(f"/api/reports/{report.id}/runs").json()[0]["metrics"] is None
+
+
+def test_queue_phase_is_the_wait_from_creation_to_execution(client, db, make_report, output_dir, monkeypatch):
+    monkeypatch.setattr(runner, "start_profile", RunProfile)
+    report = make_report()
+    report_run, _ = runner.create_run(db, report.id)
+    report_run.started_at -= timedelta(seconds=30)
+    db.commit()
+
+    report_run = runner.run_report(db, report_run, output_dir=output_dir)
+
+    response = client.get(f"/api/runs/{report_run.id}").json()
+    assert response["metrics"]["queue_seconds"] >= 30
+    assert response["metrics"]["queue_seconds"] == pytest.approx(
+        (report_run.running_at - report_run.started_at).total_seconds()
+    )
+    assert "queued_at" not in response
@@ -0,0 +1,105 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.response_cache import ResponseCache, etag_matches, make_etag, report_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_report_cache():
+    # Reports made directly in the database don't invalidate the cache
+    report_cache.invalidate()
+
+
+def test_etag_is_strong_and_depends_on_the_body():
+    etag = make_etag(b"[]")
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag(b"[]") != make_etag(b"[1]")
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ("*", True),
+    ('"other"', False),
+    ("abc", False),
+])
+def test_etag_matches_if_none_match(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+
+def test_entries_are_evicted_least_recently_used_first():
+    cache = ResponseCache(max_entries=2, max_age_seconds=60)
+    for key in ("a", "b"):
+        cache.put(key, cache.version, key.encode())
+    cache.get("a")
+
+    cache.put("c", cache.version, b"c")
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"a"
+    assert cache.get("c").body == b"c"
+
+
+def test_invalidation_drops_entries_and_keeps_out_bodies_built_before_it():
+    cache = ResponseCache(max_entries=10, max_age_seconds=60)
+    cache.put("a", cache.version, b"a")
+    version = cache.version
+
+    cache.invalidate()
+    entry = cache.put("b", version, b"b")
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert entry.etag == make_etag(b"b")
+
+
+def test_entries_expire_with_max_age_and_at_the_next_fire_time():
+    cache = ResponseCache(max_entries=10, max_age_seconds=0.05)
+    cache.put("aged", cache.version, b"a")
+    cache.put("fired", cache.version, b"b", valid_until=datetime.now() - timedelta(seconds=1))
+    cache.put("upcoming", cache.version, b"c", valid_until=datetime.now() + timedelta(hours=1))
+
+    assert cache.get("fired") is None
+    assert cache.get("upcoming") is not None
+    time.sleep(0.06)
+    assert cache.get("aged") is None
+
+
+def test_report_list_answers_a_matching_if_none_match_with_304(client, make_report):
+    make_report(name="first")
+    response = client.get("/api/reports")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/api/reports", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200 and [r["name"] for r in response.json()] == ["first"]
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+
+def test_report_change_makes_a_new_etag(client, make_report):
+    report = make_report(name="first")
+    etag = client.get(f"/api/reports/{report.id}").headers["ETag"]
+
+    updated = client.put(f"/api/reports/{report.id}", json={"name": "renamed"})
+    response = client.get(f"/api/reports/{report.id}", headers={"If-None-Match": etag})
+
+    assert updated.status_code == 200
+    assert response.status_code == 200
+    assert response.json()["name"] == "renamed"
+    assert response.headers["ETag"] != etag
+
+
+def test_disabled_cache_still_sends_etags(client, make_report, monkeypatch):
+    monkeypatch.setattr(report_cache, "max_entries", 0)
+    report = make_report()
+    etag = client.get(f"/api/reports/{report.id}").headers["ETag"]
+
+    assert client.get(f"/api/reports/{report.id}", headers={"If-None-Match": etag}).status_code == 304
+    assert report_cache.get(("report", report.id)) is None
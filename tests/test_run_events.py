@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+from datetime import datetime
+
+from app.models import ReportRun, RunStatus
+from app.services import run_events
+from app.services.run_events import RunEventBroker
+
+
+def _run(report_id="r1", run_id="run-1", status=RunStatus.RUNNING.value, **values):
+    return ReportRun(id=run_id, report_id=report_id, started_at=datetime(2024, 5, 1, 9, 0), status=status, **values)
+
+
+def test_events_reach_matching_subscribers_from_other_threads():
+    broker = RunEventBroker()
+
+    async def scenario():
+        everything = broker.subscribe()
+        one_report = broker.subscribe(report_id="r2")
+        one_run = broker.subscribe(run_id="run-1")
+        runs = [_run("r1", "run-1"), _run("r2", "run-2"), _run("r1", "run-1", RunStatus.SUCCESS.value)]
+        publisher = threading.Thread(target=lambda: [broker.publish(run) for run in runs])
+        publisher.start()
+        await asyncio.get_running_loop().run_in_executor(None, publisher.join)
+        await asyncio.sleep(0)
+
+        def drain(subscription):
+            items = []
+            while not subscription.queue.empty():
+                items.append(subscription.queue.get_nowait())
+            return [(event["id"], event["status"]) for _, event in items]
+
+        return drain(everything), drain(one_report), drain(one_run)
+
+    everything, one_report, one_run = asyncio.run(scenario())
+
+    assert everything == [("run-1", "RUNNING"), ("run-2", "RUNNING"), ("run-1", "SUCCESS")]
+    assert one_report == [("run-2", "RUNNING")]
+    assert one_run == [("run-1", "RUNNING"), ("run-1", "SUCCESS")]
+
+
+def test_slow_subscribers_lose_the_oldest_events(monkeypatch):
+    monkeypatch.setattr(run_events, "RUN_EVENTS_QUEUE_SIZE", 2)
+
+    async def scenario():
+        subscription = run_events.Subscription()
+        for event_id in range(5):
+            subscription.offer((event_id, {}))
+        return [subscription.queue.get_nowait()[0] for _ in range(2)], subscription.dropped
+
+    assert asyncio.run(scenario()) == ([3, 4], 3)
+
+
+def test_polled_states_are_published_only_when_changed():
+    broker = RunEventBroker()
+
+    async def scenario():
+        subscription = broker.subscribe()
+        running = run_events.run_event(_run())
+        broker._publish(running)
+        broker._publish(running, if_changed=True)
+        broker._publish(run_events.run_event(_run(status=RunStatus.SUCCESS.value)), if_changed=True)
+        await asyncio.sleep(0)
+        return subscription.queue.qsize()
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_progress_is_only_part_of_running_runs():
+    updated_at = datetime(2024, 5, 1, 9, 1)
+    running = _run(progress_rows=500, progress_updated_at=updated_at)
+    finished = _run(status=RunStatus.SUCCESS.value, progress_rows=500, progress_updated_at=updated_at)
+
+    assert run_events.run_event(running)["progress"]["rows_written"] == 500
+    assert run_events.run_event(finished)["progress"] is None
+
+
+def test_stream_of_a_finished_run_sends_its_state_and_ends(client, db, make_report):
+    report_run = ReportRun(report_id=make_report().id, started_at=datetime.now(), status=RunStatus.SUCCESS.value)
+    db.add(report_run)
+    db.commit()
+
+    response = client.get("/api/runs/events", params={"run_id": report_run.id})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    header, data = response.text.strip().split("\n")[1:]
+    assert header == "event: run"
+    assert json.loads(data.removeprefix("data: "))["status"] == RunStatus.SUCCESS.value
+
+
+def test_stream_of_an_unknown_run_is_not_found(client):
+    assert client.get("/api/runs/events", params={"run_id": "missing"}).status_code == 404
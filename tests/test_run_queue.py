@@ -0,0 +1,162 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.db import SessionLocal
+from app.models import ReportRun, RunQueueEntry, RunStatus
+from app.services import run_queue
+
+
+@pytest.fixture
+def enqueue(db, make_report):
+    """Create a queued run and its queue entry; returns the run ID."""
+    def add(report=None, exclusive=False, pool="default", priority=0, started_at=None):
+        report = report or make_report()
+        started_at = started_at or datetime.now()
+        report_run = ReportRun(
+            report_id=report.id,
+            started_at=started_at,
+            status=RunStatus.QUEUED.value
+        )
+        db.add(report_run)
+        db.flush()
+        run_queue.enqueue(db, report_run, exclusive, pool, priority)
+        db.commit()
+        return report_run.id
+    return add
+
+
+def _entry(db, run_id):
+    db.expire_all()
+    return db.get(RunQueueEntry, run_id)
+
+
+def _expire_lease(db, run_id):
+    entry = _entry(db, run_id)
+    entry.lease_expires_at = datetime.now() - timedelta(seconds=1)
+    db.commit()
+
+
+def test_only_one_exclusive_run_per_report_is_pending(db, make_report, enqueue):
+    report = make_report()
+    run_id = enqueue(report, exclusive=True)
+
+    with pytest.raises(IntegrityError):
+        enqueue(report, exclusive=True)
+    db.rollback()
+
+    assert run_queue.get_exclusive_run(db, report.id).id == run_id
+    enqueue(report, exclusive=False)
+
+
+def test_each_run_is_claimed_by_exactly_one_worker(db, enqueue):
+    run_ids = {enqueue() for _ in range(6)}
+    start = threading.Barrier(8)
+    claimed = []
+
+    def work(worker_id):
+        session = SessionLocal()
+        try:
+            start.wait()
+            while True:
+                run_id = run_queue.claim(session, worker_id)
+                if run_id is None:
+                    break
+                claimed.append(run_id)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=work, args=(f"worker-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(run_ids)
+
+
+def test_claim_holds_back_runs_of_an_executing_report(db, make_report, enqueue):
+    report = make_report()
+    now = datetime.now()
+    first = enqueue(report, started_at=now - timedelta(seconds=2))
+    second = enqueue(report, started_at=now - timedelta(seconds=1))
+
+    assert run_queue.claim(db, "worker-1") == first
+    assert run_queue.claim(db, "worker-2") is None
+
+    run_queue.complete(db, first)
+    assert run_queue.claim(db, "worker-2") == second
+
+
+def test_claim_order_is_priority_then_age_within_the_pool(db, enqueue):
+    now = datetime.now()
+    old_low = enqueue(priority=0, started_at=now - timedelta(minutes=2))
+    new_high = enqueue(priority=2, started_at=now)
+    old_high = enqueue(priority=2, started_at=now - timedelta(minutes=1))
+    heavy = enqueue(pool="heavy", priority=9)
+
+    claims = [run_queue.claim(db, "worker-1") for _ in range(4)]
+
+    assert claims == [old_high, new_high, old_low, None]
+    assert run_queue.claim(db, "worker-1", pool="heavy") == heavy
+
+
+def test_expired_lease_is_taken_over(db, enqueue):
+    run_id = enqueue()
+    run_queue.claim(db, "worker-1")
+    assert run_queue.claim(db, "worker-2") is None
+    _expire_lease(db, run_id)
+
+    assert run_queue.claim(db, "worker-2") == run_id
+
+    entry = _entry(db, run_id)
+    assert (entry.claimed_by, entry.attempts) == ("worker-2", 2)
+
+
+def test_renew_keeps_the_lease(db, enqueue):
+    run_id = enqueue()
+    run_queue.claim(db, "worker-1")
+    _expire_lease(db, run_id)
+
+    run_queue.renew(db, "worker-1")
+
+    assert run_queue.claim(db, "worker-2") is None
+    assert _entry(db, run_id).lease_expires_at > datetime.now()
+
+
+def test_run_is_abandoned_after_max_attempts(db, enqueue, monkeypatch):
+    monkeypatch.setattr(run_queue, "RUN_MAX_ATTEMPTS", 2)
+    run_id = enqueue()
+    for worker_id in ("worker-1", "worker-2"):
+        assert run_queue.claim(db, worker_id) == run_id
+        _expire_lease(db, run_id)
+
+    assert run_queue.claim(db, "worker-3") is None
+
+    assert _entry(db, run_id) is None
+    report_run = db.get(ReportRun, run_id)
+    assert report_run.status == RunStatus.FAILED.value
+    assert "Abandoned after 2 attempts" in report_run.error_message
+
+
+def test_wait_for_run_gives_up_after_the_timeout(db, enqueue, monkeypatch):
+    monkeypatch.setattr(run_queue, "RUN_WAIT_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(run_queue, "RUN_WAIT_TIMEOUT_SECONDS", 0.05)
+    report_run = db.get(ReportRun, enqueue())
+
+    assert run_queue.wait_for_run(db, report_run).status == RunStatus.QUEUED.value
+
+
+def test_stats_count_queued_and_claimed_runs_per_pool(db, enqueue):
+    enqueue()
+    enqueue()
+    enqueue(pool="heavy")
+    run_queue.claim(db, "worker-1")
+
+    stats = run_queue.stats(db)
+
+    assert (stats["queue_depth"], stats["active_workers"]) == (2, 1)
+    assert stats["pools"]["heavy"]["queue_depth"] == 1
+    assert stats["pools"]["default"]["active_workers"] == 1
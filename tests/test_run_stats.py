@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import ReportRun, RunStatsBucket, RunStatus
+from app.services import run_stats
+
+
+@pytest.fixture
+def finished_run(db, make_report):
+    """Create a finished run; recorded in the rollup unless record=False."""
+    def make(report, duration, status=RunStatus.SUCCESS.value, days_ago=0, record=True):
+        finished_at = datetime.now() - timedelta(days=days_ago)
+        report_run = ReportRun(
+            report_id=report.id,
+            started_at=finished_at - timedelta(seconds=duration),
+            running_at=finished_at - timedelta(seconds=duration),
+            finished_at=finished_at,
+            duration_seconds=duration if record else None,
+            status=status
+        )
+        db.add(report_run)
+        db.commit()
+        if record:
+            run_stats.record(db, report_run)
+        return report_run
+    return make
+
+
+def test_record_counts_runs_in_duration_buckets(db, make_report, finished_run):
+    report = make_report()
+    for duration in (0.3, 0.4, 0.45):
+        finished_run(report, duration)
+    finished_run(report, 7, status=RunStatus.FAILED.value)
+
+    buckets = {(row.status, row.bucket): (row.run_count, row.duration_sum) for row in db.query(RunStatsBucket)}
+
+    assert buckets == {
+        (RunStatus.SUCCESS.value, run_stats._bucket(0.3)): (3, pytest.approx(1.15)),
+        (RunStatus.FAILED.value, run_stats._bucket(7)): (1, 7.0),
+    }
+
+
+def test_report_stats_summarize_the_window(db, make_report, finished_run):
+    report = make_report()
+    other = make_report()
+    for duration in [1.5] * 18 + [45] * 2:
+        finished_run(report, duration)
+    finished_run(report, 3, status=RunStatus.FAILED.value)
+    finished_run(report, 1.5, days_ago=10)
+    finished_run(other, 2)
+
+    stats, = run_stats.report_stats(db, days=7, report_id=report.id)
+
+    assert (stats["runs"], stats["succeeded"], stats["failed"]) == (21, 20, 1)
+    assert stats["success_rate"] == pytest.approx(20 / 21)
+    # Estimated within the buckets (1, 2.5] and (30, 60]
+    assert 1 < stats["p50_seconds"] <= 2.5
+    assert 30 < stats["p95_seconds"] <= 60
+    assert stats["mean_seconds"] == pytest.approx((18 * 1.5 + 2 * 45) / 20)
+
+
+def test_backfill_builds_an_empty_rollup_from_run_history(db, make_report, finished_run):
+    report = make_report()
+    for _ in range(3):
+        finished_run(report, 4, record=False)
+    db.add(ReportRun(report_id=report.id, started_at=datetime.now(), status=RunStatus.RUNNING.value))
+    db.commit()
+
+    assert run_stats.backfill(db) == 3
+    assert run_stats.backfill(db) == 0
+
+    stats, = run_stats.report_stats(db, report_id=report.id)
+    assert stats["runs"] == 3
+    assert stats["mean_seconds"] == pytest.approx(4, abs=0.01)
+    assert all(run.duration_seconds is not None for run in db.query(ReportRun).filter(ReportRun.finished_at.isnot(None)))
+
+
+def test_stats_endpoint_names_reports_and_checks_days(client, make_report, finished_run):
+    report = make_report(name="daily sales")
+    finished_run(report, 2)
+
+    response = client.get("/api/runs/stats", params={"report_id": report.id})
+
+    assert response.status_code == 200
+    assert [(item["report_name"], item["runs"]) for item in response.json()] == [("daily sales", 1)]
+    assert client.get("/api/runs/stats", params={"days": 0}).status_code == 400
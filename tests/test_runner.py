@@ -0,0 +1,69 @@
+from app.db import SessionLocal, engine
+from app.models import ConcurrencyPolicy, ReportRun, RunStatus
+from app.services import progress as progress_module
+from app.services import runner
+
+
+def test_coalesced_trigger_during_streaming_export(db, make_report, output_dir, monkeypatch):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS runner_numbers")
+        conn.exec_driver_sql("CREATE TABLE runner_numbers (n INTEGER)")
+        conn.exec_driver_sql(
+            "INSERT INTO runner_numbers WITH RECURSIVE r(n) AS "
+            "(SELECT 1 UNION ALL SELECT n + 1 FROM r WHERE n < 20000) SELECT n FROM r"
+        )
+    monkeypatch.setattr(runner, "RUN_PROGRESS_INTERVAL_SECONDS", 0.001)
+    monkeypatch.setattr(progress_module, "RUN_PROGRESS_INTERVAL_SECONDS", 0.001)
+    monkeypatch.setattr("app.services.exporter.EXPORT_BATCH_SIZE", 5000)
+    report = make_report(
+        sql_query="SELECT n FROM runner_numbers",
+        concurrency_policy=ConcurrencyPolicy.COALESCE.value
+    )
+
+    # Trigger the report again from the first progress update, while the
+    # export's SELECT is open on the default data source
+    attached = []
+    save_progress = runner._save_progress
+
+    def trigger_during_export(db, report_run, snapshot):
+        save_progress(db, report_run, snapshot)
+        if not attached:
+            other = SessionLocal()
+            try:
+                attached.append(runner.create_run(other, report.id))
+            finally:
+                other.close()
+
+    monkeypatch.setattr(runner, "_save_progress", trigger_during_export)
+
+    report_run = runner.execute_report(db, report.id, output_dir=output_dir)
+
+    assert report_run.status == RunStatus.SUCCESS.value
+    (coalesced, created), = attached
+    assert created is False and coalesced.id == report_run.id
+    db.expire_all()
+    assert db.get(ReportRun, report_run.id).coalesced_count == 1
+
+
+def test_reject_policy_raises_while_run_in_flight(db, make_report):
+    report = make_report(concurrency_policy=ConcurrencyPolicy.REJECT.value)
+    report_run, created = runner.create_run(db, report.id)
+    try:
+        assert created
+        try:
+            runner.create_run(db, report.id)
+        except runner.RunInProgressError as e:
+            assert e.run_id == report_run.id
+        else:
+            raise AssertionError("expected RunInProgressError")
+    finally:
+        runner.discard_run(db, report_run)
+
+
+def test_queue_policy_creates_a_run_per_trigger(db, make_report, output_dir):
+    report = make_report(concurrency_policy=ConcurrencyPolicy.QUEUE.value)
+    first, _ = runner.create_run(db, report.id)
+    second, created = runner.create_run(db, report.id)
+    assert created and second.id != first.id
+    for report_run in (first, second):
+        assert runner.run_report(db, report_run, output_dir).status == RunStatus.SUCCESS.value
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import models
+from app.services import exporter
+from app.utils.pagination import decode_cursor, encode_cursor
+
+NUMBERS_SQL = (
+    "WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r WHERE n < 5) "
+    "SELECT n FROM r"
+)
+
+
+@pytest.fixture
+def make_run(db, make_report):
+    """Create a run of a new report; keyword arguments override the defaults."""
+    def make(**values):
+        if "report_id" not in values:
+            values["report_id"] = make_report().id
+        run = models.ReportRun(**{
+            "started_at": datetime.utcnow(),
+            "status": models.RunStatus.SUCCESS.value,
+            **values
+        })
+        db.add(run)
+        db.commit()
+        return run
+    return make
+
+
+@pytest.fixture
+def compressed_output(output_dir):
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        output_path, _ = exporter.export_to_csv(conn, NUMBERS_SQL, output_dir, "numbers", compression="gzip")
+    engine.dispose()
+    return output_path
+
+
+def test_download_serves_compressed_output_to_clients_that_accept_it(client, make_run, compressed_output):
+    run = make_run(output_path=compressed_output)
+
+    response = client.get(f"/api/runs/{run.id}/download", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert 'filename="numbers_' in response.headers["content-disposition"]
+    assert response.headers["content-disposition"].endswith('.csv"')
+    # The client decodes the body
+    assert response.text.splitlines() == ["n", "1", "2", "3", "4", "5"]
+
+
+@pytest.mark.parametrize("accept", ["identity", "gzip;q=0"])
+def test_download_decompresses_for_clients_that_do_not_accept_the_encoding(client, make_run, compressed_output, accept):
+    run = make_run(output_path=compressed_output)
+
+    response = client.get(f"/api/runs/{run.id}/download", headers={"Accept-Encoding": accept})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.content == b"n\r\n1\r\n2\r\n3\r\n4\r\n5\r\n"
+
+
+def _pages(client, url, limit, **params):
+    """Read every page of a run list; returns the pages' run IDs."""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url, params={"limit": limit, **params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([run["id"] for run in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def history(make_report, make_run):
+    """A report with seven runs, two pairs of which start at the same time; newest first."""
+    report = make_report()
+    base = datetime(2024, 5, 1, 9, 0)
+    runs = [make_run(report_id=report.id, started_at=base + timedelta(minutes=minute)) for minute in (0, 1, 1, 2, 3, 3, 4)]
+    runs.sort(key=lambda run: (run.started_at, run.id), reverse=True)
+    return report, [run.id for run in runs]
+
+
+def test_cursor_round_trips():
+    started_at = datetime(2024, 5, 1, 9, 0, 0, 123456)
+
+    assert decode_cursor(encode_cursor(started_at, "run-1")) == (started_at, "run-1")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("not a cursor")
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7])
+def test_history_pages_cover_every_run_once_in_order(client, history, limit):
+    report, run_ids = history
+
+    pages = _pages(client, f"/api/reports/{report.id}/runs", limit)
+
+    assert [run_id for page in pages for run_id in page] == run_ids
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_history_pages_do_not_shift_when_runs_are_added(client, make_run, history):
+    report, run_ids = history
+    first = client.get(f"/api/reports/{report.id}/runs", params={"limit": 3})
+    make_run(report_id=report.id, started_at=datetime(2024, 5, 1, 10, 0))
+
+    second = client.get(f"/api/reports/{report.id}/runs", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert [run["id"] for run in second.json()] == run_ids[3:6]
+
+
+def test_invalid_cursor_is_a_bad_request(client, history):
+    report, _ = history
+
+    response = client.get(f"/api/reports/{report.id}/runs", params={"cursor": "garbage"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_run_search_pages_with_filters(client, make_run, history):
+    report, run_ids = history
+    make_run(status=models.RunStatus.FAILED.value)
+
+    pages = _pages(client, "/api/runs", 2, status="SUCCESS", report_id=report.id)
+
+    assert [run_id for page in pages for run_id in page] == run_ids
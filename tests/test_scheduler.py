@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import scheduler as scheduler_service
+
+
+def _schedules(scheduler):
+    """Trigger of each report job, by report ID."""
+    return {
+        job.id: str(job.trigger)
+        for job in scheduler.get_jobs() if job.func is scheduler_service.trigger_report
+    }
+
+
+def _trigger(schedule_cron):
+    return str(scheduler_service.build_trigger(schedule_cron))
+
+
+def test_reconcile_applies_only_the_differences(db, scheduler, make_report):
+    kept = make_report(schedule_cron="0 9 * * *", is_active=True)
+    changed = make_report(schedule_cron="0 10 * * *", is_active=True)
+    deactivated = make_report(schedule_cron="0 11 * * *", is_active=True)
+    make_report(schedule_cron="0 12 * * *", is_active=False)
+
+    assert scheduler_service.reconcile_scheduler(db) == {
+        "added": 3, "updated": 0, "removed": 0, "unchanged": 0, "caught_up": 0
+    }
+    kept_job = scheduler.get_job(kept.id)
+
+    changed.schedule_cron = "30 10 * * 1-5"
+    deactivated.is_active = False
+    added = make_report(schedule_cron="*/5 * * * *", is_active=True)
+    db.commit()
+
+    assert scheduler_service.reconcile_scheduler(db) == {
+        "added": 1, "updated": 1, "removed": 1, "unchanged": 1, "caught_up": 0
+    }
+    assert _schedules(scheduler) == {
+        kept.id: _trigger("0 9 * * *"),
+        changed.id: _trigger("30 10 * * 1-5"),
+        added.id: _trigger("*/5 * * * *"),
+    }
+    assert scheduler.get_job(kept.id).next_run_time == kept_job.next_run_time
+    assert {entry.report_id for entry in scheduler_service.cron_index.entries()} == {kept.id, changed.id, added.id}
+
+
+def test_reconcile_drops_the_job_of_a_report_whose_schedule_turned_invalid(db, scheduler, make_report):
+    report = make_report(schedule_cron="0 9 * * *", is_active=True)
+    scheduler_service.reconcile_scheduler(db)
+    report.schedule_cron = "0 9 * *"
+    db.commit()
+
+    counts = scheduler_service.reconcile_scheduler(db)
+
+    assert counts["removed"] == 1
+    assert scheduler.get_job(report.id) is None
+
+
+def test_schedule_report_updates_one_job_in_place(db, scheduler, make_report):
+    report = make_report(schedule_cron="0 9 * * *", is_active=True)
+    other = make_report(schedule_cron="0 9 * * *", is_active=True)
+    scheduler_service.reconcile_scheduler(db)
+    other_job = scheduler.get_job(other.id)
+
+    report.schedule_cron = "15 6 * * *"
+    scheduler_service.schedule_report(report)
+
+    assert _schedules(scheduler)[report.id] == _trigger("15 6 * * *")
+    assert scheduler.get_job(other.id).next_run_time == other_job.next_run_time
+
+
+def test_invalid_schedule_never_leaves_the_old_one_firing(db, scheduler, make_report):
+    report = make_report(schedule_cron="0 9 * * *", is_active=True)
+    scheduler_service.schedule_report(report)
+
+    report.schedule_cron = "0 25 * * *"
+    scheduler_service.schedule_report(report)
+
+    assert scheduler.get_job(report.id) is None
+    assert scheduler_service.cron_index.entries() == []
+
+
+def test_sync_removes_the_job_of_a_deactivated_report(db, scheduler, make_report):
+    report = make_report(is_active=True)
+    scheduler_service.sync_report_schedule(report)
+    assert scheduler.get_job(report.id) is not None
+
+    report.is_active = False
+    scheduler_service.sync_report_schedule(report)
+
+    assert scheduler.get_job(report.id) is None
+
+
+def _past_due(db, scheduler, make_report, schedule_cron="0 * * * *", **values):
+    """An active report whose job was due 3.5 hours ago, as after downtime."""
+    report = make_report(schedule_cron=schedule_cron, is_active=True, **values)
+    scheduler_service.reconcile_scheduler(db)
+    now = datetime.now(scheduler.timezone)
+    scheduler.modify_job(report.id, next_run_time=now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=3))
+    return report
+
+
+def _catch_up_fires(scheduler):
+    return sorted(job.args[1] for job in scheduler.get_jobs() if job.func is scheduler_service._fire)
+
+
+@pytest.mark.parametrize("policy, fires", [("skip", 0), ("coalesce", 1), ("all", 4)])
+def test_catch_up_replays_missed_fires_by_policy(db, scheduler, make_report, monkeypatch, policy, fires):
+    monkeypatch.setattr(scheduler_service, "SCHEDULER_MISFIRE_POLICY", policy)
+    report = _past_due(db, scheduler, make_report)
+
+    counts = scheduler_service.reconcile_scheduler(db, catch_up=True)
+
+    missed = _catch_up_fires(scheduler)
+    assert counts["caught_up"] == len(missed) == fires
+    assert all(fire.minute == 0 for fire in missed)
+    assert scheduler.get_job(report.id).next_run_time > datetime.now(scheduler.timezone)
+
+
+def test_catch_up_is_capped_per_report(db, scheduler, make_report, monkeypatch):
+    monkeypatch.setattr(scheduler_service, "SCHEDULER_MISFIRE_POLICY", "all")
+    monkeypatch.setattr(scheduler_service, "SCHEDULER_CATCHUP_MAX", 2)
+    _past_due(db, scheduler, make_report, schedule_cron="*/5 * * * *")
+
+    assert scheduler_service.reconcile_scheduler(db, catch_up=True)["caught_up"] == 2
+
+
+def test_catch_up_replays_fires_of_the_old_schedule_when_it_changed(db, scheduler, make_report, monkeypatch):
+    monkeypatch.setattr(scheduler_service, "SCHEDULER_MISFIRE_POLICY", "coalesce")
+    report = _past_due(db, scheduler, make_report)
+    report.schedule_cron = "30 6 * * *"
+    db.commit()
+
+    counts = scheduler_service.reconcile_scheduler(db, catch_up=True)
+
+    assert (counts["updated"], counts["caught_up"]) == (1, 1)
+    assert _schedules(scheduler)[report.id] == _trigger("30 6 * * *")
+
+
+def test_reconcile_without_catch_up_leaves_past_due_jobs_alone(db, scheduler, make_report, monkeypatch):
+    monkeypatch.setattr(scheduler_service, "SCHEDULER_MISFIRE_POLICY", "all")
+    _past_due(db, scheduler, make_report)
+
+    assert scheduler_service.reconcile_scheduler(db)["caught_up"] == 0
+    assert _catch_up_fires(scheduler) == []
+
+
+def test_invalid_cron_is_rejected_by_the_api(client, make_report):
+    report = make_report()
+
+    response = client.put(f"/api/reports/{report.id}", json={"schedule_cron": "0 9 * * 8"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid day_of_week field: 8"
+
+
+def test_schedule_infos_match_the_single_report_lookup(db, scheduler, make_report):
+    scheduled = make_report(schedule_cron="0 9 * * *", is_active=True)
+    inactive = make_report(schedule_cron="0 10 * * *", is_active=False)
+    scheduler_service.reconcile_scheduler(db)
+
+    infos = scheduler_service.get_schedule_infos([scheduled.id, inactive.id])
+
+    assert infos == {
+        scheduled.id: scheduler_service.get_schedule_info(scheduled.id),
+        inactive.id: (None, None),
+    }
+    assert infos[scheduled.id][1] is not None
+
+
+def test_report_list_reads_schedules_in_one_batch(db, scheduler, make_report, client, monkeypatch):
+    from app.api import reports as reports_api
+    from app.services.response_cache import report_cache
+
+    report_cache.invalidate()
+    reports = [make_report(name=f"report {i}", is_active=True) for i in range(3)]
+    scheduler_service.reconcile_scheduler(db)
+    batches = []
+    batched = scheduler_service.get_schedule_infos
+    monkeypatch.setattr(reports_api, "get_schedule_infos", lambda ids: batches.append(ids) or batched(ids))
+
+    def single_lookup(report_id):
+        raise AssertionError("schedules must not be read one report at a time")
+    monkeypatch.setattr(reports_api, "get_schedule_info", single_lookup)
+
+    response = client.get("/api/reports")
+
+    assert response.status_code == 200
+    assert len(batches) == 1
+    assert {r["id"]: r["next_fire_time"] is not None for r in response.json()} == {r.id: True for r in reports}
@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+
+
+def _simulate(*args, env=None):
+    # The simulation sets up its own in-memory database at import, so it runs
+    # in a separate interpreter instead of next to the test database
+    result = subprocess.run(
+        [sys.executable, "-m", "app.simulate", "--json", "--fire-cost-ms", "1",
+         "--start", "2024-05-01T00:00:00", *args],
+        capture_output=True, text=True, check=True, timeout=120,
+    )
+    return json.loads(result.stdout)
+
+
+def test_simulation_runs_every_fire():
+    results = _simulate("--reports", "40", "--hours", "3")
+
+    assert results["reports"] == 40
+    assert results["jobstore"] == "memory"
+    assert results["fires"]["executed"] > 0
+    assert results["fires"]["missed"] == 0
+    assert results["runs"]["succeeded"] == results["fires"]["executed"]
+    assert results["runs"]["failed"] == 0
+    assert set(results["pools"]) >= {"default"}
+
+
+def test_simulation_is_deterministic_for_a_seed():
+    first = _simulate("--reports", "20", "--hours", "2", "--seed", "3")
+    second = _simulate("--reports", "20", "--hours", "2", "--seed", "3")
+
+    assert first["fires"]["executed"] == second["fires"]["executed"]
+    assert first["runs"] == second["runs"]
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.triggers.cron import CronTrigger
+
+from app.services.spreading import OffsetTrigger, StartLimiter, schedule_offset
+
+UTC = timezone.utc
+
+
+def test_offset_is_stable_and_inside_the_window():
+    offsets = [schedule_offset(f"report-{i}", window=600) for i in range(500)]
+
+    assert offsets == [schedule_offset(f"report-{i}", window=600) for i in range(500)]
+    assert all(0 <= offset < 600 for offset in offsets)
+    # Hashing spreads the reports over the whole window
+    assert len({offset // 60 for offset in offsets}) == 10
+
+
+def test_long_running_reports_start_early_in_the_window():
+    offsets = [schedule_offset(f"report-{i}", expected_seconds=450, window=600) for i in range(200)]
+
+    # 450s rounds up to 8 minutes, leaving the first 120 seconds
+    assert all(offset < 120 for offset in offsets)
+    assert schedule_offset("report-1", expected_seconds=3600, window=600) == 0
+
+
+def test_no_window_means_no_offset():
+    assert schedule_offset("report-1", window=0) == 0
+
+
+def test_offset_trigger_fires_after_each_cron_time():
+    trigger = OffsetTrigger(CronTrigger(minute="0", timezone=UTC), 90)
+    now = datetime(2024, 5, 1, 9, 0, 30, tzinfo=UTC)
+
+    first = trigger.get_next_fire_time(None, now)
+    second = trigger.get_next_fire_time(first, first + timedelta(seconds=1))
+
+    # 09:01:30 is still ahead of now, although the cron time 09:00 passed
+    assert first == datetime(2024, 5, 1, 9, 1, 30, tzinfo=UTC)
+    assert second == datetime(2024, 5, 1, 10, 1, 30, tzinfo=UTC)
+
+
+def test_start_limiter_books_later_slices_when_one_is_full():
+    limiter = StartLimiter(slice_seconds=10, max_starts=2)
+    now = datetime.fromtimestamp(1_700_000_000)
+
+    bookings = [limiter.reserve(now) for _ in range(5)]
+
+    assert bookings == [
+        None, None,
+        datetime.fromtimestamp(1_700_000_010), datetime.fromtimestamp(1_700_000_010),
+        datetime.fromtimestamp(1_700_000_020),
+    ]
+    # A later slice starts empty
+    assert limiter.reserve(now + timedelta(seconds=30)) is None
+
+
+def test_start_limiter_without_cap_never_defers():
+    limiter = StartLimiter(slice_seconds=10, max_starts=0)
+
+    assert {limiter.reserve() for _ in range(100)} == {None}